@@ -1,54 +1,204 @@
-from flask import Flask, jsonify, render_template
+import os
+from functools import partial
+from flask import Flask, jsonify, render_template, request
 from flask_cors import CORS
 from utils.data_fetch import (
     fetch_stock_data,
-    market_mood_barometer,
-    sector_sentiment,
+    fetch_stock_info,
+    fetch_universe_data,
+    fetch_universe_frame,
+    stored_universe_frame,
+    universe_closes,
+    refresh_metadata,
     upcoming_events,
     fetch_stock_history,
-    market_emotion_heatmap,
+    MAX_CHART_POINTS,
     NIFTY_50_STOCKS,
     INDIAN_INDICES,
     COMMODITIES,
     US_STOCKS
 )
+from utils.ohlcv_store import BACKFILL, period_start
+from utils.fetch_engine import fetch_groups, fetch_many
+from utils.snapshot import SnapshotRefresher
+from common import metrics
+from common.scheduler import RefreshScheduler, TokenBucket, watchlist_symbols
+from common import market_calendar
+from common.encoded import respond
+from common.shared_store import shared_snapshots
+from common.alerts import AlertEngine, ticker_prices
+from common.upstream import UpstreamClient
+from common.fx import FXTable, CURRENCIES, convert_rows
+from common.metadata_cache import CACHE_DIR
+from common.startup import StartupReport
+
+REFRESH_INTERVAL = 60  # seconds between background market rebuilds when nothing triggers one
+STARTUP_WAIT = 30      # seconds the first snapshot waits for the scheduler's first pass
+
+PRICE_SYMBOLS = INDIAN_INDICES + COMMODITIES + NIFTY_50_STOCKS + US_STOCKS
+MONEY_FIELDS = ["price", "change", "market_cap"]   # row fields quoted in the row's "currency"
+
+# Seconds from process start to import, first market response and first fresh snapshot, per boot
+startup = StartupReport("api")
 
 app = Flask(__name__)
 CORS(app)
+metrics.install(app)  # /metrics, /metrics/profile and per-route timing
+
+def fetch_stock_rows(symbols, frame=None):
+    """
+    Prices for a stock universe from one batched download; names and fundamentals
+    from the metadata cache. Symbols missing from the batch fall back to fetch_stock_data
+    on the stored bars only: downloading is left to the scheduler and its rate budget.
+    """
+    metadata = {s: fetch_stock_info(s) for s in symbols}
+    rows = {row["symbol"]: row for row in fetch_universe_data(symbols, metadata, frame)}
+    missing = [s for s in symbols if s not in rows]
+    if missing:
+        rows.update({row["symbol"]: row for row in fetch_many(partial(fetch_stock_data, sync=False), missing)})
+    return [rows[s] for s in symbols if s in rows]
 
 @app.route('/')
 def home():
     return render_template('index.html')
 
+def build_indian_snapshot():
+    from utils import analytics
+    # Reads only the local bar store and metadata cache; the scheduler does the downloading
+    scheduler.start().ready.wait(STARTUP_WAIT)
+    data = fetch_groups(partial(fetch_stock_data, sync=False), {"indices": INDIAN_INDICES, "commodities": COMMODITIES})
+    universe = stored_universe_frame(NIFTY_50_STOCKS)
+    stocks_data = fetch_stock_rows(NIFTY_50_STOCKS, universe)
+    closes = universe_closes(universe, NIFTY_50_STOCKS) if universe is not None else None
+    # Every aggregate below is computed from one columnar frame of the stock rows
+    frame = analytics.snapshot_frame(stocks_data)
+    return {
+        "indices": data["indices"], "commodities": data["commodities"],
+        "stocks": stocks_data, "market_mood": analytics.mood(frame),
+        "sector_sentiment": analytics.sector_means(frame), "market_heatmap": analytics.heatmap(frame),
+        "analytics": analytics.market_analytics(frame, closes),
+        "market_status": market_calendar.status(["NSE", "CME"])
+    }
+
+def build_us_snapshot():
+    scheduler.start().ready.wait(STARTUP_WAIT)
+    return {"stocks": fetch_stock_rows(US_STOCKS, stored_universe_frame(US_STOCKS)),
+            "market_status": market_calendar.status(["NYSE"])}
+
+# With several workers, only the one holding the "api" lease downloads and builds; the rest serve its snapshots
+shared = shared_snapshots("api")
+
+# CoinGecko's exchange rates on their own hourly TTL; the refresher worker fetches them, the rest read its copy
+fx = FXTable("api", UpstreamClient("coingecko"), shared)
+
+def convert_snapshot(payload):
+    """
+    The snapshot once per configured currency: stock and commodity rows converted
+    from their native currency (index levels are left alone) and sector means recomputed.
+    """
+    from utils import analytics
+    rates = fx.rates()
+    if rates is None: return {}
+    variants = {}
+    for currency in CURRENCIES:
+        factor = lambda row: rates[currency] / rates[row["currency"]] if row.get("currency") in rates else None
+        variant = {**payload, "currency": currency}
+        for key in ("stocks", "commodities"):
+            if key in payload: variant[key] = convert_rows(payload[key], MONEY_FIELDS, factor, 2, currency)
+        if "sector_sentiment" in payload:
+            variant["sector_sentiment"] = analytics.sector_means(analytics.snapshot_frame(variant["stocks"]))
+        variants[currency] = variant
+    return variants
+
+# The last snapshots are kept on disk, so a restart answers the first request at once (marked stale)
+indian_snapshots = SnapshotRefresher("indian_market", build_indian_snapshot, REFRESH_INTERVAL, shared, convert_snapshot,
+                                     os.path.join(CACHE_DIR, "indian_market_snapshot.json.gz"), startup)
+us_snapshots = SnapshotRefresher("us_market", build_us_snapshot, REFRESH_INTERVAL, shared, convert_snapshot,
+                                 os.path.join(CACHE_DIR, "us_market_snapshot.json.gz"), startup)
+
+# Price alerts are checked once per built snapshot, against only the tickers whose price moved. Targets are
+# compared in their own currency through the FX table; an alert the US or CRYPTO1 service fired is skipped
+alerts = AlertEngine("api", fx=fx, claims=shared)
+
+def check_alerts(snapshot):
+    payload = snapshot.payload
+    alerts.evaluate(ticker_prices(payload.get("indices", []) + payload.get("commodities", []) + payload["stocks"]))
+
+indian_snapshots.listeners.append(check_alerts)
+us_snapshots.listeners.append(check_alerts)
+
+def on_refresh(symbols):
+    """Rebuilds whichever snapshots contain the symbols the scheduler just refreshed."""
+    refreshed = set(symbols)
+    if refreshed.intersection(INDIAN_INDICES, COMMODITIES, NIFTY_50_STOCKS): indian_snapshots.trigger()
+    if refreshed.intersection(US_STOCKS): us_snapshots.trigger()
+
+# Yahoo has no published limit; ~4 calls/s with a burst that covers a cold start stays clear of throttling.
+# Indices and watchlist tickers refresh every few seconds, the rest of the universe every minute,
+# fundamentals daily; symbols opened often on the details page get promoted to the hot tier.
+# Once a market has closed and its last bar settled, its prices are not fetched again until it reopens.
+scheduler = RefreshScheduler("api", {"yahoo": TokenBucket(rate=4, capacity=150)}, shared=shared)
+scheduler.pin(INDIAN_INDICES + watchlist_symbols(PRICE_SYMBOLS))
+scheduler.add_job("prices", "yahoo", "universe", PRICE_SYMBOLS, fetch_universe_frame,
+                  promote=True, on_refresh=on_refresh, expires=market_calendar.expires_at)
+scheduler.add_job("fundamentals", "yahoo", "fundamentals", PRICE_SYMBOLS, refresh_metadata, on_refresh=on_refresh)
+
+def snapshot_response(refresher):
+    """The latest snapshot, in each row's own currency or, with ?currency=INR|USD|EUR, converted."""
+    currency = request.args.get('currency', '').upper()
+    if currency and currency not in CURRENCIES:
+        return jsonify({"error": f"Unsupported currency: {currency}", "currencies": list(CURRENCIES)}), 400
+    snapshot = refresher.get()
+    if snapshot is None:
+        return jsonify({"error": "Market data is not available yet", "snapshot": refresher.status()}), 503
+    encoded = snapshot.encoded
+    if currency:
+        encoded = (snapshot.variants or {}).get(currency)
+        if encoded is None:
+            return jsonify({"error": "Exchange rates are not available yet", "snapshot": refresher.status()}), 503
+    startup.mark("first_response", restored=snapshot.restored)
+    # Serialized and compressed once per rebuild and currency; only the live status is encoded per request
+    return respond(encoded, tail=refresher.status(snapshot))
+
 @app.route('/get_market_data')
 def indian_market_data():
-    indices_data = [fetch_stock_data(s) for s in INDIAN_INDICES]
-    commodities_data = [fetch_stock_data(s) for s in COMMODITIES]
-    stocks_data = [fetch_stock_data(s) for s in NIFTY_50_STOCKS]
-    indices_data = [d for d in indices_data if d]
-    commodities_data = [d for d in commodities_data if d]
-    stocks_data = [d for d in stocks_data if d]
-    mood = market_mood_barometer(stocks_data)
-    sectors = sector_sentiment(stocks_data)
-    heatmap = market_emotion_heatmap(stocks_data)
-    return jsonify({
-        "indices": indices_data, "commodities": commodities_data,
-        "stocks": stocks_data, "market_mood": mood,
-        "sector_sentiment": sectors, "market_heatmap": heatmap
-    })
+    return snapshot_response(indian_snapshots)
 
 @app.route('/get_us_market_data')
 def us_market_data():
-    us_stocks_data = [fetch_stock_data(s) for s in US_STOCKS]
-    us_stocks_data = [d for d in us_stocks_data if d]
-    return jsonify({"stocks": us_stocks_data})
+    return snapshot_response(us_snapshots)
+
+@app.route('/get_refresh_status')
+def refresh_status():
+    return jsonify({**scheduler.status(), "startup": startup.status()})
+
+@app.route('/get_alert_events')
+def alert_events():
+    """Recently triggered price alerts, newest first (?limit=, default 50)."""
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({"alerts": alerts.status(), "events": alerts.recent(max(0, limit))})
 
 @app.route('/get_stock_details/<symbol>')
 def get_stock_details(symbol):
-    history = fetch_stock_history(symbol)
+    """?period=1y&interval=1d&max_points=300 select the chart range; long ranges are downsampled."""
+    period = request.args.get('period', '30d')
+    interval = request.args.get('interval', '1d')
+    max_points = request.args.get('max_points', MAX_CHART_POINTS, type=int)
+    if interval not in BACKFILL:
+        return jsonify({"error": f"Unsupported interval: {interval}", "intervals": list(BACKFILL)}), 400
+    try:
+        period_start(period)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not 3 <= max_points <= MAX_CHART_POINTS * 10:
+        return jsonify({"error": f"max_points must be between 3 and {MAX_CHART_POINTS * 10}"}), 400
+    scheduler.start().hit(symbol)
+    history = fetch_stock_history(symbol, period, interval, max_points)
     events = upcoming_events()
     return jsonify({"history": history or {}, "upcoming_events": events})
 
+startup.mark("imported")
+
 if __name__ == '__main__':
     print('🚀 Starting API Service for Indian/US Stocks...')
     print('📊 Service will be available at: http://localhost:5001')
@@ -1,4 +1,11 @@
-import requests
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.upstream import UpstreamClient
+
+# ✅ Pooled client with retry/backoff (Alpha Vantage allows only a few calls per minute)
+alpha_vantage = UpstreamClient("alphavantage", timeout=15, max_per_host=1)
 
 # ✅ Your API key from Alpha Vantage
 api_key = "ZLDEYA5OOHGNISF1"
@@ -9,11 +16,8 @@ symbol = "AAPL"  # Example: Apple Inc.
 # ✅ API URL to fetch the stock data (5 minute interval)
 url = f"https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol={symbol}&interval=5min&apikey={api_key}"
 
-# ✅ Send request to API
-response = requests.get(url)
-
-# ✅ Convert response to JSON format
-data = response.json()
+# ✅ Send request to API and convert the response to JSON
+data = alpha_vantage.get_json(url, "intraday")
 
 # ✅ Extract and print the latest data
 time_series = data.get("Time Series (5min)", {})
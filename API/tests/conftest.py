@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Same imports the service uses: "utils.*" from API/, "common.*" from the repo root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from utils import analytics
+from utils.analytics import heatmap, lttb
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000)
+    y = np.sin(x / 50.0)
+    y[437] = 25.0
+    keep = lttb(x, y, 100)
+    assert len(keep) == 100
+    assert keep[0] == 0 and keep[-1] == 999
+    assert (np.diff(keep) > 0).all()
+    assert 437 in keep
+
+
+def test_lttb_returns_everything_when_already_small():
+    assert list(lttb([1, 2, 3], [4, 5, 6], 10)) == [0, 1, 2]
+    assert list(lttb(range(5), range(5), 2)) == [0, 1, 2, 3, 4]
+
+
+def test_heatmap_follows_the_bins_table(monkeypatch):
+    frame = pd.DataFrame({"symbol": list("ABCDE"), "company": list("abcde"),
+                          "change_percent": [3.0, 1.0, 0.0, -1.0, -3.0]})
+    assert [r["emoji"] for r in heatmap(frame)] == ["🚀", "😊", "🤔", "😐", "😨"]
+    monkeypatch.setattr(analytics, "HEATMAP_BINS", [(0.5, "up"), (-0.5, "down")])
+    assert [r["emoji"] for r in heatmap(frame)] == ["up", "up", "🤔", "down", "down"]
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+from utils.ohlcv_store import OHLCVStore
+
+
+def bars(days, tz=None):
+    """Daily bars at midnight for the given dates, tz-aware (Ticker.history) or naive (yf.download)."""
+    index = pd.DatetimeIndex([pd.Timestamp(d) for d in days])
+    if tz: index = index.tz_localize(tz)
+    closes = [100.0 + i for i in range(len(days))]
+    return pd.DataFrame({"Open": closes, "High": closes, "Low": closes, "Close": closes, "Volume": [1000] * len(days)},
+                        index=index)
+
+
+@pytest.fixture
+def days():
+    today = datetime.now(timezone.utc).date()
+    return [today - timedelta(days=n) for n in (5, 4, 3, 2)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return OHLCVStore(str(tmp_path / "ohlcv.sqlite3"), fetch_history=lambda *a, **k: pd.DataFrame())
+
+
+def test_download_and_history_bars_share_one_row_per_day(store, days):
+    store.ingest("TCS.NS", "1d", bars(days, "Asia/Kolkata"))   # Ticker.history path
+    store.ingest("TCS.NS", "1d", bars(days))                    # yf.download path, tz-naive
+    frame = store.get("TCS.NS", "1d", "30d", sync=False)
+    assert len(frame) == len(days)
+    assert [t.date() for t in frame.index] == days
+    assert str(frame.index.tz) == "Asia/Kolkata"
+
+
+def test_naive_bars_first_are_taken_as_exchange_local(store, days):
+    store.ingest("AAPL", "1d", bars(days))
+    store.ingest("AAPL", "1d", bars(days, "America/New_York"))
+    frame = store.get("AAPL", "1d", "30d", sync=False)
+    assert [t.date() for t in frame.index] == days
+    assert (frame.index.hour == 0).all()
+
+
+def test_daily_rows_stored_twice_by_older_versions_are_deduplicated(store, days):
+    store.ingest("TCS.NS", "1d", bars(days, "Asia/Kolkata"))
+    # What the old UTC localization wrote for a naive download: 05:30 local on the same day
+    shifted = bars(days, "UTC").tz_convert("Asia/Kolkata")
+    with store._conn() as conn:
+        conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         [("TCS.NS", "1d", int(t.timestamp()), 1, 1, 1, 1, 1) for t in shifted.index])
+    frame = store.get("TCS.NS", "1d", "30d", sync=False)
+    assert [t.date() for t in frame.index] == days
+
+
+def test_intraday_bars_keep_their_times(store):
+    start = pd.Timestamp.now(tz="America/New_York").floor("D") - pd.Timedelta(days=1) + pd.Timedelta(hours=10)
+    index = pd.date_range(start, periods=3, freq="1min")
+    hist = pd.DataFrame({c: [1.0, 2.0, 3.0] for c in ("Open", "High", "Low", "Close", "Volume")}, index=index)
+    store.ingest("AAPL", "1m", hist)
+    frame = store.get("AAPL", "1m", "7d", sync=False)
+    assert list(frame.index) == list(index)
+
+
+def test_failed_backfill_is_clamped_recorded_and_not_retried(tmp_path):
+    backfills = []
+
+    def fetch(symbol, interval, start=None, end=None, period=None):
+        if end is None: return pd.DataFrame()
+        backfills.append(start)
+        raise ValueError("1m data not available for startTime")
+
+    store = OHLCVStore(str(tmp_path / "ohlcv.sqlite3"), fetch_history=fetch)
+    start = pd.Timestamp.now(tz="UTC").floor("min") - pd.Timedelta(hours=1)
+    index = pd.date_range(start, periods=3, freq="1min")
+    store.ingest("AAPL", "1m", pd.DataFrame({c: [1.0] * 3 for c in ("Open", "High", "Low", "Close", "Volume")},
+                                            index=index))
+    assert len(store.get("AAPL", "1m", "1y")) == 3
+    assert len(store.get("AAPL", "1m", "1y")) == 3
+    assert len(backfills) == 1
+    assert backfills[0] >= datetime.now(timezone.utc) - timedelta(days=7, minutes=1)
+
+
+def test_symbol_without_bars_is_not_downloaded_on_every_read(tmp_path):
+    downloads = []
+
+    def fetch(symbol, interval, start=None, end=None, period=None):
+        downloads.append(period)
+        return pd.DataFrame()
+
+    store = OHLCVStore(str(tmp_path / "ohlcv.sqlite3"), fetch_history=fetch)
+    for _ in range(5):
+        assert store.get("DELISTED.NS", "1d", "1y").empty
+    assert downloads == ["1y"]
+
+
+def test_failed_first_download_is_throttled_too(tmp_path):
+    downloads = []
+
+    def fetch(symbol, interval, start=None, end=None, period=None):
+        downloads.append(period)
+        raise ConnectionError("yahoo unreachable")
+
+    store = OHLCVStore(str(tmp_path / "ohlcv.sqlite3"), fetch_history=fetch)
+    store.get("AAPL", "1d", "30d")
+    store.get("AAPL", "1d", "30d")
+    assert downloads == ["1y"]
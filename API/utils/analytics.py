@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+# (threshold %, emoji), first match wins: a positive threshold matches changes above it, a negative one below it
+HEATMAP_BINS = [(2, "🚀"), (0.5, "😊"), (-2, "😨"), (-0.5, "😐")]
+HEATMAP_DEFAULT = "🤔"
+
+
+def snapshot_frame(stocks):
+    """One columnar frame for a snapshot's stock rows (accepts a list of dicts or a DataFrame)."""
+    if isinstance(stocks, pd.DataFrame): return stocks
+    return pd.DataFrame.from_records(stocks or [])
+
+
+def mood(frame):
+    if frame.empty: return {"mood": "Neutral", "confidence": 0}
+    change = frame["change"].to_numpy(dtype=float)
+    up, down = int((change > 0).sum()), int((change < 0).sum())
+    return {"mood": "Optimistic" if up >= down else "Fearful",
+            "confidence": round(abs(up - down) / len(frame) * 100, 2)}
+
+
+def sector_means(frame):
+    if frame.empty: return {}
+    known = frame[frame["sector"] != "N/A"]
+    means = known.groupby("sector", sort=False)["change"].mean().round(2)
+    return means.to_dict()
+
+
+def heatmap(frame):
+    if frame.empty: return []
+    change = frame["change_percent"].astype(float)
+    emoji = np.select([change > t if t > 0 else change < t for t, _ in HEATMAP_BINS],
+                      [e for _, e in HEATMAP_BINS], HEATMAP_DEFAULT)
+    out = pd.DataFrame({"symbol": frame["symbol"], "company": frame["company"],
+                        "change_percent": change.round(2), "emoji": emoji})
+    return out.to_dict("records")
+
+
+def breadth(frame, closes=None):
+    """Advance/decline counts and ratios, plus 30-day highs/lows when a close panel is available."""
+    if frame.empty: return {}
+    change = frame["change"].to_numpy(dtype=float)
+    up, down = int((change > 0).sum()), int((change < 0).sum())
+    result = {
+        "advancers": up, "decliners": down, "unchanged": len(frame) - up - down,
+        "advance_decline_ratio": round(up / down, 2) if down else None,
+        "percent_up_30d": round(float((frame["change_percent_30d"].astype(float) > 0).mean() * 100), 2)
+            if "change_percent_30d" in frame else None,
+    }
+    if closes is not None and not closes.empty:
+        last = closes.ffill().iloc[-1]
+        result["new_30d_highs"] = int((last >= closes.max()).sum())
+        result["new_30d_lows"] = int((last <= closes.min()).sum())
+    return result
+
+
+def sector_weighted_returns(frame):
+    """Market-cap weighted change_percent per sector (sectors without market caps are skipped)."""
+    if frame.empty or "market_cap" not in frame: return {}
+    cap = pd.to_numeric(frame["market_cap"], errors="coerce")
+    known = frame.assign(cap=cap, weighted=cap * frame["change_percent"].astype(float))
+    known = known[(known["sector"] != "N/A") & known["cap"].gt(0)]
+    sums = known.groupby("sector", sort=False)[["weighted", "cap"]].sum()
+    return (sums["weighted"] / sums["cap"]).round(2).to_dict()
+
+
+def correlation_matrix(closes, window=30):
+    """Pairwise correlation of daily returns over the last `window` bars (symbols x symbols)."""
+    returns = closes.pct_change(fill_method=None).tail(window)
+    return returns.corr(min_periods=max(5, window // 3))
+
+
+def correlation_summary(closes, window=30, top=10):
+    """Average pairwise correlation and the most correlated pairs, without shipping the n x n matrix."""
+    if closes is None or closes.shape[1] < 2: return {}
+    corr = correlation_matrix(closes, window)
+    values = corr.to_numpy()
+    rows, cols = np.triu_indices_from(values, k=1)
+    pairs = values[rows, cols]
+    valid = ~np.isnan(pairs)
+    if not valid.any(): return {}
+    rows, cols, pairs = rows[valid], cols[valid], pairs[valid]
+    best = np.argsort(pairs)[::-1][:top]
+    names = corr.columns
+    return {
+        "window": window,
+        "average": round(float(pairs.mean()), 3),
+        "top_pairs": [{"a": names[rows[i]], "b": names[cols[i]], "correlation": round(float(pairs[i]), 3)} for i in best],
+    }
+
+
+def market_analytics(frame, closes=None):
+    """Universe-wide extras for a snapshot: breadth, cap-weighted sector returns and correlation."""
+    return {
+        "breadth": breadth(frame, closes),
+        "sector_weighted_returns": sector_weighted_returns(frame),
+        "correlation": correlation_summary(closes) if closes is not None else {},
+    }
+
+
+def lttb(x, y, n):
+    """
+    Largest-Triangle-Three-Buckets: indices of `n` points of (x, y) that keep the
+    series' visual shape. Always keeps the first and last point; returns every
+    index when the series already has `n` points or fewer.
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    size = len(x)
+    if n >= size or n < 3: return np.arange(size)
+    # Bucket boundaries for the interior points; the first and last point are their own buckets
+    edges = np.linspace(1, size - 1, n - 1).astype(int)
+    keep = np.empty(n, dtype=int)
+    keep[0], keep[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket is the third corner of the triangle (the last point for the final bucket)
+        nlo, nhi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (size - 1, size)
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = keep[i + 1] = lo + int(area.argmax())
+    return keep
@@ -1,7 +1,16 @@
-import yfinance as yf
-from datetime import datetime, timedelta
+import os
+import sys
 import ssl
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.metadata_cache import MetadataCache, CACHE_DIR
+from common.metrics import timed_upstream
+from common.fx import native_currency
+from utils.ohlcv_store import OHLCVStore, DAILY_INTERVALS
+
+# yfinance, pandas, numpy and utils.analytics (which needs both) are imported inside the
+# functions that use them, so the service boots and serves a restored snapshot without them
+
 # --- Global fix for the SSL Certificate Error ---
 ssl._create_default_https_context = ssl._create_unverified_context
 
@@ -30,19 +39,22 @@ SECTOR_MAP = {
     "SBIN.NS": "Finance", "WIPRO.NS": "IT", "BHARTIARTL.NS": "Telecom"
 }
 
-def fetch_stock_data(symbol):
+# Slow-moving Ticker.info fields, loaded from disk at startup and refreshed off the request path
+metadata_cache = MetadataCache(os.path.join(CACHE_DIR, "api_metadata.json"))
+
+# Local OHLCV bars; history reads only download bars newer than the last stored one
+ohlcv_store = OHLCVStore(os.path.join(CACHE_DIR, "ohlcv.sqlite3"))
+
+def refresh_metadata(symbols):
+    return metadata_cache.refresh(symbols)
+
+def fetch_stock_data(symbol, sync=True):
     try:
-        stock = yf.Ticker(symbol)
-        info = stock.info
-        hist = stock.history(period="1d")
-        if hist.empty:
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=1)
-            hist = stock.history(start=start_date, end=end_date, interval="15m")
-            if hist.empty: return None
-        latest = hist.iloc[-1]
+        info = metadata_cache.get(symbol)
+        hist_30 = ohlcv_store.get(symbol, "1d", "30d", sync=sync)
+        if hist_30.empty: return None
+        latest = hist_30.iloc[-1]
         previous_close = info.get('previousClose', latest['Open'])
-        hist_30 = stock.history(period="30d")
         start_price = hist_30['Close'].iloc[0]
         end_price = hist_30['Close'].iloc[-1]
         change_percent_30d = ((end_price - start_price) / start_price) * 100 if start_price != 0 else 0
@@ -55,27 +67,108 @@ def fetch_stock_data(symbol):
             "volume": int(latest['Volume']) if 'Volume' in latest and latest['Volume'] is not None else 0,
             "market_cap": info.get('marketCap'), "pe_ratio": info.get('trailingPE'),
             "volatility_percent": round(volatility, 2), "change_percent_30d": round(change_percent_30d, 2), "risk": risk,
-            "sector": info.get('sector', SECTOR_MAP.get(symbol, "N/A"))
+            "sector": info.get('sector', SECTOR_MAP.get(symbol, "N/A")), "currency": native_currency(symbol)
         }
     except Exception as e:
         print(f"Could not fetch data for {symbol}: {e}")
         return None
 
+META_FIELDS = ["company", "market_cap", "pe_ratio", "sector"]
+
+# Chart history: bars above this many are LTTB-downsampled, so payload size does not grow with the range
+MAX_CHART_POINTS = 500
+
+def fetch_stock_info(symbol):
+    info = metadata_cache.get(symbol)
+    return {
+        "symbol": symbol, "company": info.get('longName', info.get('shortName', symbol)),
+        "market_cap": info.get('marketCap'), "pe_ratio": info.get('trailingPE'),
+        "sector": info.get('sector', SECTOR_MAP.get(symbol, "N/A"))
+    }
+
+def fetch_universe_frame(symbols, period="30d"):
+    """Downloads daily bars for the whole universe in one grouped yf.download call."""
+    import yfinance as yf
+    import pandas as pd
+    try:
+        with timed_upstream("yahoo", "download"):
+            frame = yf.download(symbols, period=period, interval="1d", group_by="ticker",
+                                auto_adjust=True, threads=True, progress=False)
+    except Exception as e:
+        print(f"Could not download universe data: {e}")
+        return None
+    if frame is None or frame.empty: return None
+    if not isinstance(frame.columns, pd.MultiIndex):
+        frame.columns = pd.MultiIndex.from_product([[symbols[0]], frame.columns])
+    # Keep the local bar store warm so detail pages for these symbols need no download
+    for symbol in frame.columns.get_level_values(0).unique():
+        try:
+            ohlcv_store.ingest(symbol, "1d", frame[symbol])
+        except Exception as e:
+            print(f"Could not store bars for {symbol}: {e}")
+    return frame
+
+def stored_universe_frame(symbols, period="30d"):
+    """Same (symbol, field) layout as fetch_universe_frame, read from the local bar store with no network."""
+    import pandas as pd
+    bars = {s: ohlcv_store.get(s, "1d", period, sync=False) for s in symbols}
+    bars = {s: b for s, b in bars.items() if not b.empty}
+    if not bars: return None
+    return pd.concat(bars, axis=1)
+
+def universe_closes(frame, symbols):
+    """Close-price panel (dates x symbols) from a fetch_universe_frame() result."""
+    return frame.xs("Close", axis=1, level=1).reindex(columns=symbols)
+
+def fetch_universe_data(symbols, metadata=None, frame=None):
+    """
+    Batch counterpart of fetch_stock_data: one download for every symbol, then
+    price, change, 30-day change, volatility and risk as column operations.
+    metadata maps symbol -> fetch_stock_info() dict for names, market cap, PE and sector;
+    pass an already downloaded fetch_universe_frame() result as frame to reuse it.
+    """
+    import numpy as np
+    import pandas as pd
+    try:
+        frame = frame if frame is not None else fetch_universe_frame(symbols)
+        if frame is None: return []
+        close = universe_closes(frame, symbols).ffill()
+        volume = frame.xs("Volume", axis=1, level=1).reindex(columns=symbols)
+        last = close.iloc[-1]
+        previous_close = close.iloc[-2] if len(close) > 1 else close.iloc[0]
+        start_price = close.bfill().iloc[0]
+        volatility = close.pct_change(fill_method=None).std() * 100
+        change = last - previous_close
+        meta = pd.DataFrame.from_dict(metadata or {}, orient="index", columns=META_FIELDS).astype(object).reindex(symbols)
+        names = pd.Series(symbols, index=symbols)
+        out = pd.DataFrame({
+            "symbol": symbols,
+            "company": meta["company"].fillna(names),
+            "price": last.round(2),
+            "change": change.round(2),
+            "change_percent": (change / previous_close * 100).where(previous_close != 0, 0).round(2),
+            "volume": volume.iloc[-1].fillna(0).astype("int64"),
+            "market_cap": meta["market_cap"],
+            "pe_ratio": meta["pe_ratio"],
+            "volatility_percent": volatility.round(2),
+            "change_percent_30d": ((last - start_price) / start_price * 100).where(start_price != 0, 0).round(2),
+            "risk": np.select([volatility < 2, volatility < 4], ["Low", "Moderate"], "High"),
+            "sector": meta["sector"].fillna(names.map(SECTOR_MAP)).fillna("N/A"),
+            "currency": names.map(native_currency),
+        }, index=symbols)
+        out = out[out["price"].notna()].astype(object)
+        return out.where(out.notna(), None).to_dict("records")
+    except Exception as e:
+        print(f"Could not fetch universe data: {e}")
+        return []
+
 def market_mood_barometer(stocks):
-    if not stocks: return {"mood": "Neutral", "confidence": 0}
-    up = sum(1 for s in stocks if s['change'] > 0)
-    down = sum(1 for s in stocks if s['change'] < 0)
-    mood = "Optimistic" if up >= down else "Fearful"
-    confidence = round(abs(up - down) / len(stocks) * 100, 2)
-    return {"mood": mood, "confidence": confidence}
+    from utils import analytics
+    return analytics.mood(analytics.snapshot_frame(stocks))
 
 def sector_sentiment(stocks):
-    sectors = {}
-    for s in stocks:
-        sec = s['sector']
-        if sec not in sectors and sec != "N/A": sectors[sec] = []
-        if sec != "N/A": sectors[sec].append(s['change'])
-    return {sec: round(sum(vals) / len(vals), 2) for sec, vals in sectors.items() if vals}
+    from utils import analytics
+    return analytics.sector_means(analytics.snapshot_frame(stocks))
 
 def upcoming_events():
     return [
@@ -84,30 +177,31 @@ def upcoming_events():
         {"event": "CPI Inflation Data", "date": "Dec 12, 2025", "impact": "High", "predicted": "+0.3%"}
     ]
 
-def fetch_stock_history(symbol):
+def fetch_stock_history(symbol, period="30d", interval="1d", max_points=MAX_CHART_POINTS):
+    """
+    Price and candle-sentiment series for charts over any stored period/interval,
+    built in one vectorized pass and downsampled with LTTB to at most max_points bars.
+    """
+    import numpy as np
+    from utils import analytics
     try:
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period="30d")
+        hist = ohlcv_store.get(symbol, interval, period)
         if hist.empty: return None
-        price_trend = [{"date": str(idx.date()), "close": round(row["Close"], 2)} for idx, row in hist.iterrows()]
-        sentiment_trend = [{"date": str(idx.date()), "sentiment": 1 if row['Close'] > row['Open'] else -1 if row['Close'] < row['Open'] else 0} for idx, row in hist.iterrows()]
-        return {"symbol": symbol, "price_trend": price_trend, "sentiment_trend": sentiment_trend}
+        close, open_ = hist["Close"].to_numpy(dtype=float), hist["Open"].to_numpy(dtype=float)
+        keep = analytics.lttb(hist.index.asi8, close, max_points)
+        index = hist.index[keep]
+        dates = index.strftime("%Y-%m-%d") if interval in DAILY_INTERVALS else [t.isoformat() for t in index]
+        closes = np.round(close[keep], 2).tolist()
+        sentiment = np.sign(np.nan_to_num(close[keep] - open_[keep])).astype(int).tolist()
+        return {
+            "symbol": symbol, "period": period, "interval": interval, "points": len(keep), "total_points": len(hist),
+            "price_trend": [{"date": d, "close": c} for d, c in zip(dates, closes)],
+            "sentiment_trend": [{"date": d, "sentiment": m} for d, m in zip(dates, sentiment)],
+        }
     except Exception as e:
         print(f"Could not fetch history for {symbol}: {e}")
         return None
 
 def market_emotion_heatmap(stocks):
-    heatmap = []
-    if not stocks: return []
-    for s in stocks:
-        change = s['change_percent']
-        if change > 2: emoji = "🚀"
-        elif change > 0.5: emoji = "😊"
-        elif change < -2: emoji = "😨"
-        elif change < -0.5: emoji = "😐"
-        else: emoji = "🤔"
-        heatmap.append({
-            "symbol": s['symbol'], "company": s['company'],
-            "change_percent": round(change, 2), "emoji": emoji
-        })
-    return heatmap
\ No newline at end of file
+    from utils import analytics
+    return analytics.heatmap(analytics.snapshot_frame(stocks))
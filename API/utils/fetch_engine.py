@@ -0,0 +1,61 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# --- Fan-out limits ---
+MAX_WORKERS = 16        # upper bound on concurrent upstream fetches for the whole service
+SYMBOL_TIMEOUT = 8.0    # seconds one symbol may run before we stop waiting for it
+REQUEST_BUDGET = 20.0   # seconds a whole fan-out may take before partial results are returned
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="fetch")
+
+
+def fetch_many(fetch_fn, symbols, symbol_timeout=SYMBOL_TIMEOUT, budget=REQUEST_BUDGET):
+    """
+    Runs fetch_fn(symbol) for every symbol on the shared worker pool.
+    Results come back in symbol order; symbols that fail, return nothing,
+    overrun their own deadline or miss the overall budget are dropped.
+    """
+    if not symbols: return []
+    started = {}
+    lock = threading.Lock()
+
+    def run(symbol):
+        with lock: started[symbol] = time.monotonic()
+        return fetch_fn(symbol)
+
+    futures = {_executor.submit(run, s): s for s in symbols}
+    results = {}
+    pending = set(futures)
+    deadline = time.monotonic() + budget
+    while pending:
+        now = time.monotonic()
+        if now >= deadline: break
+        done, pending = wait(pending, timeout=min(0.25, deadline - now), return_when=FIRST_COMPLETED)
+        for f in done:
+            try:
+                data = f.result()
+                if data: results[futures[f]] = data
+            except Exception as e:
+                print(f"Could not fetch data for {futures[f]}: {e}")
+        # Stop waiting on symbols that have been running longer than their own deadline
+        now = time.monotonic()
+        with lock:
+            overdue = {f for f in pending if now - started.get(futures[f], now) > symbol_timeout}
+        pending -= overdue
+        for f in overdue: print(f"⏱️ {futures[f]} exceeded {symbol_timeout}s, skipping")
+
+    if pending:
+        for f in pending: f.cancel()
+        print(f"⏱️ Fetch budget of {budget}s exhausted, returning {len(results)}/{len(symbols)} symbols")
+    return [results[s] for s in symbols if s in results]
+
+
+def fetch_groups(fetch_fn, groups, symbol_timeout=SYMBOL_TIMEOUT, budget=REQUEST_BUDGET):
+    """
+    Fans out several named symbol lists under one shared budget, e.g.
+    {"indices": [...], "stocks": [...]}, and returns the same keys with their rows.
+    """
+    everything = [s for symbols in groups.values() for s in symbols]
+    rows = {row["symbol"]: row for row in fetch_many(fetch_fn, everything, symbol_timeout, budget)}
+    return {name: [rows[s] for s in symbols if s in rows] for name, symbols in groups.items()}
@@ -0,0 +1,199 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+from common.metrics import cache_event, timed_upstream
+from common import market_calendar
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# How far back the first download for a symbol goes, per interval (Yahoo's own limits apply)
+BACKFILL = {"1m": "7d", "2m": "60d", "5m": "60d", "15m": "60d", "30m": "60d", "1h": "730d", "1d": "1y", "1wk": "5y"}
+
+# Furthest back Yahoo serves each intraday interval; older backfill requests are clamped to it
+LOOKBACK = {"1m": "7d", "2m": "59d", "5m": "59d", "15m": "59d", "30m": "59d", "1h": "729d"}
+
+# Minimum seconds between upstream top-ups of the same symbol/interval while its market
+# trades; reads inside this window are served from disk with no network at all
+MIN_SYNC_SECONDS = {"1m": 30, "2m": 60, "5m": 120, "15m": 300, "30m": 600, "1h": 900, "1d": 60, "1wk": 3600}
+
+# Intervals whose bars are keyed by the exchange-local date (stored as local midnight)
+DAILY_INTERVALS = ("1d", "5d", "1wk", "1mo", "3mo")
+
+_PERIOD = re.compile(r"^(\d+)(d|wk|mo|y)$")
+
+
+def period_start(period, now=None):
+    """Start datetime for a yfinance-style period string ("30d", "6mo", "1y", "ytd", "max")."""
+    now = now or datetime.now(timezone.utc)
+    if period == "max": return datetime(1970, 1, 2, tzinfo=timezone.utc)
+    if period == "ytd": return datetime(now.year, 1, 1, tzinfo=timezone.utc)
+    match = _PERIOD.match(period or "")
+    if not match: raise ValueError(f"Unsupported period: {period}")
+    n, unit = int(match.group(1)), match.group(2)
+    days = {"d": 1, "wk": 7, "mo": 31, "y": 366}[unit] * n
+    return now - timedelta(days=days)
+
+
+def _yf_history(symbol, interval, start=None, end=None, period=None):
+    import yfinance as yf
+    if start is not None:
+        return yf.Ticker(symbol).history(start=start, end=end, interval=interval)
+    return yf.Ticker(symbol).history(period=period, interval=interval)
+
+
+class OHLCVStore:
+    """
+    Local SQLite store of OHLCV bars per symbol and interval. Reads top up only the
+    bars after the last stored timestamp (at most once per MIN_SYNC_SECONDS) and
+    serve every range from disk.
+    """
+
+    def __init__(self, path, fetch_history=_yf_history):
+        self.path = path
+        self.fetch_history = fetch_history
+        self._local = threading.local()
+        self._sync_locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS bars (
+                symbol TEXT, interval TEXT, ts INTEGER,
+                open REAL, high REAL, low REAL, close REAL, volume REAL,
+                PRIMARY KEY (symbol, interval, ts)) WITHOUT ROWID""")
+            # covered_from: earliest start already requested upstream, so ranges before a
+            # symbol's listing date are not re-requested on every read
+            conn.execute("""CREATE TABLE IF NOT EXISTS series (
+                symbol TEXT, interval TEXT, tz TEXT, synced_at REAL, covered_from REAL,
+                PRIMARY KEY (symbol, interval))""")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30)
+        return conn
+
+    def _sync_lock(self, symbol, interval):
+        with self._locks_guard:
+            return self._sync_locks.setdefault((symbol, interval), threading.Lock())
+
+    def ingest(self, symbol, interval, hist, covered_from=None):
+        """
+        Upserts a yfinance history frame (DatetimeIndex plus OHLCV columns) into the store.
+        Tz-naive frames (yf.download) are taken as exchange-local time, and daily bars are
+        keyed by their local date, so both download paths write the same row for a day.
+        """
+        if hist is None or hist.empty or "Close" not in hist: return 0
+        hist = hist.dropna(subset=["Close"])
+        if hist.empty: return 0
+        index = hist.index
+        if index.tz is None:
+            index = index.tz_localize(self._series(symbol, interval)[0] or market_calendar.exchange_for(symbol).tz.key)
+        tz = str(index.tz)
+        if interval in DAILY_INTERVALS: index = index.normalize()
+        ts = index.tz_convert("UTC").as_unit("s").asi8
+        frame = hist.reindex(columns=COLUMNS)
+        rows = zip([symbol] * len(ts), [interval] * len(ts), ts.tolist(),
+                   *(frame[c].astype(float).tolist() for c in COLUMNS))
+        with self._conn() as conn:
+            conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            covered_from = covered_from if covered_from is not None else float(ts[0])
+            conn.execute("""INSERT INTO series VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(symbol, interval) DO UPDATE SET tz = excluded.tz, synced_at = excluded.synced_at,
+                covered_from = MIN(COALESCE(series.covered_from, excluded.covered_from), excluded.covered_from)""",
+                (symbol, interval, tz, time.time(), covered_from))
+        return len(ts)
+
+    def _series(self, symbol, interval):
+        row = self._conn().execute(
+            "SELECT tz, synced_at, covered_from, "
+            "(SELECT MIN(ts) FROM bars WHERE symbol = ? AND interval = ?), "
+            "(SELECT MAX(ts) FROM bars WHERE symbol = ? AND interval = ?) "
+            "FROM series WHERE symbol = ? AND interval = ?",
+            (symbol, interval, symbol, interval, symbol, interval)).fetchone()
+        return row or (None, None, None, None, None)
+
+    def _touch(self, symbol, interval, covered_from=None, synced=True):
+        """Records a sync attempt; creates the series row for a symbol that has no bars yet."""
+        with self._conn() as conn:
+            conn.execute("""INSERT INTO series VALUES (?, ?, NULL, ?, ?)
+                ON CONFLICT(symbol, interval) DO UPDATE SET synced_at = COALESCE(excluded.synced_at, series.synced_at),
+                covered_from = MIN(COALESCE(series.covered_from, excluded.covered_from),
+                                   COALESCE(excluded.covered_from, series.covered_from))""",
+                (symbol, interval, time.time() if synced else None, covered_from))
+
+    def _fetch(self, symbol, interval, **kwargs):
+        with timed_upstream("yahoo", "history", symbol):
+            return self.fetch_history(symbol, interval, **kwargs)
+
+    def sync(self, symbol, interval="1d", start=None):
+        """
+        Downloads only what is missing: bars before the earliest stored one when `start`
+        reaches further back than anything requested so far, and bars since the last
+        stored one (re-fetching that last, possibly partial, bar). A backfill that fails
+        or comes back empty still counts as covered, and a symbol with no bars at all
+        (unknown or delisted) is throttled like any other, so neither is re-downloaded
+        on every read.
+        """
+        added = 0
+        if start is not None and interval in LOOKBACK:
+            start = max(start, period_start(LOOKBACK[interval]).timestamp())
+        with self._sync_lock(symbol, interval):
+            _, synced_at, covered_from, first_ts, last_ts = self._series(symbol, interval)
+            if last_ts is not None and start is not None and start < covered_from - 86400:
+                try:
+                    hist = self._fetch(symbol, interval, start=datetime.fromtimestamp(start, timezone.utc),
+                                       end=datetime.fromtimestamp(first_ts, timezone.utc))
+                except Exception as e:
+                    print(f"Could not backfill {interval} bars for {symbol}: {e}")
+                    hist = None
+                if not self.ingest(symbol, interval, hist, covered_from=start):
+                    self._touch(symbol, interval, covered_from=start, synced=False)
+            # Outside trading hours a sync after the settled close stays valid until the next open
+            if synced_at is not None and time.time() < market_calendar.expires_at(
+                    symbol, synced_at, MIN_SYNC_SECONDS.get(interval, 60)):
+                cache_event("ohlcv", "hit")
+                return added
+            cache_event("ohlcv", "miss")
+            if last_ts is None:
+                backfill = BACKFILL.get(interval, "1y")
+                covered = period_start(backfill).timestamp()
+                try:
+                    hist = self._fetch(symbol, interval, period=backfill)
+                except Exception:
+                    self._touch(symbol, interval, covered_from=covered)
+                    raise
+                added = self.ingest(symbol, interval, hist, covered_from=covered)
+                if not added: self._touch(symbol, interval, covered_from=covered)
+            else:
+                hist = self._fetch(symbol, interval, start=datetime.fromtimestamp(last_ts, timezone.utc))
+                added = self.ingest(symbol, interval, hist)
+                if not added: self._touch(symbol, interval)
+            return added
+
+    def get(self, symbol, interval="1d", period="30d", sync=True):
+        """Bars for the last `period` as a DataFrame indexed in the symbol's exchange timezone."""
+        import pandas as pd
+        start = int(period_start(period).timestamp())
+        if sync:
+            try:
+                self.sync(symbol, interval, start)
+            except Exception as e:
+                print(f"Could not sync {interval} bars for {symbol}, serving stored data: {e}")
+        rows = self._conn().execute(
+            "SELECT ts, open, high, low, close, volume FROM bars "
+            "WHERE symbol = ? AND interval = ? AND ts >= ? ORDER BY ts", (symbol, interval, start)).fetchall()
+        if not rows: return pd.DataFrame(columns=COLUMNS)
+        tz = self._series(symbol, interval)[0] or "UTC"
+        frame = pd.DataFrame(rows, columns=["ts"] + COLUMNS)
+        frame.index = pd.to_datetime(frame.pop("ts"), unit="s", utc=True).dt.tz_convert(tz)
+        frame.index.name = "Date"
+        if interval in DAILY_INTERVALS:
+            # Stores written before daily bars were keyed by date can hold a day twice; keep the latest row
+            frame.index = frame.index.normalize()
+            frame = frame[~frame.index.duplicated(keep="last")]
+        return frame
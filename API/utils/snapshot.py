@@ -0,0 +1,186 @@
+import time
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+
+from common.metrics import cache_event
+from common.encoded import EncodedObject, dumps, loads
+from common.startup import save_snapshot, load_snapshot, process_uptime
+
+FOLLOW_INTERVAL = 2   # seconds between a follower's checks for a newer shared snapshot
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """One fully built market view. The payload is never mutated after it is published."""
+    payload: dict
+    generated_at: datetime
+    build_seconds: float
+    monotonic: float
+    encoded: EncodedObject = None   # payload serialized once, with a "snapshot" status key filled per request
+    variants: dict = None           # {currency: EncodedObject} of the payload converted by the refresher's `convert`
+    restored: bool = False          # loaded from disk at startup, served stale until the first refresh
+
+    def age(self):
+        return time.monotonic() - self.monotonic
+
+
+class SnapshotRefresher:
+    """
+    Rebuilds a snapshot with build_fn every `interval` seconds on a daemon thread.
+    Readers always get the latest published snapshot, even while a rebuild is running
+    (stale-while-revalidate); only the very first read waits for a build.
+
+    With `shared` (common.shared_store), only the worker holding the refresher
+    lease builds; it publishes each snapshot and the other workers adopt it.
+    `convert(payload)` returns {currency: payload} for ?currency= variants, which
+    are serialized alongside each snapshot, built or adopted.
+
+    With `path`, every built snapshot is saved there and the last one is restored
+    at startup, so the first read is answered at once (marked stale) while the
+    first refresh runs. `startup` (common.startup.StartupReport) gets its
+    "first_refresh" phase marked when the first fresh snapshot arrives.
+    """
+
+    def __init__(self, name, build_fn, interval=60, shared=None, convert=None, path=None, startup=None):
+        self.name = name
+        self.build_fn = build_fn
+        self.interval = interval
+        self.shared = shared
+        self.convert = convert
+        self.path = path
+        self.startup = startup
+        self.shared_version = 0
+        self.listeners = []   # called with each snapshot this process builds (not ones adopted from the leader)
+        self.snapshot = self.restore() if path else None
+        self.refreshing = False
+        self.last_error = None
+        self._wake = threading.Event()
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"snapshot-{self.name}", daemon=True)
+                self._thread.start()
+        return self
+
+    def trigger(self):
+        """Asks the refresher thread to rebuild now instead of waiting out the interval."""
+        self.start()
+        self._wake.set()
+
+    def get(self, timeout=None):
+        """Returns the latest snapshot, waiting for the first build if none exists yet."""
+        snapshot = self.snapshot
+        if snapshot is None:
+            cache_event(self.name, "miss")
+            self.start()
+            self._ready.wait(timeout)
+            return self.snapshot
+        if self._thread is None: self.start()   # a restored snapshot is served while the first refresh runs
+        cache_event(self.name, "stale" if snapshot.restored or snapshot.age() > self.interval else "hit")
+        return snapshot
+
+    def status(self, snapshot=None):
+        snapshot = snapshot or self.snapshot
+        age = snapshot.age() if snapshot else None
+        return {
+            "generated_at": snapshot.generated_at.isoformat() if snapshot else None,
+            "age_seconds": round(age, 1) if snapshot else None,
+            "build_seconds": round(snapshot.build_seconds, 2) if snapshot else None,
+            "stale": snapshot is None or snapshot.restored or self.refreshing or age > self.interval,
+            "restored": snapshot is not None and snapshot.restored,
+            "refreshing": self.refreshing,
+            "last_error": self.last_error,
+        }
+
+    def _snapshot(self, payload, generated_at, build_seconds, monotonic, converted=None, restored=False):
+        if converted is None and self.convert is not None:
+            try:
+                converted = self.convert(payload)
+            except Exception as e:
+                print(f"❌ {self.name} currency conversion failed: {e}")
+        variants = {currency: EncodedObject(p, "snapshot", self.name) for currency, p in converted.items()} \
+            if converted is not None else None
+        return Snapshot(payload, generated_at, build_seconds, monotonic,
+                        EncodedObject(payload, "snapshot", self.name), variants, restored)
+
+    def restore(self):
+        """The snapshot saved at self.path by the last refresh, marked restored, or None."""
+        saved = load_snapshot(self.path)
+        if saved is None: return None
+        try:
+            monotonic = time.monotonic() - max(0.0, time.time() - saved["saved_at"])
+            snapshot = self._snapshot(saved["payload"], datetime.fromisoformat(saved["generated_at"]),
+                                      saved["build_seconds"], monotonic, saved.get("variants"), restored=True)
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"⚠️ {self.name}: ignoring saved snapshot: {e}")
+            return None
+        print(f"💾 {self.name}: restored snapshot from {snapshot.generated_at:%Y-%m-%d %H:%M:%S}, serving it until the first refresh")
+        return snapshot
+
+    def save(self, snapshot):
+        variants = {c: e.payload for c, e in snapshot.variants.items()} if snapshot.variants is not None else None
+        try:
+            save_snapshot(self.path, {"payload": snapshot.payload, "variants": variants, "saved_at": time.time(),
+                                      "generated_at": snapshot.generated_at.isoformat(),
+                                      "build_seconds": snapshot.build_seconds})
+        except OSError as e:
+            print(f"❌ {self.name}: could not save snapshot: {e}")
+
+    def leader(self):
+        return self.shared is None or self.shared.is_leader()
+
+    def refresh(self):
+        if not self.leader(): return self.follow()
+        self.refreshing = True
+        started = time.monotonic()
+        try:
+            payload = self.build_fn()
+            build_seconds = time.monotonic() - started
+            self.snapshot = self._snapshot(payload, datetime.now(), build_seconds, time.monotonic())
+            self.last_error = None
+            if self.shared is not None:
+                meta = dumps({"generated_at": self.snapshot.generated_at.isoformat(), "build_seconds": build_seconds})
+                self.shared_version = self.shared.publish(self.name, dumps(payload), meta=meta)
+            print(f"📸 {self.name} snapshot rebuilt in {self.snapshot.build_seconds:.1f}s")
+            if self.path: self.save(self.snapshot)
+            if self.startup: self.startup.mark("first_refresh")
+            for listener in self.listeners:
+                try:
+                    listener(self.snapshot)
+                except Exception as e:
+                    print(f"❌ {self.name} snapshot listener failed: {e}")
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"❌ {self.name} snapshot refresh failed: {e}")
+        finally:
+            self.refreshing = False
+            self._ready.set()
+
+    def follow(self):
+        """Adopts the leader's snapshot if it published a newer one."""
+        try:
+            row = self.shared.read(self.name, self.shared_version)
+            if row is None: return
+            payload, meta = loads(row.data), loads(row.meta)
+            published = time.monotonic() - max(0.0, time.time() - row.published_at)
+            self.snapshot = self._snapshot(payload, datetime.fromisoformat(meta["generated_at"]),
+                                           meta["build_seconds"], published)
+            self.shared_version = row.version
+            self.last_error = None
+            self._ready.set()
+            # A row left in the shared store by the previous run is not a refresh
+            if self.startup and row.published_at > time.time() - process_uptime(): self.startup.mark("first_refresh")
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"❌ {self.name} shared snapshot read failed: {e}")
+
+    def _run(self):
+        while True:
+            self.refresh()
+            self._wake.wait(self.interval if self.leader() else FOLLOW_INTERVAL)
+            self._wake.clear()
@@ -1,8 +1,32 @@
+import os
+import sys
+import math
+import atexit
 import requests
-from flask import Flask, jsonify, render_template
+import threading
+from flask import Flask, jsonify, render_template, request, Response, stream_with_context
 from flask_cors import CORS
 import time
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.snapshot_cache import SnapshotCache
+from common import metrics
+from common.upstream import UpstreamClient
+from common.scheduler import TokenBucket
+from common.encoded import Encoded, EncodedCache, respond, dumps, loads
+from common.shared_store import shared_snapshots
+from common.alerts import AlertEngine, ticker_prices
+from common.metadata_cache import CACHE_DIR
+from common.fx import FXTable, CURRENCIES, convert_rows
+from common.startup import StartupReport, save_snapshot, load_snapshot
+from market_store import MarketStore, MONEY_FIELDS, query_coins, sortable
+from stream import Broadcaster, MAX_SUBSCRIBERS, FULL_RETRY_MS
+from indicators import TickHistory
+
+# Seconds from process start to import, first /api/data response and first fresh CoinGecko data, per boot
+startup = StartupReport("crypto1")
 
 # Initialize the Flask app
 app = Flask(__name__)
@@ -17,12 +41,193 @@ CORS(app, origins=[
     "http://localhost:5000", "http://127.0.0.1:5000"   # This Flask app
 ])
 
-# Cache for storing API responses
-cache = {
-    'data': None,
-    'timestamp': None,
-    'cache_duration': 10  # Cache for 10 seconds for more real-time data
-}
+# /metrics (Prometheus text), /metrics/profile and per-route latency histograms
+metrics.install(app)
+
+# Overridable so benchmarks can point the service at a local stand-in
+COINGECKO_API_URL = os.environ.get("COINGECKO_API_URL", "https://api.coingecko.com/api/v3")
+COINGECKO_MARKETS_URL = (
+    f"{COINGECKO_API_URL}/coins/markets"
+    "?vs_currency=usd&order=market_cap_desc&per_page={per_page}&page={page}"
+)
+PER_PAGE = 250                                                   # CoinGecko's maximum page size
+TOP_N = max(1, min(int(os.environ.get("CRYPTO1_TOP_N", 50)), 5000))  # coins kept, by market cap (up to 5000)
+PAGES = math.ceil(TOP_N / PER_PAGE)
+CALLS_PER_MINUTE = 20        # CoinGecko's free tier allows roughly 30; stay well inside it
+CACHE_DURATION = max(10, math.ceil(PAGES * 60 / CALLS_PER_MINUTE))  # 10s for up to 3 pages, longer beyond
+MIN_REFRESH_INTERVAL = 2     # /api/refresh calls closer together than this share one fetch
+QUERY_ARGS = ('symbols', 'fields', 'sort', 'limit')   # /api/data parameters that select a subset
+STARTUP_WAIT = 30            # seconds a follower worker waits for the refresher's first snapshot
+TICKS_PATH = os.path.join(CACHE_DIR, "crypto1_ticks.npz")   # tick history survives restarts here
+MARKETS_PATH = os.path.join(CACHE_DIR, "crypto1_markets.json.gz")   # last coin list, served stale after a restart
+SAVE_EVERY = 6               # ticks between tick-history and coin-list snapshots to disk
+
+# Pooled keep-alive client; retries 429/5xx with backoff and respects Retry-After
+coingecko = UpstreamClient("coingecko", timeout=15)
+
+# One token per page; the poller plus /api/refresh stay inside CALLS_PER_MINUTE
+coingecko_budget = TokenBucket(rate=CALLS_PER_MINUTE / 60, capacity=PAGES + 4)
+
+# Pages of one refresh are fetched concurrently (the client caps in-flight requests per host)
+page_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="coingecko-page")
+
+# Versioned snapshot of the latest CoinGecko data
+store = MarketStore()
+
+
+def restore_markets():
+    """Seeds the store with the coin list saved before the last shutdown, so the first request needs no fetch."""
+    saved = load_snapshot(MARKETS_PATH)
+    if saved is None: return
+    try:
+        state = store.restore(saved["coins"], saved["version"], datetime.fromisoformat(saved["last_modified"]),
+                              datetime.fromisoformat(saved["fetched_at"]))
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"⚠️ Ignoring saved coin list: {e}")
+        return
+    print(f"💾 Restored {len(state.coins)} coins (version {state.version}, fetched {state.fetched_at:%Y-%m-%d %H:%M:%S} UTC), "
+          "serving them until the first fetch")
+
+restore_markets()
+
+# With several workers, only the one holding the "crypto1" lease calls CoinGecko; the rest adopt its versions
+shared = shared_snapshots("crypto1")
+
+# Response bodies serialized and compressed once per (data version, request variant)
+encoded_cache = EncodedCache()
+
+# Pushes every new store version to /api/stream subscribers; each open stream holds a server thread
+broadcaster = Broadcaster(max_subscribers=int(os.environ.get("CRYPTO1_MAX_STREAMS", MAX_SUBSCRIBERS)))
+store.listeners.append(broadcaster.publish)
+
+# Per-coin price/volume ring buffers and streaming indicators, one tick per store version
+history = TickHistory.load(TICKS_PATH)
+
+
+def save_history():
+    """Writes the tick history and the latest coin list to disk, for a warm restart."""
+    try:
+        history.save(TICKS_PATH)
+    except OSError as e:
+        print(f"❌ Could not save tick history: {e}")
+    state = store.state
+    if state is None or state.restored: return
+    try:
+        save_snapshot(MARKETS_PATH, {"coins": state.coins, "version": state.version,
+                                     "last_modified": state.last_modified.isoformat(),
+                                     "fetched_at": state.fetched_at.isoformat()})
+    except OSError as e:
+        print(f"❌ Could not save coin list: {e}")
+
+
+def record_tick(state):
+    """MarketStore listener: appends the new version to the tick history, saving it every SAVE_EVERY ticks."""
+    startup.mark("first_refresh")
+    history.record(state.coins, state.fetched_at.timestamp())
+    # Every worker keeps its own history; only the refresher writes the files
+    if history.ticks % SAVE_EVERY == 0 and shared.is_leader():
+        threading.Thread(target=save_history, name="tick-history-save", daemon=True).start()
+
+store.listeners.append(record_tick)
+
+# Exchange rates on their own hourly TTL; each new version is converted into every configured currency once
+fx = FXTable("CoinGecko", coingecko, shared, budget=coingecko_budget, base_url=COINGECKO_API_URL)
+
+# Price alerts on crypto tickers, checked once per new version against only the coins whose price moved;
+# targets set in INR or EUR are compared through the FX table, and an alert another service fired is skipped
+alerts = AlertEngine("crypto1", fx=fx, claims=shared)
+
+
+def check_alerts(state):
+    """MarketStore listener: the refresher worker evaluates alerts; the others serve its events."""
+    if shared.is_leader():
+        alerts.evaluate(ticker_prices(state.changed, "symbol", "current_price", "USD"))
+
+store.listeners.append(check_alerts)
+
+views = {}   # currency -> the latest store version in that currency
+
+
+def convert_views(state):
+    """MarketStore listener: precomputes the new version in each configured currency besides USD."""
+    rates = fx.rates()
+    if rates is None: return
+    for currency in CURRENCIES:
+        if currency != "USD": views[currency] = state.converted(currency, rates[currency])
+
+store.listeners.append(convert_views)
+atexit.register(lambda: history.ticks and shared.is_leader() and save_history())
+
+
+class MarketDataUnavailable(RuntimeError):
+    """No CoinGecko data can be fetched right now (budget exhausted, or the refresher has not published yet)."""
+
+
+def fetch_page(page):
+    per_page = min(PER_PAGE, TOP_N)
+    return coingecko.get_json(COINGECKO_MARKETS_URL.format(per_page=per_page, page=page), "markets")
+
+
+def adopt_shared(timeout=0):
+    """Publishes the refresher worker's snapshot into the local store if it is newer than ours."""
+    row = shared.wait("markets", store.state.version if store.state else 0, timeout)
+    if row is not None:
+        meta = loads(row.meta)
+        store.publish(loads(row.data), row.version, datetime.fromisoformat(meta["last_modified"]))
+    return store.state
+
+
+def fetch_markets():
+    """Fetches the top TOP_N coins from CoinGecko, page by page in parallel, and publishes them as a new store version."""
+    if not shared.is_leader():
+        state = adopt_shared(0 if store.state else STARTUP_WAIT)
+        if state is None: raise MarketDataUnavailable("The refresher worker has not published CoinGecko data yet")
+        return state
+    # A newly elected refresher continues from the last shared version, and keeps polling
+    # even when every request lands on another worker
+    adopt_shared()
+    start_poller()
+    if not coingecko_budget.try_acquire(PAGES):
+        # SnapshotCache keeps serving the previous version until the budget refills
+        raise MarketDataUnavailable("CoinGecko request budget exhausted")
+    coins, seen = [], set()
+    # Ranks can shift between page requests; keep each coin once, in market-cap order
+    for page in page_pool.map(fetch_page, range(1, PAGES + 1)):
+        for coin in page:
+            if coin.get("id") not in seen:
+                seen.add(coin.get("id"))
+                coins.append(coin)
+    coins = coins[:TOP_N]
+    previous = store.state
+    state = store.publish(coins)
+    if previous is None or state.version != previous.version:
+        shared.publish("markets", dumps(coins), state.version, dumps({"last_modified": state.last_modified.isoformat()}))
+    print(f"✅ Successfully fetched {len(coins)} coins from CoinGecko (version {state.version})")
+    return state
+
+
+# Single-flight cache: however many requests arrive when the TTL expires, CoinGecko is called once
+cache = SnapshotCache("CoinGecko", fetch_markets, CACHE_DURATION, MIN_REFRESH_INTERVAL)
+
+_poller = {'thread': None, 'lock': threading.Lock()}
+
+
+def poll_loop():
+    """Background CoinGecko poller that keeps the store (and so the stream) ticking."""
+    while True:
+        try:
+            cache.get()
+        except Exception as e:
+            print(f"❌ Background poll failed: {e}")
+        time.sleep(CACHE_DURATION)
+
+
+def start_poller():
+    """Starts the single background poller on first use; safe to call from every request."""
+    with _poller['lock']:
+        if _poller['thread'] is None:
+            _poller['thread'] = threading.Thread(target=poll_loop, name="coingecko-poller", daemon=True)
+            _poller['thread'].start()
 
 # Route to serve the main HTML page
 @app.route('/')
@@ -30,51 +235,203 @@ def index():
     """Renders the main HTML page."""
     return render_template('index.html')
 
-# Route to act as a proxy for the CoinGecko API
-@app.route('/api/data')
-def get_crypto_data():
-    """Fetches crypto data from the CoinGecko API and returns it as JSON."""
-    
-    # Check if we have cached data that's still valid
-    now = datetime.now()
-    if (cache['data'] is not None and 
-        cache['timestamp'] is not None and 
-        (now - cache['timestamp']).total_seconds() < cache['cache_duration']):
-        
-        print(f"🔄 Returning cached data (age: {(now - cache['timestamp']).total_seconds():.1f}s)")
-        return jsonify(cache['data'])
-    
-    # Fetch fresh data from CoinGecko
-    url = (
-        "https://api.coingecko.com/api/v3/coins/markets"
-        "?vs_currency=usd&order=market_cap_desc&per_page=50&page=1"
-    )
+
+def not_modified(state):
+    """True when the client's If-None-Match / If-Modified-Since already matches this version."""
+    if request.if_none_match:
+        return request.if_none_match.contains(state.etag)
+    if request.if_modified_since:
+        return request.if_modified_since >= state.last_modified
+    return False
+
+
+def encoded_body(state, variant, build):
+    """The pre-serialized body for this data version, currency and request variant, built on first use."""
+    return encoded_cache.get((state.version, state.currency, variant), lambda: Encoded(build(), "crypto"))
+
+
+def conditional_response(state, variant="all", build=None):
+    """Returns a bodyless 304 when the client already has this version, else the body from `build` (default: all coins)."""
+    if not_modified(state):
+        response = Response(status=304)
+    else:
+        response = respond(encoded_body(state, variant, build or (lambda: state.coins)))
+    response.set_etag(state.etag)
+    response.last_modified = state.last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Data-Version'] = str(state.version)
+    response.headers['X-Currency'] = state.currency
+    if state.restored: response.headers['X-Data-Stale'] = 'restored'
+    return response
+
+
+def get_market_state(force=False):
+    state = store.state
+    if state is not None and state.restored and not force:
+        # Saved before the last shutdown: answer now and let the poller fetch in the background
+        start_poller()
+        return state, None
     try:
-        print("🌐 Fetching fresh data from CoinGecko API...")
-        response = requests.get(url, timeout=15)
-        # Raise an HTTPError for bad responses (4xx or 5xx)
-        response.raise_for_status()
-        coins = response.json()
-        
-        # Update cache
-        cache['data'] = coins
-        cache['timestamp'] = now
-        
-        print(f"✅ Successfully fetched {len(coins)} coins from CoinGecko")
-        return jsonify(coins)
-        
+        return cache.get(force=force), None
     except requests.exceptions.RequestException as e:
         print(f"❌ Error fetching from CoinGecko: {str(e)}")
-        
-        # If we have cached data, return it even if it's old
-        if cache['data'] is not None:
-            print("⚠️ Returning stale cached data due to API error")
-            return jsonify(cache['data'])
-        
         # Handle network-related errors
         error_message = {"error": "Failed to fetch data from CoinGecko API", "details": str(e)}
         # Return a 502 Bad Gateway status code
-        return jsonify(error_message), 502
+        return None, (jsonify(error_message), 502)
+    except MarketDataUnavailable as e:
+        # Only reached with nothing cached; once data exists SnapshotCache serves it stale instead
+        return None, (jsonify({"error": "Market data is not available yet", "details": str(e)}), 503)
+
+
+def in_currency(state):
+    """The state in the requested ?currency= (default USD): the precomputed view, or converted now if it lags."""
+    currency = request.args.get('currency', 'USD').upper()
+    if currency not in CURRENCIES:
+        return None, (jsonify({"error": f"Unsupported currency: {currency}", "currencies": list(CURRENCIES)}), 400)
+    if currency == "USD": return state, None
+    view = views.get(currency)
+    if view is not None and view.version == state.version: return view, None
+    rates = fx.rates()
+    if rates is None:
+        return None, (jsonify({"error": "Exchange rates are not available yet"}), 503)
+    view = state.converted(currency, rates[currency])
+    views[currency] = view
+    return view, None
+
+
+def delta_response(state, since):
+    """Coins changed since `since`, or a full snapshot when that version has left the history."""
+    def build():
+        delta = store.delta_since(since)
+        if delta is None:
+            return {"version": state.version, "since": since, "full": True, "currency": state.currency,
+                    "coins": state.coins}
+        return {**delta, "currency": state.currency, "changed": convert_rows(delta["changed"], MONEY_FIELDS, state.rate)}
+    response = respond(encoded_body(state, ("since", since), build))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Data-Version'] = str(state.version)
+    response.headers['X-Currency'] = state.currency
+    if state.restored: response.headers['X-Data-Stale'] = 'restored'
+    return response
+
+
+def int_arg(name):
+    """?name= as a non-negative int (None when absent), or a 400 response for any other value."""
+    value = request.args.get(name)
+    if value is None: return None, None
+    if not value.strip().isdigit():
+        return None, (jsonify({"error": f"{name} must be a non-negative integer"}), 400)
+    return int(value), None
+
+
+def split_arg(name):
+    value = request.args.get(name, '')
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+def query_response(state):
+    """
+    /api/data?symbols=btc,eth&fields=symbol,current_price&sort=-total_volume&limit=20
+    Symbols are ids, tickers or ranks; sort takes any coin field, "-" for descending.
+    """
+    limit, error = int_arg('limit')
+    if error: return error
+    sort = request.args.get('sort')
+    if sort is not None and not sortable(state.coins, sort.lstrip('-')):
+        return jsonify({"error": f"Cannot sort by {sort}"}), 400
+    query = lambda: query_coins(state, split_arg('symbols'), split_arg('fields'), sort, limit)
+    return conditional_response(state, ("query", request.query_string), query)
+
+
+# Route to act as a proxy for the CoinGecko API
+@app.route('/api/data')
+def get_crypto_data():
+    """
+    Returns the cached CoinGecko market data, or 304 if the client is up to date.
+    With ?since=<version>, returns only the coins changed after that version;
+    with symbols/fields/sort/limit, only the selected rows and columns;
+    with ?currency=INR or EUR, prices, caps and volumes in that currency.
+    """
+    state, error = get_market_state()
+    if error: return error
+    state, error = in_currency(state)
+    if error: return error
+    startup.mark("first_response", restored=state.restored)
+    since, error = int_arg('since')
+    if error: return error
+    if since is not None:
+        return delta_response(state, since)
+    if any(arg in request.args for arg in QUERY_ARGS):
+        return query_response(state)
+    return conditional_response(state)
+
+# Single-coin lookup through the id / symbol / rank indexes
+@app.route('/api/coin/<key>')
+def get_coin(key):
+    """One coin by CoinGecko id, ticker symbol or market-cap rank, e.g. /api/coin/btc?currency=INR."""
+    state, error = get_market_state()
+    if error: return error
+    state, error = in_currency(state)
+    if error: return error
+    coin = state.lookup(key)
+    if coin is None:
+        return jsonify({"error": f"Coin {key} is not in the top {TOP_N}"}), 404
+    fields = split_arg('fields')
+    return conditional_response(state, ("coin", coin.get("id"), tuple(fields)),
+                                lambda: {f: coin[f] for f in fields if f in coin} if fields else coin)
+
+# Streaming indicators from the tick history
+@app.route('/api/indicators')
+def get_indicators():
+    """
+    EMA, RSI, VWAP, rolling high/low and volatility per coin over the last WINDOW ticks.
+    ?symbols=btc,eth picks coins (default: all, by rank), ?limit=N caps the count and
+    ?series=true adds the buffered price/volume ticks.
+    """
+    state, error = get_market_state()
+    if error: return error
+    limit, error = int_arg('limit')
+    if error: return error
+    series = request.args.get('series', '').lower() in ('1', 'true', 'yes')
+
+    def build():
+        rows = []
+        for coin in query_coins(state, split_arg('symbols'), limit=limit):
+            row = history.indicators(coin["id"])
+            if row is None: continue
+            row["symbol"] = coin.get("symbol")
+            if series: row["series"] = history.series(coin["id"])
+            rows.append(row)
+        return {"version": state.version, "window": history.capacity, "ticks": history.ticks, "coins": rows}
+    return conditional_response(state, ("indicators", history.ticks, request.query_string), build)
+
+# Triggered price alerts
+@app.route('/api/alerts/events')
+def alert_events():
+    """Recently triggered price alerts on crypto tickers, newest first (?limit=, default 50)."""
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({"alerts": alerts.status(), "events": alerts.recent(max(0, limit))})
+
+# Server-Sent Events price stream
+@app.route('/api/stream')
+def stream_prices():
+    """
+    Streams a snapshot, then per-tick diffs of changed coins, with heartbeats in between.
+    Needs a threaded (or gevent) server; past CRYPTO1_MAX_STREAMS open streams it answers 503.
+    """
+    if not broadcaster.has_room():
+        response = jsonify({"error": "Too many open price streams, try again later",
+                            "max_streams": broadcaster.max_subscribers})
+        response.headers['Retry-After'] = str(FULL_RETRY_MS // 1000)
+        return response, 503
+    start_poller()
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    return Response(
+        stream_with_context(broadcaster.subscribe(last_event_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 # Health check endpoint
 @app.route('/health')
@@ -85,10 +442,14 @@ def health_check():
         "service": "CRYPTO1 Flask App",
         "timestamp": datetime.now().isoformat(),
         "cache_status": {
-            "has_data": cache['data'] is not None,
-            "last_updated": cache['timestamp'].isoformat() if cache['timestamp'] else None,
-            "cache_age_seconds": (datetime.now() - cache['timestamp']).total_seconds() if cache['timestamp'] else None
-        }
+            "has_data": store.state is not None,
+            "last_updated": store.state.fetched_at.isoformat() if store.state else None,
+            "cache_age_seconds": cache.age(),
+            "data_version": store.state.version if store.state else None,
+            "restored": store.state is not None and store.state.restored
+        },
+        "stream_subscribers": broadcaster.subscribers,
+        "startup": startup.status()
     })
 
 # API status endpoint
@@ -101,39 +462,48 @@ def api_status():
         "description": "CRYPTO1 - Real-time Cryptocurrency Data Service",
         "endpoints": {
             "/": "Web interface",
-            "/api/data": "Cryptocurrency market data",
+            "/api/data": "Cryptocurrency market data (?since=<version> for changes only; "
+                         "?symbols=&fields=&sort=&limit= to filter; ?currency=INR|USD|EUR)",
+            "/api/coin/<symbol>": "One coin by symbol, CoinGecko id or rank",
+            "/api/stream": "Server-Sent Events stream of price/volume/rank changes",
+            "/api/alerts/events": "Recently triggered price alerts on crypto tickers",
+            "/api/indicators": "EMA/RSI/VWAP/high/low/volatility per coin from recent ticks "
+                               "(?symbols=&limit=&series=true)",
             "/api/refresh": "Force cache refresh",
             "/health": "Health check",
-            "/api/status": "API status information"
+            "/api/status": "API status information",
+            "/metrics": "Prometheus metrics (/metrics/profile for the sampling profiler)"
         },
         "data_source": "CoinGecko API",
-        "cache_ttl_seconds": cache['cache_duration'],
-        "supported_currencies": ["USD (converted to INR by TickerTracker)"],
-        "max_coins": 50
+        "cache_ttl_seconds": CACHE_DURATION,
+        "supported_currencies": list(CURRENCIES),
+        "exchange_rates": fx.status(),
+        "max_coins": TOP_N
     })
 
 # Force cache refresh endpoint
 @app.route('/api/refresh')
 def refresh_cache():
     """Force a cache refresh to get the latest data immediately."""
-    global cache
-    
-    # Clear the cache to force fresh data
-    cache['data'] = None
-    cache['timestamp'] = None
-    
-    print("🔄 Cache cleared - forcing fresh data fetch...")
-    
-    # Get fresh data
-    return get_crypto_data()
+    print("🔄 Forcing fresh data fetch...")
+
+    # Concurrent refreshes share one in-flight fetch instead of each hitting CoinGecko
+    state, error = get_market_state(force=True)
+    if error: return error
+    return conditional_response(state)
+
+startup.mark("imported")
 
 if __name__ == '__main__':
     print("🚀 Starting CRYPTO1 Flask App...")
     print("📊 Endpoints available:")
     print("   - Web UI: http://127.0.0.1:5000/")
     print("   - API Data: http://127.0.0.1:5000/api/data")
+    print("   - Coin Lookup: http://127.0.0.1:5000/api/coin/btc")
+    print("   - Price Stream: http://127.0.0.1:5000/api/stream")
     print("   - Health Check: http://127.0.0.1:5000/health")
     print("   - API Status: http://127.0.0.1:5000/api/status")
+    print("   - Metrics: http://127.0.0.1:5000/metrics")
     print("🔗 Integrated with TickerTracker backend on port 5004")
     # Runs the app on http://127.0.0.1:5000
-    app.run(debug=True, port=5000, host='127.0.0.1')
\ No newline at end of file
+    app.run(debug=True, port=5000, host='127.0.0.1', threaded=True)
\ No newline at end of file
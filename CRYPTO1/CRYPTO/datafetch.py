@@ -1,29 +1,45 @@
 import requests
+import argparse
+import threading
+import json
 import time
 import os
+import sys
+
+try:
+    import curses
+except ImportError:  # Windows needs `pip install windows-curses` for --monitor
+    curses = None
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.upstream import UpstreamClient
 
 # API URL for CoinGecko
 URL = (
-    "https://api.coingecko.com/api/v3/coins/markets"
+    f"{os.environ.get('COINGECKO_API_URL', 'https://api.coingecko.com/api/v3')}/coins/markets"
     "?vs_currency=usd&order=market_cap_desc&per_page=50&page=1"
 )
 
+# Local CRYPTO1 service that --monitor subscribes to
+SERVICE_URL = os.environ.get("CRYPTO1_URL", "http://localhost:5000")
+
+FLASH_SECONDS = 2      # how long a price move stays highlighted
+IDLE_POLL_MS = 200     # key/update check interval while nothing changes; no redraw happens then
+RECONNECT_SECONDS = 3
+
+# One keep-alive connection reused across refreshes, with backoff on 429/5xx
+client = UpstreamClient("coingecko", timeout=10)
+
 def clear_screen():
-    """Clears the terminal screen for a clean refresh."""
-    # For Windows
-    if os.name == 'nt':
-        _ = os.system('cls')
-    # For macOS and Linux
-    else:
-        _ = os.system('clear')
+    """Clears the terminal screen for a clean refresh (ANSI home + erase, no shell fork)."""
+    sys.stdout.write("\033[H\033[2J")
+    sys.stdout.flush()
 
 def fetch_and_print_data():
     """Fetches data from the API and prints a formatted table to the console."""
     try:
-        # Make the API request with a 10-second timeout
-        response = requests.get(URL, timeout=10)
-        response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-        coins = response.json()
+        # Raises for bad status codes (4xx or 5xx) once retries are exhausted
+        coins = client.get_json(URL, "markets")
 
         clear_screen()
         print("🟢 Top 50 Crypto Prices (USD) - Live")
@@ -50,10 +66,227 @@ def fetch_and_print_data():
         clear_screen()
         print(f"🟡 Data Error: Unexpected data format from API (missing key: {e}).")
 
-if __name__ == "__main__":
+
+# --- Live monitor of the local CRYPTO1 service ---
+
+def sse_events(response):
+    """Yields (event, id, data) for each Server-Sent Events frame of a streaming response."""
+    event, event_id, data = "message", None, []
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if not line:
+            if data:
+                yield event, event_id, "\n".join(data)
+            event, data = "message", []
+            continue
+        if line.startswith(":"): continue   # heartbeat comment
+        field, _, value = line.partition(":")
+        value = value[1:] if value.startswith(" ") else value
+        if field == "event": event = value
+        elif field == "data": data.append(value)
+        elif field == "id": event_id = value
+
+
+class Board:
+    """
+    Coins from /api/stream, kept in rank order, plus when and which way each
+    price last moved. Filled by the stream thread, read by the screen loop.
+    """
+
+    def __init__(self):
+        self.coins = {}
+        self.order = []
+        self.moves = {}        # coin id -> (+1 or -1, time.monotonic() of the move)
+        self.version = None
+        self.status = "connecting..."
+        self.updated = threading.Event()
+        self._lock = threading.Lock()
+
+    def _sort(self):
+        self.order = sorted(self.coins, key=lambda i: (self.coins[i].get("market_cap_rank") or 10 ** 9, i))
+
+    def _move(self, coin, now):
+        old = self.coins.get(coin["id"], {}).get("current_price")
+        new = coin.get("current_price")
+        if old is not None and new is not None and old != new:
+            self.moves[coin["id"]] = (1 if new > old else -1, now)
+
+    def load(self, snapshot):
+        now = time.monotonic()
+        with self._lock:
+            for coin in snapshot["coins"]:
+                self._move(coin, now)
+            self.coins = {coin["id"]: coin for coin in snapshot["coins"]}
+            self.version = snapshot["version"]
+            self._sort()
+        self.updated.set()
+
+    def apply(self, diff):
+        now = time.monotonic()
+        with self._lock:
+            for coin in diff["changed"]:
+                self._move(coin, now)
+                self.coins[coin["id"]] = coin
+            for coin_id in diff["removed"]:
+                self.coins.pop(coin_id, None)
+            self.version = diff["version"]
+            self._sort()
+        self.updated.set()
+
+    def set_status(self, status):
+        self.status = status
+        self.updated.set()
+
+    def view(self, query=""):
+        """
+        What one redraw reads, copied under the lock: coins in rank order whose name,
+        symbol or id contains query, the price highlights, version, status and coin count.
+        """
+        query = query.lower()
+        with self._lock:
+            coins = [self.coins[i] for i in self.order]
+            state = {"moves": dict(self.moves), "version": self.version, "status": self.status, "total": len(self.coins)}
+        if query:
+            coins = [c for c in coins if query in c.get("symbol", "").lower() or query in c.get("name", "").lower()
+                     or query in c["id"]]
+        state["rows"] = coins
+        return state
+
+    def next_fade(self, now):
+        """Seconds until the oldest highlight fades, or None when nothing is highlighted."""
+        with self._lock:
+            live = [at + FLASH_SECONDS - now for _, at in self.moves.values() if at + FLASH_SECONDS > now]
+        return min(live) if live else None
+
+
+def follow_stream(base_url, board, stop):
+    """Keeps the board in sync with /api/stream, resuming via Last-Event-ID after a drop."""
+    session = requests.Session()
+    last_id = None
+    while not stop.is_set():
+        headers = {"Accept": "text/event-stream"}
+        if last_id: headers["Last-Event-ID"] = last_id
+        try:
+            # The service sends a heartbeat every 15s, so a longer silence means the connection is dead
+            with session.get(f"{base_url}/api/stream", headers=headers, stream=True, timeout=(5, 40)) as response:
+                response.raise_for_status()
+                board.set_status("live")
+                for event, event_id, data in sse_events(response):
+                    if event_id: last_id = event_id
+                    if event == "snapshot": board.load(json.loads(data))
+                    elif event == "diff": board.apply(json.loads(data))
+                    if stop.is_set(): return
+        except (requests.exceptions.RequestException, ValueError) as e:
+            board.set_status(f"disconnected ({type(e).__name__}), retrying...")
+        stop.wait(RECONNECT_SECONDS)
+
+
+def format_row(coin, width):
+    price = coin.get("current_price")
+    change = coin.get("price_change_percentage_24h")
+    cap = coin.get("market_cap")
+    line = (f"{coin.get('market_cap_rank') or '-':<5} {coin.get('name', 'N/A')[:22]:<22} "
+            f"{coin.get('symbol', '').upper()[:8]:<8} "
+            f"{'-' if price is None else f'${price:,.4f}':>18} "
+            f"{'-' if change is None else f'{change:+.2f}%':>9} "
+            f"{'-' if cap is None else f'${cap:,.0f}':>20}")
+    return line[:width - 1]
+
+
+def draw(screen, board, view):
+    """
+    Redraws the curses window. curses only sends the cells that differ from what is
+    already on the terminal, and only the visible rows are formatted, so the cost
+    of a tick does not depend on how many coins are loaded.
+    """
+    height, width = screen.getmaxyx()
+    state = board.view(view["query"])
+    rows = state["rows"]
+    body = max(1, height - 3)
+    view["top"] = max(0, min(view["top"], len(rows) - body))
+    now = time.monotonic()
+    screen.erase()
+    title = f" CRYPTO1 live | v{state['version'] or '-'} | {state['status']} | {len(rows)}/{state['total']} coins"
+    screen.addnstr(0, 0, title.ljust(width - 1), width - 1, curses.A_REVERSE)
+    header = f"{'#':<5} {'Name':<22} {'Symbol':<8} {'Price (USD)':>18} {'24h':>9} {'Market cap':>20}"
+    screen.addnstr(1, 0, header, width - 1, curses.A_BOLD)
+    for y, coin in enumerate(rows[view["top"]:view["top"] + body], start=2):
+        direction, at = state["moves"].get(coin["id"], (0, None))
+        attr = curses.color_pair(1 if direction > 0 else 2) if direction else curses.A_NORMAL
+        if at is not None and now - at < FLASH_SECONDS:
+            attr |= curses.A_REVERSE | curses.A_BOLD
+        screen.addnstr(y, 0, format_row(coin, width), width - 1, attr)
+    prompt = f"/{view['query']}" if view["editing"] else (
+        f"filter: {view['query']}  " if view["query"] else "") + "↑↓ PgUp PgDn Home End scroll  / filter  q quit"
+    screen.addnstr(height - 1, 0, prompt, width - 1)
+    screen.refresh()
+
+
+def handle_key(key, view, page):
+    """Applies one key press to the view; returns False to quit."""
+    if view["editing"]:
+        if key in (10, 13, curses.KEY_ENTER): view["editing"] = False
+        elif key == 27: view.update(editing=False, query="")
+        elif key in (8, 127, curses.KEY_BACKSPACE): view["query"] = view["query"][:-1]
+        elif 32 <= key < 127: view["query"] += chr(key)
+        view["top"] = 0
+        return True
+    if key in (ord("q"), ord("Q")): return False
+    if key == ord("/"): view["editing"] = True
+    elif key == 27: view["query"] = ""
+    elif key in (curses.KEY_DOWN, ord("j")): view["top"] += 1
+    elif key in (curses.KEY_UP, ord("k")): view["top"] = max(0, view["top"] - 1)
+    elif key in (curses.KEY_NPAGE, ord(" ")): view["top"] += page
+    elif key == curses.KEY_PPAGE: view["top"] = max(0, view["top"] - page)
+    elif key == curses.KEY_HOME: view["top"] = 0
+    elif key == curses.KEY_END: view["top"] = 10 ** 9   # clamped to the last page by draw()
+    return True
+
+
+def monitor(screen, base_url, query=""):
+    """Full-screen live table; redraws only on a new version, a key press, a resize or a fading highlight."""
+    curses.curs_set(0)
+    if curses.has_colors():
+        curses.use_default_colors()
+        curses.init_pair(1, curses.COLOR_GREEN, -1)
+        curses.init_pair(2, curses.COLOR_RED, -1)
+    board, stop = Board(), threading.Event()
+    threading.Thread(target=follow_stream, args=(base_url, board, stop), daemon=True).start()
+    view = {"top": 0, "query": query, "editing": False}
+    fade_at = None
     try:
         while True:
-            fetch_and_print_data()
-            time.sleep(10)  # Wait 10 seconds before the next update
+            now = time.monotonic()
+            if board.updated.is_set() or (fade_at is not None and now >= fade_at):
+                board.updated.clear()
+                draw(screen, board, view)
+                fade = board.next_fade(time.monotonic())
+                fade_at = None if fade is None else time.monotonic() + fade
+            screen.timeout(IDLE_POLL_MS)
+            key = screen.getch()
+            if key == -1: continue
+            if key != curses.KEY_RESIZE and not handle_key(key, view, max(1, screen.getmaxyx()[0] - 3)): return
+            draw(screen, board, view)
+    finally:
+        stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crypto prices in the terminal.")
+    parser.add_argument("--monitor", action="store_true",
+                        help="live, scrollable view of the local CRYPTO1 service's /api/stream")
+    parser.add_argument("--service", default=SERVICE_URL, help="CRYPTO1 service URL for --monitor")
+    parser.add_argument("--filter", default="", help="initial name/symbol filter for --monitor")
+    args = parser.parse_args()
+    if args.monitor:
+        if curses is None: sys.exit("--monitor needs curses (on Windows: pip install windows-curses)")
+        curses.wrapper(monitor, args.service.rstrip("/"), args.filter)
+        return
+    while True:
+        fetch_and_print_data()
+        time.sleep(10)  # Wait 10 seconds before the next update
+
+if __name__ == "__main__":
+    try:
+        main()
     except KeyboardInterrupt:
         print("\n👋 Exiting program.")
\ No newline at end of file
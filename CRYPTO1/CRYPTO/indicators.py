@@ -0,0 +1,250 @@
+import os
+import math
+import threading
+from collections import deque
+
+import numpy as np
+
+WINDOW = 360              # ticks kept per coin (an hour at a 10s refresh)
+EMA_SPANS = (12, 26)      # in ticks
+RSI_PERIOD = 14           # Wilder smoothing, in ticks
+RECOMPUTE_EVERY = WINDOW  # ticks between exact recomputes of the rolling sums, to cancel float drift
+
+
+class TickHistory:
+    """
+    Price/volume ring buffers for every coin in one (coins x WINDOW) numpy array
+    sharing a single write head, one column per tick. Indicators are updated as
+    each tick is written: EMAs and Wilder RSI by recurrence, VWAP and volatility
+    from rolling sums (add the new column, subtract the evicted one) and rolling
+    high/low from monotonic deques, so a tick costs O(1) per coin however long
+    the window is. Volume is CoinGecko's rolling 24h volume at each tick, so the
+    VWAP is weighted by that rather than by traded volume per tick.
+    """
+
+    def __init__(self, capacity=WINDOW, spans=EMA_SPANS, rsi_period=RSI_PERIOD):
+        self.capacity = capacity
+        self.spans = tuple(spans)
+        self.alphas = np.array([2 / (s + 1) for s in spans])
+        self.rsi_period = rsi_period
+        self.ids = []
+        self.rows = {}          # coin id -> row
+        self.ts = np.full(capacity, np.nan)
+        self.head = 0           # column the next tick is written to
+        self.ticks = 0          # ticks recorded so far
+        self._lock = threading.Lock()
+        self._resize(0)
+
+    def _resize(self, n):
+        """Grows every per-coin array to n rows; new rows start empty."""
+        def grow(array, fill, shape=()):
+            extra = np.full((n - len(array),) + shape, fill)
+            return np.concatenate([array, extra]) if len(array) else extra
+        old = getattr(self, "price", None)
+        if old is None:
+            empty = lambda *shape: np.empty((0,) + shape)
+            self.price, self.volume, self.ret = empty(self.capacity), empty(self.capacity), empty(self.capacity)
+            self.last, self.ema = empty(), empty(len(self.spans))
+            self.avg_gain, self.avg_loss, self.moves = empty(), empty(), empty()
+            self.pv_sum, self.v_sum, self.r_sum, self.r2_sum, self.n_r = empty(), empty(), empty(), empty(), empty()
+            self.highs, self.lows = [], []
+        self.price = grow(self.price, np.nan, (self.capacity,))
+        self.volume = grow(self.volume, np.nan, (self.capacity,))
+        self.ret = grow(self.ret, np.nan, (self.capacity,))
+        self.last = grow(self.last, np.nan)
+        self.ema = grow(self.ema, np.nan, (len(self.spans),))
+        self.avg_gain, self.avg_loss = grow(self.avg_gain, 0.0), grow(self.avg_loss, 0.0)
+        self.moves = grow(self.moves, 0.0)     # price deltas seen, for the RSI warm-up
+        for name in ("pv_sum", "v_sum", "r_sum", "r2_sum", "n_r"):
+            setattr(self, name, grow(getattr(self, name), 0.0))
+        self.highs.extend(deque() for _ in range(n - len(self.highs)))
+        self.lows.extend(deque() for _ in range(n - len(self.lows)))
+
+    def record(self, coins, at):
+        """Appends one tick (a CoinGecko coin list at epoch time `at`) for every coin."""
+        with self._lock:
+            new = [c["id"] for c in coins if c.get("id") is not None and c["id"] not in self.rows]
+            if new:
+                for coin_id in new:
+                    self.rows[coin_id] = len(self.ids)
+                    self.ids.append(coin_id)
+                self._resize(len(self.ids))
+            p = np.full(len(self.ids), np.nan)
+            v = np.full(len(self.ids), np.nan)
+            idx = np.array([self.rows[c["id"]] for c in coins if c.get("id") is not None], dtype=int)
+            p[idx] = [_number(c.get("current_price")) for c in coins if c.get("id") is not None]
+            v[idx] = [_number(c.get("total_volume")) for c in coins if c.get("id") is not None]
+            self._write(p, v, at)
+
+    def _write(self, p, v, at):
+        slot = self.head
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = np.where((p > 0) & (self.last > 0), np.log(p / self.last), np.nan)
+        # Evict the column being overwritten from the rolling sums, then add the new one
+        self._accumulate(self.price[:, slot], self.volume[:, slot], self.ret[:, slot], -1)
+        self.price[:, slot], self.volume[:, slot], self.ret[:, slot] = p, v, r
+        self._accumulate(p, v, r, 1)
+
+        valid = np.isfinite(p)
+        first = valid & np.isnan(self.ema[:, 0])
+        self.ema[first] = p[first, None]
+        update = valid & ~first
+        self.ema[update] += self.alphas * (p[update, None] - self.ema[update])
+
+        delta = p - self.last
+        moved = np.isfinite(delta)
+        self.moves[moved] += 1
+        # Plain average over the first RSI_PERIOD moves, Wilder's smoothing after that
+        k = np.minimum(self.moves[moved], self.rsi_period)
+        self.avg_gain[moved] += (np.maximum(delta[moved], 0) - self.avg_gain[moved]) / k
+        self.avg_loss[moved] += (np.maximum(-delta[moved], 0) - self.avg_loss[moved]) / k
+        self.last[valid] = p[valid]
+
+        tick, oldest = self.ticks, self.ticks + 1 - self.capacity
+        for row in np.flatnonzero(valid):
+            price = p[row]
+            _push(self.highs[row], tick, price, oldest, lambda old: old <= price)
+            _push(self.lows[row], tick, price, oldest, lambda old: old >= price)
+
+        self.ts[slot] = at
+        self.head = (slot + 1) % self.capacity
+        self.ticks += 1
+        if self.ticks % RECOMPUTE_EVERY == 0: self._recompute()
+
+    def _accumulate(self, p, v, r, sign):
+        pv = np.isfinite(p) & np.isfinite(v)
+        self.pv_sum += sign * np.where(pv, p * v, 0.0)
+        self.v_sum += sign * np.where(pv, v, 0.0)
+        finite = np.isfinite(r)
+        self.r_sum += sign * np.where(finite, r, 0.0)
+        self.r2_sum += sign * np.where(finite, r * r, 0.0)
+        self.n_r += sign * finite
+
+    def _recompute(self):
+        """Exact rolling sums from the buffers."""
+        for name in ("pv_sum", "v_sum", "r_sum", "r2_sum", "n_r"):
+            getattr(self, name)[:] = 0.0
+        pv = np.isfinite(self.price) & np.isfinite(self.volume)
+        self.pv_sum += np.where(pv, self.price * self.volume, 0.0).sum(axis=1)
+        self.v_sum += np.where(pv, self.volume, 0.0).sum(axis=1)
+        finite = np.isfinite(self.ret)
+        self.r_sum += np.where(finite, self.ret, 0.0).sum(axis=1)
+        self.r2_sum += np.where(finite, self.ret ** 2, 0.0).sum(axis=1)
+        self.n_r += finite.sum(axis=1)
+
+    def _columns(self):
+        """Buffer columns in time order, oldest first."""
+        if self.ticks < self.capacity: return np.arange(self.ticks)
+        return (self.head + np.arange(self.capacity)) % self.capacity
+
+    def _extreme(self, window):
+        _evict(window, self.ticks - self.capacity)
+        return window[0][1] if window else None
+
+    def indicators(self, coin_id):
+        """Current indicator values for one coin, or None if it has no ticks."""
+        with self._lock:
+            row = self.rows.get(coin_id)
+            if row is None: return None
+            result = {"id": coin_id, "ticks": int(np.isfinite(self.price[row]).sum()),
+                      "price": _value(self.last[row])}
+            for span, ema in zip(self.spans, self.ema[row]):
+                result[f"ema_{span}"] = _value(ema)
+            rsi = None
+            if self.moves[row] >= self.rsi_period:
+                gain, loss = self.avg_gain[row], self.avg_loss[row]
+                rsi = 100.0 if loss == 0 else 100 - 100 / (1 + gain / loss)
+            result[f"rsi_{self.rsi_period}"] = _value(rsi)
+            result["vwap"] = _value(self.pv_sum[row] / self.v_sum[row] if self.v_sum[row] > 0 else None)
+            result["high"] = _value(self._extreme(self.highs[row]))
+            result["low"] = _value(self._extreme(self.lows[row]))
+            n = self.n_r[row]
+            # Standard deviation of tick-to-tick log returns over the window, in percent
+            variance = self.r2_sum[row] / n - (self.r_sum[row] / n) ** 2 if n >= 2 else None
+            result["volatility"] = _value(math.sqrt(max(variance, 0.0)) * 100 if variance is not None else None)
+            return result
+
+    def series(self, coin_id):
+        """The buffered ticks for one coin, oldest first: {"t": [...], "price": [...], "volume": [...]}."""
+        with self._lock:
+            row = self.rows.get(coin_id)
+            if row is None: return None
+            columns = self._columns()
+            prices = self.price[row, columns]
+            keep = columns[np.isfinite(prices)]
+            return {"t": self.ts[keep].tolist(), "price": self.price[row, keep].tolist(),
+                    "volume": [_value(x) for x in self.volume[row, keep]]}
+
+    def save(self, path):
+        """Writes the buffers and indicator state to a compressed .npz, atomically."""
+        with self._lock:
+            arrays = {name: getattr(self, name).copy() for name in
+                      ("ts", "price", "volume", "ret", "last", "ema", "avg_gain", "avg_loss", "moves")}
+            ids = np.array(self.ids, dtype=str)
+            meta = np.array([self.capacity, self.head, self.ticks, self.rsi_period])
+        # Compressed outside the lock so ticks keep flowing while it is written
+        tmp = f"{path}.tmp.npz"
+        np.savez_compressed(tmp, ids=ids, spans=np.array(self.spans), meta=meta, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, capacity=WINDOW, spans=EMA_SPANS, rsi_period=RSI_PERIOD):
+        """A history restored from `path`, or an empty one if the file is missing or was saved with other settings."""
+        history = cls(capacity, spans, rsi_period)
+        try:
+            with np.load(path) as data:
+                saved_capacity, head, ticks, saved_rsi = (int(x) for x in data["meta"])
+                if saved_capacity != capacity or tuple(data["spans"]) != history.spans or saved_rsi != rsi_period:
+                    print(f"⚠️ Tick history at {path} was saved with other settings, starting empty")
+                    return history
+                history.ids = data["ids"].tolist()
+                history.rows = {coin_id: row for row, coin_id in enumerate(history.ids)}
+                history._resize(len(history.ids))
+                for name in ("ts", "price", "volume", "ret", "last", "ema", "avg_gain", "avg_loss", "moves"):
+                    setattr(history, name, data[name].copy())
+        except FileNotFoundError:
+            return history
+        except (OSError, KeyError, ValueError) as e:
+            print(f"⚠️ Could not read tick history from {path}: {e}")
+            return cls(capacity, spans, rsi_period)
+        history.head, history.ticks = head, ticks
+        history._recompute()
+        # Rebuild the high/low deques by replaying the buffered window
+        first = ticks - len(history._columns())
+        for offset, column in enumerate(history._columns()):
+            for row in np.flatnonzero(np.isfinite(history.price[:, column])):
+                price = history.price[row, column]
+                _push(history.highs[row], first + offset, price, first, lambda old: old <= price)
+                _push(history.lows[row], first + offset, price, first, lambda old: old >= price)
+        print(f"📈 Restored {ticks} ticks of history for {len(history.ids)} coins")
+        return history
+
+
+def _push(window, tick, price, oldest, dominated):
+    """
+    Monotonic deque append: drops entries that can no longer be the window's
+    extreme, i.e. those dominated by the new price and those before tick `oldest`.
+    """
+    while window and dominated(window[-1][1]):
+        window.pop()
+    window.append((tick, price))
+    _evict(window, oldest)
+
+
+def _evict(window, oldest):
+    while window and window[0][0] < oldest:
+        window.popleft()
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _value(x):
+    """JSON-friendly float: None for missing or non-finite values."""
+    if x is None: return None
+    x = float(x)
+    return x if math.isfinite(x) else None
@@ -0,0 +1,204 @@
+import json
+import hashlib
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+from common.fx import convert_rows
+
+
+# Fields whose change makes a coin part of a version's diff
+DIFF_FIELDS = ("current_price", "total_volume", "market_cap_rank")
+HISTORY = 120   # versions kept for ?since= delta sync (about 20 minutes at a 10s TTL)
+# CoinGecko fields quoted in the vs_currency (USD), converted for ?currency= views
+MONEY_FIELDS = ("current_price", "market_cap", "fully_diluted_valuation", "total_volume", "high_24h", "low_24h",
+                "price_change_24h", "market_cap_change_24h", "ath", "atl")
+
+
+def index_coins(coins):
+    """Lookup tables for one coin list: by id, by lower-case symbol (best-ranked coin wins) and by rank."""
+    by_id, by_symbol, by_rank = {}, {}, {}
+    for coin in coins:
+        by_id[coin.get("id")] = coin
+        by_symbol.setdefault((coin.get("symbol") or "").lower(), coin)
+        if coin.get("market_cap_rank") is not None:
+            by_rank.setdefault(coin["market_cap_rank"], coin)
+    return by_id, by_symbol, by_rank
+
+
+def query_coins(state, symbols=None, fields=None, sort=None, limit=None):
+    """
+    Rows for a filtered /api/data request: the coins named in `symbols` (ids or
+    tickers) or all of them, ordered by `sort` ("field" or "-field" for descending,
+    missing values last), cut to `limit` and projected to `fields`.
+    """
+    if symbols:
+        found = (state.lookup(s) for s in symbols)
+        seen, coins = set(), []
+        for coin in found:
+            if coin is not None and coin.get("id") not in seen:
+                seen.add(coin.get("id"))
+                coins.append(coin)
+    else:
+        coins = state.coins
+    if sort:
+        key = sort.lstrip("-")
+        present = [c for c in coins if c.get(key) is not None]
+        missing = [c for c in coins if c.get(key) is None]
+        coins = sorted(present, key=lambda c: c[key], reverse=sort.startswith("-")) + missing
+    if limit is not None:
+        coins = coins[:limit]
+    if fields:
+        coins = [{f: c[f] for f in fields if f in c} for c in coins]
+    return coins
+
+
+def digest_coins(coins):
+    return hashlib.sha1(json.dumps(coins, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def sortable(coins, key):
+    """True if some coin has field `key` and its values can be ordered: all numbers or all strings."""
+    values = [c[key] for c in coins if c.get(key) is not None]
+    if not values: return any(key in c for c in coins)
+    if all(isinstance(v, str) for v in values): return True
+    return all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values)
+
+
+def diff_coins(old, new):
+    """
+    Coins (full rows) whose price, volume or rank changed or that are new,
+    ids that disappeared, and {id: rank} for coins whose rank moved.
+    """
+    old_by_id = {c.get("id"): c for c in old}
+    changed, ranks = [], {}
+    for coin in new:
+        before = old_by_id.get(coin.get("id"))
+        if before is None or any(before.get(f) != coin.get(f) for f in DIFF_FIELDS):
+            changed.append(coin)
+        if before is None or before.get("market_cap_rank") != coin.get("market_cap_rank"):
+            ranks[coin.get("id")] = coin.get("market_cap_rank")
+    new_ids = {c.get("id") for c in new}
+    removed = [coin_id for coin_id in old_by_id if coin_id not in new_ids]
+    return changed, removed, ranks
+
+
+class MarketState:
+    """An immutable view of one CoinGecko snapshot plus the version it was published under."""
+
+    def __init__(self, coins, version, digest, last_modified, fetched_at, changed=(), removed=(), ranks=None,
+                 indexes=None, currency="USD", rate=1.0, restored=False):
+        self.coins = coins
+        self.version = version
+        self.digest = digest
+        self.last_modified = last_modified   # when the data last actually changed
+        self.fetched_at = fetched_at         # when it was last confirmed against CoinGecko
+        self.changed = changed               # coins that differ from the previous version
+        self.removed = removed               # coin ids dropped since the previous version
+        self.ranks = ranks or {}             # {coin id: new market_cap_rank} for moved coins
+        self.indexes = indexes or index_coins(coins)
+        self.by_id, self.by_symbol, self.by_rank = self.indexes
+        self.currency = currency             # money fields are in this currency, `rate` units per USD
+        self.rate = rate
+        self.restored = restored             # loaded from disk at startup, stale until the first fetch
+
+    def lookup(self, key):
+        """The coin for an id ("bitcoin"), symbol ("btc", any case) or market-cap rank ("1"), or None."""
+        key = str(key).strip().lower()
+        coin = self.by_id.get(key) or self.by_symbol.get(key)
+        if coin is None and key.isdigit():
+            coin = self.by_rank.get(int(key))
+        return coin
+
+    def converted(self, currency, rate):
+        """This version with its money fields in `currency` (rate units per USD), under its own ETag."""
+        convert = lambda coins: convert_rows(coins, MONEY_FIELDS, rate)
+        return MarketState(convert(self.coins), self.version, self.digest, self.last_modified, self.fetched_at,
+                           convert(self.changed), self.removed, self.ranks, currency=currency, rate=rate,
+                           restored=self.restored)
+
+    @property
+    def etag(self):
+        suffix = "" if self.currency == "USD" else f"-{self.currency.lower()}"
+        return f"v{self.version}-{self.digest[:16]}{suffix}"
+
+
+class MarketStore:
+    """
+    Holds the latest coin list and bumps a monotonically increasing version only
+    when the content actually changes, so unchanged refreshes keep the same ETag.
+    """
+
+    def __init__(self, history=HISTORY):
+        self.state = None
+        self.listeners = []   # called with each new MarketState, outside the lock
+        self.history = deque(maxlen=history)   # recent MarketStates, oldest first, for delta sync
+        self._deltas = {}                       # since -> merged delta, valid for the current version only
+        self._lock = threading.Lock()
+
+    def publish(self, coins, version=None, last_modified=None):
+        """
+        Publishes coins as the next version. Another worker's snapshot is adopted
+        under its own `version` and `last_modified`, so every worker serves the same ETags.
+        """
+        digest = digest_coins(coins)
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        with self._lock:
+            previous = self.state
+            if previous is not None and previous.digest == digest and not previous.restored:
+                self.state = MarketState(previous.coins, version or previous.version, digest, previous.last_modified,
+                                         now, previous.changed, previous.removed, previous.ranks, previous.indexes)
+                return self.state
+            version = version or (previous.version + 1 if previous else 1)
+            changed, removed, ranks = diff_coins(previous.coins, coins) if previous else (coins, [], {})
+            state = self.state = MarketState(coins, version, digest, last_modified or now, now, changed, removed, ranks)
+            self.history.append(state)
+            self._deltas = {}
+        for listener in self.listeners:
+            try:
+                listener(state)
+            except Exception as e:
+                print(f"❌ Market store listener failed: {e}")
+        return state
+
+    def restore(self, coins, version, last_modified, fetched_at):
+        """Seeds an empty store with a saved snapshot, marked restored; listeners hear of the first real publish."""
+        with self._lock:
+            if self.state is None:
+                self.state = MarketState(coins, version, digest_coins(coins), last_modified, fetched_at, restored=True)
+                self.history.append(self.state)
+            return self.state
+
+    def delta_since(self, since):
+        """
+        Everything that changed after version `since`, merged from the history ring,
+        or None when `since` is unknown or too old and the client needs a full snapshot.
+        `since` must be a version still in the ring: the oldest entry's diff is against a
+        version no longer held (or, for a restored entry, against nothing), and a version
+        this worker never held may differ from every diff in the ring.
+        """
+        with self._lock:
+            state = self.state
+            if state is None or not self.history: return None
+            if since != state.version and not any(past.version == since for past in self.history):
+                return None
+            cached = self._deltas.get(since)
+            if cached is not None:
+                return cached
+            changed, removed, ranks = {}, set(), {}
+            for past in self.history:
+                if past.version <= since: continue
+                for coin in past.changed:
+                    changed[coin.get("id")] = coin
+                    removed.discard(coin.get("id"))
+                for coin_id in past.removed:
+                    changed.pop(coin_id, None)
+                    ranks.pop(coin_id, None)
+                    removed.add(coin_id)
+                ranks.update(past.ranks)
+            delta = {
+                "version": state.version, "since": since, "full": False,
+                "changed": list(changed.values()), "removed": sorted(removed), "ranks": ranks
+            }
+            self._deltas[since] = delta
+            return delta
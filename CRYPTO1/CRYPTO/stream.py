@@ -0,0 +1,93 @@
+import json
+import threading
+from collections import deque
+
+HEARTBEAT_SECONDS = 15   # idle connections get a comment line this often to keep proxies from closing them
+HISTORY = 64             # diff events kept so briefly disconnected clients can resume via Last-Event-ID
+MAX_SUBSCRIBERS = 32     # open streams per process; each one holds a server thread for as long as it is open
+FULL_RETRY_MS = 30000    # how long a turned-away EventSource waits before reconnecting
+
+
+def sse_frame(event, version, data):
+    """Encodes one Server-Sent Events frame."""
+    return f"id: {version}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Broadcaster:
+    """
+    Fans each MarketStore version out to up to `max_subscribers` SSE subscribers.
+    Every frame is encoded once per version and shared by all subscribers,
+    which sleep on a condition variable between ticks instead of polling.
+
+    A subscriber occupies one WSGI worker thread for the life of its connection,
+    so the app must run on a threaded server (app.run(threaded=True), gunicorn
+    -k gthread with --threads above the cap, or gevent); a sync gunicorn worker
+    would be taken over by a single open stream.
+    """
+
+    def __init__(self, history=HISTORY, heartbeat=HEARTBEAT_SECONDS, max_subscribers=MAX_SUBSCRIBERS):
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+        self.version = 0
+        self.subscribers = 0
+        self._snapshot = None                 # (version, frame) for newly connected clients
+        self._diffs = deque(maxlen=history)   # (version, frame or None when nothing relevant changed)
+        self._cond = threading.Condition()
+
+    def publish(self, state):
+        """MarketStore listener: encodes the snapshot and diff for a new version and wakes subscribers."""
+        snapshot = sse_frame("snapshot", state.version, {"version": state.version, "coins": state.coins})
+        diff = None
+        if state.changed or state.removed:
+            diff = sse_frame("diff", state.version, {
+                "version": state.version, "changed": state.changed, "removed": state.removed
+            })
+        with self._cond:
+            self._snapshot = (state.version, snapshot)
+            self._diffs.append((state.version, diff))
+            self.version = state.version
+            self._cond.notify_all()
+
+    def _frames_since(self, cursor):
+        """Frames a subscriber at `cursor` needs to catch up; a snapshot if its gap is out of history."""
+        if cursor == 0 or not self._diffs or self._diffs[0][0] > cursor + 1:
+            return [self._snapshot[1]] if self._snapshot else []
+        return [frame for version, frame in self._diffs if version > cursor and frame]
+
+    def has_room(self):
+        return self.subscribers < self.max_subscribers
+
+    def subscribe(self, last_event_id=None):
+        """
+        Generator of SSE frames: an initial snapshot (or replay), then diffs and heartbeats.
+        Past max_subscribers it only tells the client to retry later, and ends.
+        """
+        with self._cond:
+            full = self.subscribers >= self.max_subscribers
+            if not full: self.subscribers += 1
+        if full:
+            yield f"retry: {FULL_RETRY_MS}\n: too many open streams\n\n"
+            return
+        try:
+            with self._cond:
+                if last_event_id is not None and last_event_id <= self.version:
+                    frames = self._frames_since(last_event_id)
+                else:
+                    frames = [self._snapshot[1]] if self._snapshot else []
+                cursor = self.version
+            yield "retry: 3000\n\n"
+            for frame in frames:
+                yield frame
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self.version > cursor, timeout=self.heartbeat)
+                    frames = self._frames_since(cursor) if self.version > cursor else None
+                    cursor = self.version
+                if frames is None:
+                    yield ": heartbeat\n\n"
+                else:
+                    for frame in frames:
+                        yield frame
+        finally:
+            with self._cond:
+                self.subscribers -= 1
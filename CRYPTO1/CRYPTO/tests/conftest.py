@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The app imports its own modules from CRYPTO1/CRYPTO and the shared code as "common.*" from the repo root
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.abspath(os.path.join(HERE, "..", "..", "..")))
+sys.path.insert(0, os.path.abspath(os.path.join(HERE, "..")))
@@ -0,0 +1,18 @@
+from datafetch import Board
+
+
+def coin(coin_id, price, rank):
+    return {"id": coin_id, "symbol": coin_id[:3], "name": coin_id.title(), "current_price": price, "market_cap_rank": rank}
+
+
+def test_view_is_a_copy_taken_under_the_lock():
+    board = Board()
+    board.load({"coins": [coin("bitcoin", 1, 1), coin("ether", 1, 2)], "version": 1})
+    board.apply({"changed": [coin("ether", 2, 2)], "removed": [], "version": 2})
+    view = board.view("ETH")
+    assert [c["id"] for c in view["rows"]] == ["ether"]
+    assert view["version"] == 2 and view["total"] == 2
+    assert view["moves"]["ether"][0] == 1
+    board.apply({"changed": [coin("bitcoin", 0.5, 1)], "removed": ["ether"], "version": 3})
+    assert "bitcoin" not in view["moves"]   # later updates do not leak into a view being drawn
+    assert board.next_fade(view["moves"]["ether"][1]) is not None
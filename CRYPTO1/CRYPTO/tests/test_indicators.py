@@ -0,0 +1,100 @@
+import math
+
+import numpy as np
+import pytest
+
+from indicators import TickHistory
+
+CAPACITY, SPANS, RSI = 8, (3, 5), 4
+
+
+def prices(n):
+    rng = np.random.default_rng(7)
+    return list(100 + np.cumsum(rng.normal(0, 1, n)))
+
+
+def volumes(n):
+    return [1000.0 + 10 * i for i in range(n)]
+
+
+def filled(n):
+    history = TickHistory(CAPACITY, SPANS, RSI)
+    for i, (p, v) in enumerate(zip(prices(n), volumes(n))):
+        history.record([{"id": "bitcoin", "current_price": p, "total_volume": v}], 1000.0 + i)
+    return history
+
+
+def reference(n):
+    """The indicators recomputed from scratch over the whole price list."""
+    p, v = np.array(prices(n)), np.array(volumes(n))
+    emas = {}
+    for span in SPANS:
+        ema, alpha = p[0], 2 / (span + 1)
+        for price in p[1:]: ema += alpha * (price - ema)
+        emas[f"ema_{span}"] = ema
+    deltas = np.diff(p)
+    gain, loss = deltas.clip(min=0), (-deltas).clip(min=0)
+    avg_gain, avg_loss = gain[:RSI].mean(), loss[:RSI].mean()
+    for g, l in zip(gain[RSI:], loss[RSI:]):
+        avg_gain += (g - avg_gain) / RSI
+        avg_loss += (l - avg_loss) / RSI
+    window = slice(n - CAPACITY, n)
+    returns = np.log(p[1:] / p[:-1])[max(0, n - CAPACITY - 1):]
+    return {
+        **emas, f"rsi_{RSI}": 100 - 100 / (1 + avg_gain / avg_loss),
+        "vwap": (p[window] * v[window]).sum() / v[window].sum(),
+        "high": p[window].max(), "low": p[window].min(),
+        "volatility": returns.std() * 100, "price": p[-1], "ticks": CAPACITY,
+    }
+
+
+@pytest.mark.parametrize("n", [CAPACITY + 1, 3 * CAPACITY + 5])
+def test_streaming_indicators_match_a_full_recompute(n):
+    result = filled(n).indicators("bitcoin")
+    for key, expected in reference(n).items():
+        assert result[key] == pytest.approx(expected), key
+
+
+def test_rsi_waits_for_its_warm_up():
+    assert filled(RSI).indicators("bitcoin")[f"rsi_{RSI}"] is None
+    assert filled(RSI + 1).indicators("bitcoin")[f"rsi_{RSI}"] is not None
+
+
+def test_series_is_the_window_oldest_first():
+    n = 2 * CAPACITY + 3
+    series = filled(n).series("bitcoin")
+    assert series["t"] == [1000.0 + i for i in range(n - CAPACITY, n)]
+    assert series["price"] == pytest.approx(prices(n)[-CAPACITY:])
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "ticks.npz")
+    history = filled(2 * CAPACITY + 3)
+    history.save(path)
+    restored = TickHistory.load(path, CAPACITY, SPANS, RSI)
+    assert restored.ticks == history.ticks and restored.head == history.head
+    assert restored.series("bitcoin") == history.series("bitcoin")
+    before, after = history.indicators("bitcoin"), restored.indicators("bitcoin")
+    assert after == pytest.approx(before)
+    # Both keep streaming identically after the restore
+    for h in (history, restored):
+        h.record([{"id": "bitcoin", "current_price": 50.0, "total_volume": 1.0}], 2000.0)
+    assert restored.indicators("bitcoin") == pytest.approx(history.indicators("bitcoin"))
+    assert restored.indicators("bitcoin")["low"] == 50.0
+
+
+def test_load_with_other_settings_or_no_file_starts_empty(tmp_path):
+    path = str(tmp_path / "ticks.npz")
+    filled(CAPACITY).save(path)
+    assert TickHistory.load(path, CAPACITY * 2, SPANS, RSI).ticks == 0
+    assert TickHistory.load(str(tmp_path / "missing.npz"), CAPACITY, SPANS, RSI).ticks == 0
+
+
+def test_coins_missing_from_a_tick_keep_their_values():
+    history = TickHistory(CAPACITY, SPANS, RSI)
+    history.record([{"id": "bitcoin", "current_price": 10.0, "total_volume": 1.0}], 1.0)
+    history.record([{"id": "ether", "current_price": 2.0, "total_volume": 1.0}], 2.0)
+    assert history.indicators("bitcoin")["price"] == 10.0
+    assert history.indicators("ether")["ticks"] == 1
+    assert history.indicators("dogecoin") is None
+    assert math.isclose(history.indicators("bitcoin")["vwap"], 10.0)
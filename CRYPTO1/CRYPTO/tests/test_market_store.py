@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+
+from market_store import MarketStore, sortable
+
+
+def coin(coin_id, price, rank):
+    return {"id": coin_id, "symbol": coin_id[:3], "current_price": price, "total_volume": 1, "market_cap_rank": rank}
+
+
+def ids(delta):
+    return sorted(c["id"] for c in delta["changed"])
+
+
+def test_delta_merges_versions_after_since():
+    store = MarketStore()
+    store.publish([coin("bitcoin", 1, 1), coin("ether", 1, 2)])
+    store.publish([coin("bitcoin", 2, 1), coin("ether", 1, 2)])
+    store.publish([coin("bitcoin", 2, 1), coin("solana", 5, 2)])
+    delta = store.delta_since(1)
+    assert delta["version"] == 3 and not delta["full"]
+    assert ids(delta) == ["bitcoin", "solana"]
+    assert delta["removed"] == ["ether"]
+    assert store.delta_since(3)["changed"] == []
+
+
+def test_unchanged_refresh_keeps_version_and_delta():
+    store = MarketStore()
+    store.publish([coin("bitcoin", 1, 1)])
+    assert store.publish([coin("bitcoin", 1, 1)]).version == 1
+    assert store.delta_since(1)["changed"] == []
+
+
+def test_since_older_than_ring_needs_full_snapshot():
+    store = MarketStore(history=2)
+    for price in range(1, 5):
+        store.publish([coin("bitcoin", price, 1)])
+    assert [s.version for s in store.history] == [3, 4]
+    assert store.delta_since(2) is None   # version 3's diff is against 2, but 1 -> 2 is gone
+    assert store.delta_since(1) is None
+    assert ids(store.delta_since(3)) == ["bitcoin"]
+
+
+def test_restored_head_needs_full_snapshot():
+    store = MarketStore()
+    now = datetime.now(timezone.utc)
+    store.restore([coin("bitcoin", 1, 1), coin("ether", 1, 2)], 7, now, now)
+    assert store.delta_since(6) is None   # the restored entry has no diff to its predecessor
+    assert store.delta_since(7)["changed"] == []
+    store.publish([coin("bitcoin", 2, 1), coin("ether", 1, 2)], version=8)
+    assert store.delta_since(6) is None
+    assert ids(store.delta_since(7)) == ["bitcoin"]
+
+
+def test_unknown_or_future_version_needs_full_snapshot():
+    store = MarketStore()
+    assert store.delta_since(1) is None
+    store.publish([coin("bitcoin", 1, 1)], version=10)
+    store.publish([coin("bitcoin", 2, 1)], version=12)
+    assert store.delta_since(11) is None   # a version this worker never held
+    assert store.delta_since(13) is None
+    assert store.delta_since(0) is None
+    assert ids(store.delta_since(10)) == ["bitcoin"]
+
+
+def test_sortable():
+    coins = [coin("bitcoin", 1, 1), coin("ether", 2.5, None), {"id": "x", "roi": {"times": 2}}]
+    assert sortable(coins, "current_price")
+    assert sortable(coins, "id")
+    assert sortable(coins, "market_cap_rank")
+    assert not sortable(coins, "roi")
+    assert not sortable(coins, "nonexistent")
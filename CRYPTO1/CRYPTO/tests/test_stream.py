@@ -0,0 +1,18 @@
+from market_store import MarketStore
+from stream import Broadcaster
+
+
+def test_subscribers_past_the_cap_are_told_to_retry():
+    broadcaster = Broadcaster(max_subscribers=1)
+    store = MarketStore()
+    store.listeners.append(broadcaster.publish)
+    store.publish([{"id": "bitcoin", "current_price": 1}])
+    first = broadcaster.subscribe()
+    assert next(first).startswith("retry: 3000\n")
+    assert next(first).startswith("id: 1\nevent: snapshot")
+    assert not broadcaster.has_room()
+    turned_away = list(broadcaster.subscribe())
+    assert len(turned_away) == 1 and turned_away[0].startswith("retry: 30000")
+    assert broadcaster.subscribers == 1
+    first.close()
+    assert broadcaster.subscribers == 0 and broadcaster.has_room()
@@ -1,12 +1,97 @@
 # app.py
 
-from flask import Flask, render_template, jsonify
-from datafetch import get_top_stocks_data
+import threading
+from flask import Flask, jsonify, render_template, request
+from datafetch import get_fast_stocks_data, refresh_prices, metadata_cache, TOP_50_TICKERS
+from common.snapshot_cache import SnapshotCache
+from common import metrics
+from common.scheduler import RefreshScheduler, TokenBucket, watchlist_symbols
+from common import market_calendar
+from common.encoded import Encoded, respond
+from common.shared_store import shared_snapshots
+from common.alerts import AlertEngine, ticker_prices
+from common.upstream import UpstreamClient
+from common.fx import FXTable
 
 app = Flask(__name__)   
 
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
 
+# /metrics और /metrics/profile जोड़ता है, साथ ही हर route की latency मापता है
+metrics.install(app)
+
+CACHE_TTL = 30  # सेकंड; इतने समय में आने वाले सभी polls एक ही refresh share करते हैं
+STARTUP_WAIT = 30  # पहला response scheduler के पहले price refresh का इतना इंतज़ार करता है
+
+# कई workers हों तो "us" lease वाला worker ही Yahoo से डेटा लाता है; बाकी उसका publish किया snapshot भेजते हैं
+shared = shared_snapshots("us")
+
+# Price alerts हर नए snapshot पर एक बार जाँचे जाते हैं, सिर्फ़ उन tickers के लिए जिनका भाव बदला।
+# ₹ या € में रखे targets FX table से USD prices से मिलाए जाते हैं; API service जो alert चला चुकी है वह दोबारा नहीं चलता
+fx = FXTable("us", UpstreamClient("coingecko"), shared)
+alerts = AlertEngine("us", fx=fx, claims=shared)
+
+
+def load_stocks():
+    """
+    Scheduler के लाए prices से snapshot बनाता है; Yahoo को यहाँ से कभी सीधे call नहीं करता।
+    Follower worker सिर्फ़ refresher worker का आख़िरी snapshot पढ़ता है।
+    """
+    if not shared.is_leader():
+        row = shared.wait("stocks", timeout=STARTUP_WAIT)
+        if row is None: raise RuntimeError("refresher worker has not published US stocks yet")
+        return Encoded(None, "US stocks", raw=row.data)
+    scheduler.wait_for("prices", STARTUP_WAIT)
+    # हर refresh पर एक बार serialize और compress; हर poll वही bytes भेजता है
+    stocks = get_fast_stocks_data()
+    if not stocks: raise RuntimeError("scheduler has not fetched US prices yet")
+    encoded = Encoded(stocks, "US stocks")
+    shared.publish("stocks", encoded.variants["identity"])
+    alerts.evaluate(ticker_prices(stocks, "ticker", currency="USD"))
+    return encoded
+
+
+_rebuilder = {'thread': None, 'lock': threading.Lock(), 'wake': threading.Event()}
+
+
+def rebuild_loop():
+    """Background thread: हर trigger पर cache दोबारा बनाता है; rebuild के दौरान आए triggers एक ही rebuild में मिल जाते हैं।"""
+    while True:
+        _rebuilder['wake'].wait()
+        _rebuilder['wake'].clear()
+        stocks_cache.invalidate()
+        try:
+            stocks_cache.get()
+        except Exception as e:
+            print(f"❌ US stocks rebuild failed: {e}")
+
+
+def on_refresh(tickers):
+    """
+    Cache दोबारा बनाने को कहता है ताकि अगला poll (और बाकी workers) नया डेटा देखें। Rebuild अलग thread
+    पर होता है, ताकि धीमा rebuild scheduler के बाकी tiers को न रोके।
+    """
+    with _rebuilder['lock']:
+        if _rebuilder['thread'] is None:
+            _rebuilder['thread'] = threading.Thread(target=rebuild_loop, name="us-stocks-rebuild", daemon=True)
+            _rebuilder['thread'].start()
+    _rebuilder['wake'].set()
+
+
+stocks_cache = SnapshotCache("US stocks", load_stocks, CACHE_TTL)
+
+# Yahoo calls का साझा budget: watchlist वाले tickers हर कुछ सेकंड, बाकी universe हर 30 सेकंड,
+# और .info fundamentals दिन में एक बार। Refresh होते ही cache दोबारा बनता है ताकि अगला poll (हर worker पर) नया डेटा देखे।
+# बाज़ार बंद होने (और close settle होने) के बाद prices अगले open तक दोबारा नहीं लाए जाते।
+scheduler = RefreshScheduler("us", {"yahoo": TokenBucket(rate=2, capacity=120)}, tiers={"universe": CACHE_TTL},
+                             shared=shared)
+scheduler.pin(watchlist_symbols(TOP_50_TICKERS))
+scheduler.add_job("prices", "yahoo", "universe", TOP_50_TICKERS, refresh_prices,
+                  promote=True, on_refresh=on_refresh,
+                  expires=market_calendar.expires_at)
+scheduler.add_job("fundamentals", "yahoo", "fundamentals", TOP_50_TICKERS, metadata_cache.refresh,
+                  on_refresh=on_refresh)
+
 @app.route('/')
 def index():
     """
@@ -18,11 +103,22 @@ def index():
 def get_data():
     """
     API एंडपॉइंट जो स्टॉक डेटा को JSON फॉर्मेट में लौटाता है।
+    पहला snapshot न बन पाए (या follower को समय पर न मिले) तो JSON 503; बाद की नाकामियों पर पुराना snapshot ही जाता है।
+    """
+    try:
+        return respond(stocks_cache.get())
+    except Exception as e:
+        print(f"❌ US stocks unavailable: {e}")
+        return jsonify({"error": "US stock data is not available yet", "details": str(e)}), 503
+
+@app.route('/api/alerts/events')
+def alert_events():
+    """
+    हाल में trigger हुए price alerts, नए पहले (?limit=, default 50)।
     """
-    stocks = get_top_stocks_data()
-    return jsonify(stocks)
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({"alerts": alerts.status(), "events": alerts.recent(max(0, limit))})
 
 if __name__ == '__main__':
     # Change port number here (e.g., 8080)
     app.run(debug=True, port=8080)
-    
\ No newline at end of file
@@ -1,9 +1,16 @@
 # datafetch.py
 
-import yfinance as yf
-import pandas as pd
+import os
+import sys
 from datetime import datetime, timedelta
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.metadata_cache import MetadataCache, CACHE_DIR
+from common.metrics import timed_upstream
+
+# yfinance (और उसके साथ pandas) भारी है; इसे उन्हीं functions में import करते हैं जो इसे इस्तेमाल करते हैं,
+# ताकि service जल्दी boot हो
+
 TOP_50_TICKERS = [
     'MSFT', 'AAPL', 'NVDA', 'GOOGL', 'GOOG', 'AMZN', 'META', 'BRK-B', 'LLY', 'AVGO',
     'V', 'JPM', 'TSLA', 'WMT', 'XOM', 'UNH', 'MA', 'PG', 'JNJ', 'ORCL',
@@ -12,10 +19,14 @@ TOP_50_TICKERS = [
     'INTC', 'GE', 'PFE', 'CAT', 'INTU', 'AMAT', 'UBER', 'COP', 'IBM', 'NOW'
 ]
 
+# नाम और market cap जैसे धीरे बदलने वाले .info फ़ील्ड्स का डिस्क कैश
+metadata_cache = MetadataCache(os.path.join(CACHE_DIR, "us_metadata.json"))
+
 def get_top_stocks_data():
     """
     Yahoo Finance API का उपयोग करके टॉप 50 शेयरों का real-time डेटा प्राप्त करता है।
     """
+    import yfinance as yf
     stock_data_list = []
     
     try:
@@ -32,7 +43,8 @@ def get_top_stocks_data():
                 ticker = tickers.tickers[ticker_symbol]
                 
                 # हिस्टोरिकल डेटा प्राप्त करें (1m interval for intraday)
-                hist = ticker.history(period='1d', interval='1m')
+                with timed_upstream("yahoo", "history", ticker_symbol):
+                    hist = ticker.history(period='1d', interval='1m')
                 
                 if not hist.empty:
                     # सबसे recent price
@@ -44,8 +56,8 @@ def get_top_stocks_data():
                     change = current_price - previous_close
                     change_percent = (change / previous_close) * 100 if previous_close != 0 else 0
                     
-                    # info डेटा
-                    info = ticker.info
+                    # info डेटा (कैश से)
+                    info = metadata_cache.get(ticker_symbol)
                     
                     stock_data = {
                         'ticker': ticker_symbol,
@@ -54,15 +66,19 @@ def get_top_stocks_data():
                         'change': round(change, 2),
                         'change_percent': round(change_percent, 2),
                         'market_cap': info.get('marketCap', 0),
-                        'volume': info.get('regularMarketVolume', hist['Volume'].iloc[-1] if not hist.empty else 0),
+                        # आज का कुल volume (regularMarketVolume जैसा ही), .info के बिना 1m bars जोड़कर
+                        'volume': int(hist['Volume'].sum()),
                         'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                     }
                     stock_data_list.append(stock_data)
                 else:
-                    # अगर historical डेटा नहीं मिलता तो info से try करें
-                    info = ticker.info
-                    current_price = info.get('regularMarketPrice', info.get('currentPrice', 0))
-                    previous_close = info.get('previousClose', current_price)
+                    # अगर intraday डेटा नहीं मिलता (market बंद) तो आखिरी daily closes से try करें
+                    info = metadata_cache.get(ticker_symbol)
+                    daily = ticker.history(period='5d')
+                    if daily.empty:
+                        continue
+                    current_price = daily['Close'].iloc[-1]
+                    previous_close = daily['Close'].iloc[-2] if len(daily) > 1 else info.get('previousClose', current_price)
                     
                     change = current_price - previous_close
                     change_percent = (change / previous_close) * 100 if previous_close != 0 else 0
@@ -74,7 +90,7 @@ def get_top_stocks_data():
                         'change': round(change, 2),
                         'change_percent': round(change_percent, 2),
                         'market_cap': info.get('marketCap', 0),
-                        'volume': info.get('regularMarketVolume', 0),
+                        'volume': int(daily['Volume'].iloc[-1]),
                         'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                     }
                     stock_data_list.append(stock_data)
@@ -89,22 +105,24 @@ def get_top_stocks_data():
 
     return stock_data_list
 
-def get_real_time_prices():
+def get_real_time_prices(tickers=TOP_50_TICKERS):
     """
     Real-time prices के लिए alternative approach
     """
+    import yfinance as yf
     try:
         # सभी टिकर एक स्ट्रिंग में
-        tickers_str = ' '.join(TOP_50_TICKERS)
+        tickers_str = ' '.join(tickers)
         
         # Real-time डेटा प्राप्त करें
-        data = yf.download(tickers_str, period="1d", interval="1m", group_by='ticker')
+        with timed_upstream("yahoo", "download"):
+            data = yf.download(tickers_str, period="1d", interval="1m", group_by='ticker', progress=False)
         
         stock_data_list = []
         
-        for ticker in TOP_50_TICKERS:
+        for ticker in tickers:
             if ticker in data:
-                ticker_data = data[ticker]
+                ticker_data = data[ticker].dropna(subset=['Close'])
                 if not ticker_data.empty:
                     current_price = ticker_data['Close'].iloc[-1]
                     previous_close = ticker_data['Close'].iloc[0]
@@ -117,7 +135,7 @@ def get_real_time_prices():
                         'price': round(current_price, 2),
                         'change': round(change, 2),
                         'change_percent': round(change_percent, 2),
-                        'volume': ticker_data['Volume'].iloc[-1]
+                        'volume': int(ticker_data['Volume'].sum())
                     }
                     stock_data_list.append(stock_data)
         
@@ -127,8 +145,41 @@ def get_real_time_prices():
         print(f"Real-time डेटा प्राप्त करने में त्रुटि: {e}")
         return []
 
+# हर ticker की सबसे ताज़ा price row; scheduler इसे tier के हिसाब से refresh करता है
+latest_prices = {}
+
+def refresh_prices(tickers):
+    """
+    दिए गए tickers के 1m prices एक batched download से लाकर latest_prices में रखता है।
+    """
+    for stock in get_real_time_prices(tickers):
+        latest_prices[stock['ticker']] = stock
+
+def get_fast_stocks_data():
+    """
+    Fast path: price/change latest_prices से, और नाम व market cap धीरे refresh होने वाले metadata कैश से।
+    Shape get_top_stocks_data() जैसा ही है। खुद कभी download नहीं करता: prices सिर्फ़ scheduler लाता है
+    (budget और refresher lease के भीतर), इसलिए जितने tickers अभी तक आए हैं उतने ही लौटते हैं।
+    """
+    last_updated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    stock_data_list = []
+    for stock in (latest_prices[t] for t in TOP_50_TICKERS if t in latest_prices):
+        info = metadata_cache.get(stock['ticker'])
+        stock_data_list.append({
+            'ticker': stock['ticker'],
+            'name': info.get('shortName', stock['ticker']),
+            'price': stock['price'],
+            'change': stock['change'],
+            'change_percent': stock['change_percent'],
+            'market_cap': info.get('marketCap', 0),
+            'volume': stock['volume'],
+            'last_updated': last_updated
+        })
+    return stock_data_list
+
 if __name__ == '__main__':
-    # मुख्य फंक्शन टेस्ट
+    # मुख्य फंक्शन टेस्ट; service में नाम और market cap scheduler का "fundamentals" job लाता है
+    metadata_cache.refresh(TOP_50_TICKERS)
     data = get_top_stocks_data()
     if data:
         print(f"{len(data)} कंपनियों का डेटा सफलतापूर्वक प्राप्त हुआ।")
@@ -111,10 +111,12 @@ const getUSStocksFromAPI = async () => {
 
 /**
  * Get stock details by symbol
+ * @param {Object} [range] - optional { period, interval, max_points } for the chart history
  */
-const getStockDetails = async (symbol) => {
+const getStockDetails = async (symbol, range = {}) => {
   try {
     const response = await axios.get(`${API_BASE_URL}/get_stock_details/${symbol}`, {
+      params: range,
       timeout: 5000
     });
     
@@ -5,7 +5,12 @@ const sentimentService = require('./sentimentService');
 
 // CRYPTO1 Flask app configuration
 const CRYPTO1_BASE_URL = "http://127.0.0.1:5000"; // Default Flask port
-const CRYPTO1_API_ENDPOINT = `${CRYPTO1_BASE_URL}/api/data`;
+// Only the top 50 coins and the columns transformed below, instead of CRYPTO1's whole universe
+const CRYPTO1_FIELDS = [
+  "id", "symbol", "name", "image", "current_price", "price_change_24h", "price_change_percentage_24h",
+  "total_volume", "market_cap", "market_cap_rank", "circulating_supply", "total_supply", "max_supply"
+].join(",");
+const CRYPTO1_API_ENDPOINT = `${CRYPTO1_BASE_URL}/api/data?limit=50&fields=${CRYPTO1_FIELDS}`;
 
 // Hardcoded map for crypto symbol to CoinGecko ID mapping
 const SYMBOL_TO_ID_MAP = {
@@ -30,6 +35,7 @@ const SYMBOL_TO_ID_MAP = {
 const cache = {
   data: null,
   timestamp: null,
+  etag: null, // ETag of the CRYPTO1 snapshot behind `data`, for conditional polling
   ttl: 15000 // 15 seconds cache for real-time data
 };
 
@@ -56,10 +62,19 @@ const getCryptoData = async () => {
       timeout: 10000, // 10 second timeout
       headers: {
         'Content-Type': 'application/json',
-        'User-Agent': 'TickerTracker-Backend/1.0.0'
-      }
+        'User-Agent': 'TickerTracker-Backend/1.0.0',
+        ...(cache.etag && cache.data ? { 'If-None-Match': cache.etag } : {})
+      },
+      validateStatus: (status) => (status >= 200 && status < 300) || status === 304
     });
 
+    // Nothing changed on the CRYPTO1 side - keep the already transformed data
+    if (response.status === 304 && cache.data) {
+      cache.timestamp = Date.now();
+      console.log('📦 CRYPTO1 data unchanged (304), reusing transformed data');
+      return cache.data;
+    }
+
     if (!response.data || !Array.isArray(response.data)) {
       throw new Error('Invalid response format from CRYPTO1 service');
     }
@@ -130,6 +145,7 @@ const getCryptoData = async () => {
     // Update cache
     cache.data = transformedData;
     cache.timestamp = Date.now();
+    cache.etag = response.headers.etag || null;
 
     console.log(`✅ Successfully transformed ${transformedData.length} cryptocurrencies from CRYPTO1`);
     return transformedData;
@@ -156,6 +172,7 @@ const getCryptoData = async () => {
         // Update cache with fallback data
         cache.data = fallbackData;
         cache.timestamp = Date.now();
+        cache.etag = null;
         
         return fallbackData;
       }
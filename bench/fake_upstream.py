@@ -0,0 +1,321 @@
+"""
+Local stand-in for the CoinGecko and Yahoo Finance endpoints the services call.
+
+Serves recorded responses from bench/fixtures/ when present and deterministic
+synthetic data otherwise, with configurable latency, jitter, error rate and 429s.
+Every upstream call is counted per route; GET /__stats returns the counts and
+POST /__reset clears them.
+
+    python bench/fake_upstream.py --port 9100 --latency 0.15 --jitter 0.05 --error-rate 0.01
+    python bench/fake_upstream.py --record     # refresh fixtures from the real upstreams
+"""
+import os
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+RANGE_SECONDS = {"1d": 86400, "5d": 5 * 86400, "7d": 7 * 86400, "1mo": 31 * 86400, "30d": 30 * 86400,
+                 "60d": 60 * 86400, "3mo": 92 * 86400, "6mo": 183 * 86400, "1y": 366 * 86400,
+                 "2y": 731 * 86400, "5y": 1827 * 86400, "730d": 730 * 86400}
+INTERVAL_SECONDS = {"1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800, "60m": 3600, "1h": 3600,
+                    "1d": 86400, "5d": 5 * 86400, "1wk": 7 * 86400, "1mo": 30 * 86400}
+
+
+def _seed(*parts):
+    return int(hashlib.md5(":".join(map(str, parts)).encode()).hexdigest()[:8], 16)
+
+
+def _timezone_for(symbol):
+    if symbol.endswith((".NS", ".BO")) or symbol.startswith(("^NSE", "^BSE")): return "Asia/Kolkata", 19800
+    return "America/New_York", -14400
+
+
+class Config:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate_429=0.0, coins=250, tick=10.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.coins = coins
+        self.tick = tick   # seconds between synthetic price moves
+
+
+class Upstream:
+    """Response generation and call accounting, shared by all handler threads."""
+
+    def __init__(self, config):
+        self.config = config
+        self.calls = Counter()
+        self.faults = Counter()
+        self._lock = threading.Lock()
+        self.fixtures = self._load_fixtures()
+
+    def _load_fixtures(self):
+        fixtures = {}
+        if os.path.isdir(FIXTURES_DIR):
+            for name in os.listdir(FIXTURES_DIR):
+                if name.endswith(".json"):
+                    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+                        fixtures[name[:-5]] = json.load(f)
+        return fixtures
+
+    def count(self, route):
+        with self._lock:
+            self.calls[route] += 1
+
+    def stats(self):
+        with self._lock:
+            return {"calls": dict(self.calls), "total": sum(self.calls.values()), "faults": dict(self.faults)}
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.faults.clear()
+
+    def fault(self):
+        """Sleeps for the configured latency, then maybe returns an injected (status, headers)."""
+        c = self.config
+        delay = c.latency + random.uniform(-c.jitter, c.jitter)
+        if delay > 0: time.sleep(delay)
+        roll = random.random()
+        if roll < c.rate_429:
+            with self._lock: self.faults["429"] += 1
+            return 429, {"Retry-After": "1"}
+        if roll < c.rate_429 + c.error_rate:
+            with self._lock: self.faults["5xx"] += 1
+            return random.choice([500, 502, 503]), {}
+        return None
+
+    # --- CoinGecko ---
+
+    def coins(self, per_page, page, vs_currency="usd"):
+        recorded = self.fixtures.get("coingecko_markets")
+        if recorded:
+            rows = recorded
+        else:
+            tick = int(time.time() // self.config.tick) if self.config.tick else 0
+            rows = [self._coin(i, tick) for i in range(self.config.coins)]
+        start = (page - 1) * per_page
+        return rows[start:start + per_page]
+
+    def _coin(self, i, tick):
+        base = 50000 / (i + 1) ** 1.5
+        rnd = random.Random(_seed("coin", i, tick))
+        price = round(base * (1 + rnd.uniform(-0.02, 0.02)), 6)
+        change = round(price * rnd.uniform(-0.08, 0.08), 6)
+        supply = 21e6 * (i + 1) ** 2
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        return {
+            "id": f"coin-{i}", "symbol": f"c{i}", "name": f"Coin {i}",
+            "image": f"https://example.invalid/coin-{i}.png",
+            "current_price": price, "market_cap": round(price * supply), "market_cap_rank": i + 1,
+            "fully_diluted_valuation": None, "total_volume": round(price * supply * rnd.uniform(0.01, 0.1)),
+            "high_24h": round(price * 1.03, 6), "low_24h": round(price * 0.97, 6),
+            "price_change_24h": change, "price_change_percentage_24h": round(change / price * 100, 4),
+            "market_cap_change_24h": round(change * supply), "market_cap_change_percentage_24h": round(change / price * 100, 4),
+            "circulating_supply": supply, "total_supply": supply, "max_supply": None,
+            "ath": price * 2, "ath_change_percentage": -50.0, "ath_date": "2021-11-10T14:24:11.849Z",
+            "atl": price / 100, "atl_change_percentage": 9900.0, "atl_date": "2015-10-20T00:00:00.000Z",
+            "roi": None, "last_updated": now,
+        }
+
+    def exchange_rates(self):
+        recorded = self.fixtures.get("coingecko_exchange_rates")
+        if recorded: return recorded
+        return {"rates": {
+            "btc": {"name": "Bitcoin", "unit": "BTC", "value": 1.0, "type": "crypto"},
+            "usd": {"name": "US Dollar", "unit": "$", "value": 60000.0, "type": "fiat"},
+            "inr": {"name": "Indian Rupee", "unit": "₹", "value": 5010000.0, "type": "fiat"},
+            "eur": {"name": "Euro", "unit": "€", "value": 55200.0, "type": "fiat"},
+        }}
+
+    # --- Yahoo Finance ---
+
+    def chart(self, symbol, params):
+        recorded = self.fixtures.get(f"yahoo_chart_{symbol}")
+        if recorded: return recorded
+        interval = params.get("interval", "1d")
+        step = INTERVAL_SECONDS.get(interval, 86400)
+        now = int(time.time())
+        if "period1" in params:
+            start = int(float(params["period1"]))
+            end = int(float(params.get("period2", now)))
+        else:
+            end = now
+            start = end - RANGE_SECONDS.get(params.get("range", "1mo"), 31 * 86400)
+        tz_name, gmtoffset = _timezone_for(symbol)
+        first = (start // step + 1) * step
+        timestamps = list(range(first, min(end, now) + 1, step))
+        if step >= 86400:
+            timestamps = [t - gmtoffset for t in timestamps
+                          if datetime.fromtimestamp(t, timezone.utc).weekday() < 5]
+        base = 100 + _seed(symbol) % 2000
+        quote = {"open": [], "high": [], "low": [], "close": [], "volume": []}
+        for t in timestamps:
+            rnd = random.Random(_seed(symbol, interval, t))
+            close = round(base * (1 + 0.1 * math.sin(t / 86400 / 9) + rnd.uniform(-0.02, 0.02)), 2)
+            open_ = round(close * (1 + rnd.uniform(-0.01, 0.01)), 2)
+            quote["open"].append(open_)
+            quote["close"].append(close)
+            quote["high"].append(round(max(open_, close) * 1.005, 2))
+            quote["low"].append(round(min(open_, close) * 0.995, 2))
+            quote["volume"].append(rnd.randint(10**5, 10**7))
+        meta = {
+            "currency": "INR" if tz_name == "Asia/Kolkata" else "USD", "symbol": symbol,
+            "exchangeName": "NSI" if tz_name == "Asia/Kolkata" else "NMS", "instrumentType": "EQUITY",
+            "firstTradeDate": 946684800, "regularMarketTime": now, "gmtoffset": gmtoffset,
+            "timezone": "IST" if tz_name == "Asia/Kolkata" else "EDT", "exchangeTimezoneName": tz_name,
+            "regularMarketPrice": quote["close"][-1] if timestamps else base,
+            "chartPreviousClose": base, "priceHint": 2, "dataGranularity": interval,
+            "range": params.get("range", ""), "validRanges": ["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "max"],
+        }
+        if step < 86400:
+            # Intraday responses describe each session; make every session span the whole day
+            days = sorted({t - (t + gmtoffset) % 86400 for t in timestamps})
+            period = lambda d: {"timezone": meta["timezone"], "start": d, "end": d + 86400, "gmtoffset": gmtoffset}
+            meta["tradingPeriods"] = [[period(d)] for d in days]
+            today = days[-1] if days else now - (now + gmtoffset) % 86400
+            meta["currentTradingPeriod"] = {"pre": period(today), "regular": period(today), "post": period(today)}
+        return {"chart": {"result": [{
+            "meta": meta, "timestamp": timestamps,
+            "indicators": {"quote": [quote], "adjclose": [{"adjclose": list(quote["close"])}]},
+        }], "error": None}}
+
+    def quote_summary(self, symbol):
+        recorded = self.fixtures.get(f"yahoo_quotesummary_{symbol}")
+        if recorded: return recorded
+        rnd = random.Random(_seed("info", symbol))
+        return {"quoteSummary": {"result": [{
+            "quoteType": {"symbol": symbol, "shortName": f"{symbol} Corp", "longName": f"{symbol} Corporation"},
+            "assetProfile": {"sector": rnd.choice(["Technology", "Financial Services", "Energy", "Healthcare"])},
+            "summaryDetail": {"marketCap": rnd.randint(10**9, 10**12), "trailingPE": round(rnd.uniform(8, 60), 2),
+                              "previousClose": 100 + _seed(symbol) % 2000},
+            "defaultKeyStatistics": {}, "financialData": {},
+        }], "error": None}}
+
+    def quote(self, symbols):
+        return {"quoteResponse": {"result": [
+            {"symbol": s, "shortName": f"{s} Corp", "regularMarketPrice": 100 + _seed(s) % 2000}
+            for s in symbols], "error": None}}
+
+
+def make_handler(upstream):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body=None, headers=None):
+            payload = json.dumps(body).encode("utf-8") if body is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for k, v in (headers or {}).items(): self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            if self.path == "/__reset":
+                upstream.reset()
+                return self._send(200, {"ok": True})
+            self._send(404, {"error": "not found"})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            path = url.path
+            if path == "/__stats":
+                return self._send(200, upstream.stats())
+
+            routes = [
+                (r"^/api/v3/coins/markets$", "coingecko.markets",
+                 lambda m: upstream.coins(int(params.get("per_page", 100)), int(params.get("page", 1)))),
+                (r"^/api/v3/exchange_rates$", "coingecko.exchange_rates", lambda m: upstream.exchange_rates()),
+                (r"^/v8/finance/chart/([^/]+)$", "yahoo.chart", lambda m: upstream.chart(m.group(1), params)),
+                (r"^/v10/finance/quoteSummary/([^/]+)$", "yahoo.quoteSummary",
+                 lambda m: upstream.quote_summary(m.group(1))),
+                (r"^/v10/finance/quoteSummary$", "yahoo.quoteSummary",
+                 lambda m: upstream.quote_summary(params.get("symbol", ""))),
+                (r"^/v7/finance/quote$", "yahoo.quote",
+                 lambda m: upstream.quote(params.get("symbols", "").split(","))),
+                (r"^/v1/test/getcrumb$", "yahoo.crumb", None),
+            ]
+            for pattern, route, build in routes:
+                match = re.match(pattern, path)
+                if not match: continue
+                upstream.count(route)
+                if build is None:
+                    return self._send(200, "fake-crumb")
+                fault = upstream.fault()
+                if fault:
+                    return self._send(fault[0], {"error": "injected fault"}, fault[1])
+                return self._send(200, build(match))
+            self._send(404, {"error": f"no fake route for {path}"})
+
+    return Handler
+
+
+def serve(port=9100, config=None, background=False):
+    """Starts the fake upstream; with background=True returns (server, upstream) after starting a thread."""
+    upstream = Upstream(config or Config())
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(upstream))
+    server.daemon_threads = True
+    if background:
+        threading.Thread(target=server.serve_forever, name="fake-upstream", daemon=True).start()
+        return server, upstream
+    print(f"🧪 Fake upstream listening on http://127.0.0.1:{server.server_address[1]}")
+    server.serve_forever()
+
+
+def record(symbols):
+    """Saves real CoinGecko/Yahoo responses into bench/fixtures/ for later replay."""
+    import requests
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    headers = {"User-Agent": "Mozilla/5.0 TickerTracker-bench"}
+
+    def save(name, data):
+        with open(os.path.join(FIXTURES_DIR, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        print(f"💾 {name}")
+
+    markets = requests.get("https://api.coingecko.com/api/v3/coins/markets",
+                           params={"vs_currency": "usd", "order": "market_cap_desc", "per_page": 250, "page": 1},
+                           headers=headers, timeout=30)
+    markets.raise_for_status()
+    save("coingecko_markets", markets.json())
+    for symbol in symbols:
+        chart = requests.get(f"https://query2.finance.yahoo.com/v8/finance/chart/{symbol}",
+                             params={"range": "1mo", "interval": "1d"}, headers=headers, timeout=30)
+        if chart.ok: save(f"yahoo_chart_{symbol}", chart.json())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.0, help="base seconds added to every upstream call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of uniform jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 5xx")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument("--coins", type=int, default=250, help="synthetic CoinGecko universe size")
+    parser.add_argument("--record", nargs="*", metavar="SYMBOL",
+                        help="record real responses (CoinGecko markets plus charts for SYMBOLs) and exit")
+    args = parser.parse_args()
+    if args.record is not None:
+        return record(args.record)
+    serve(args.port, Config(args.latency, args.jitter, args.error_rate, args.rate_429, args.coins))
+
+
+if __name__ == "__main__":
+    main()
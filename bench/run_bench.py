@@ -0,0 +1,148 @@
+"""
+Offline load benchmark for the API, US and CRYPTO1 Flask services.
+
+Starts the fake upstream in-process, launches each service with bench/serve.py,
+then drives every endpoint at each concurrency level and reports p50/p95/p99
+latency, throughput, error counts and how many upstream calls the load caused.
+
+    python bench/run_bench.py --services crypto,us --concurrency 1,8,32 --duration 10
+    python bench/run_bench.py --latency 0.2 --jitter 0.1 --error-rate 0.02 --json bench_output.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_upstream import serve as serve_upstream, Config
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SCENARIOS = {
+    "api": ["/get_market_data", "/get_us_market_data", "/get_stock_details/TCS.NS"],
+    "us": ["/api/data"],
+    "crypto": ["/api/data", "/api/data?since=1"],
+}
+PORTS = {"api": 5101, "us": 5102, "crypto": 5103}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values: return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def start_service(name, upstream_url, ready_timeout=120):
+    """Launches a service subprocess and waits until it answers; returns (process, cold_latency)."""
+    port = PORTS[name]
+    proc = subprocess.Popen([sys.executable, os.path.join(HERE, "serve.py"), name,
+                             "--port", str(port), "--upstream", upstream_url],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + ready_timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{name} exited with code {proc.returncode}")
+        try:
+            started = time.perf_counter()
+            requests.get(base + SCENARIOS[name][0], timeout=ready_timeout)
+            return proc, time.perf_counter() - started
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{name} did not come up within {ready_timeout}s")
+
+
+def drive(url, concurrency, duration):
+    """Hammers url from `concurrency` keep-alive clients for `duration` seconds."""
+    latencies, statuses, lock = [], {}, threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker():
+        session = requests.Session()
+        local, local_status = [], {}
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                status = session.get(url, timeout=60).status_code
+            except requests.RequestException:
+                status = "error"
+            local.append(time.perf_counter() - started)
+            local_status[status] = local_status.get(status, 0) + 1
+        with lock:
+            latencies.extend(local)
+            for k, v in local_status.items(): statuses[k] = statuses.get(k, 0) + v
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.monotonic()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.monotonic() - started
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 2) if v is not None else None
+    return {
+        "requests": len(latencies), "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": ms(percentile(latencies, 50)), "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)), "max_ms": ms(latencies[-1] if latencies else None),
+        "statuses": {str(k): v for k, v in statuses.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", default="api,us,crypto")
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per endpoint per concurrency level")
+    parser.add_argument("--upstream-port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    server, upstream = serve_upstream(args.upstream_port,
+                                      Config(args.latency, args.jitter, args.error_rate, args.rate_429),
+                                      background=True)
+    upstream_url = f"http://127.0.0.1:{args.upstream_port}"
+    levels = [int(c) for c in args.concurrency.split(",")]
+    results = []
+
+    print(f"{'service':<8} {'endpoint':<28} {'conc':>4} {'reqs':>6} {'rps':>8} {'p50ms':>8} "
+          f"{'p95ms':>8} {'p99ms':>8} {'upstream':>8}  statuses")
+    for name in args.services.split(","):
+        upstream.reset()
+        proc, cold = start_service(name, upstream_url)
+        cold_calls = upstream.stats()["total"]
+        print(f"{name:<8} {'(cold start)':<28} {'':>4} {'':>6} {'':>8} {cold * 1000:>8.1f} "
+              f"{'':>8} {'':>8} {cold_calls:>8}")
+        results.append({"service": name, "endpoint": "(cold start)", "latency_ms": round(cold * 1000, 2),
+                        "upstream_calls": cold_calls})
+        try:
+            for path in SCENARIOS[name]:
+                for concurrency in levels:
+                    before = upstream.stats()["total"]
+                    row = drive(f"http://127.0.0.1:{PORTS[name]}{path}", concurrency, args.duration)
+                    row.update(service=name, endpoint=path, concurrency=concurrency,
+                               upstream_calls=upstream.stats()["total"] - before)
+                    results.append(row)
+                    print(f"{name:<8} {path:<28} {concurrency:>4} {row['requests']:>6} {row['throughput_rps']:>8} "
+                          f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8} "
+                          f"{row['upstream_calls']:>8}  {row['statuses']}")
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    server.shutdown()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Runs one of the Flask services against the fake upstream instead of the real internet.
+
+CoinGecko is redirected through COINGECKO_API_URL; yfinance requests are rewritten
+from *.finance.yahoo.com to the fake upstream (and skip the cookie/crumb handshake).
+
+    python bench/serve.py api --port 5101 --upstream http://127.0.0.1:9100
+"""
+import os
+import re
+import sys
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVICES = {
+    "api": os.path.join(ROOT, "API"),
+    "us": os.path.join(ROOT, "US"),
+    "crypto": os.path.join(ROOT, "CRYPTO1", "CRYPTO"),
+}
+
+
+def install_yahoo_redirect(base_url, cache_dir):
+    """Points every yfinance HTTP call at base_url using a plain keep-alive requests session."""
+    import requests
+    import yfinance as yf
+    import yfinance.data as yf_data
+
+    session = requests.Session()
+    yahoo = re.compile(r"^https://[^/]*yahoo\.com")
+
+    def _make_request(self, url, request_method, body=None, params=None, timeout=30, data=None):
+        return session.get(yahoo.sub(base_url, url), params=params, timeout=timeout)
+
+    yf_data.YfData._make_request = _make_request
+    yf.set_tz_cache_location(os.path.join(cache_dir, "yf-tz"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("service", choices=sorted(SERVICES))
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--upstream", default="http://127.0.0.1:9100")
+    parser.add_argument("--cache-dir", default=None, help="defaults to a fresh temporary directory")
+    args = parser.parse_args()
+
+    cache_dir = args.cache_dir or tempfile.mkdtemp(prefix=f"tt-bench-{args.service}-")
+    os.environ["TICKERTRACKER_CACHE_DIR"] = cache_dir
+    os.environ["COINGECKO_API_URL"] = f"{args.upstream}/api/v3"
+    if args.service != "crypto":
+        install_yahoo_redirect(args.upstream, cache_dir)
+
+    service_dir = SERVICES[args.service]
+    os.chdir(service_dir)
+    sys.path.insert(0, service_dir)
+    import app as service
+    service.app.run(host="127.0.0.1", port=args.port, threaded=True, debug=False, use_reloader=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Helpers shared by the Python services (API, US and CRYPTO1)."""
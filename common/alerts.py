@@ -0,0 +1,238 @@
+import os
+import json
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from common.metadata_cache import CACHE_DIR
+
+ALERTS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "backend", "data", "alerts.json")
+MAX_FIRED = 20000     # fired alerts remembered (and served as recent events), oldest dropped first
+_FIRST, _LAST = "", "\uffff"   # ids sorting before/after any real alert id at the same target
+CURRENCY_SIGNS = {"₹": "INR", "$": "USD", "€": "EUR"}
+
+
+def alert_direction(alert):
+    """"above" or "below" for a price alert, from its condition text; None for sentiment and other alerts."""
+    text = str(alert.get("condition", "")).lower()
+    if alert.get("targetPrice") is None: return None
+    if "below" in text or "decreases" in text: return "below"
+    if "above" in text or "increases" in text: return "above"
+    return None
+
+
+def alert_currency(alert):
+    """Currency of a price alert's target, from the sign in its condition ("Price above ₹2850.5" is INR), or None."""
+    text = str(alert.get("condition", ""))
+    return next((code for sign, code in CURRENCY_SIGNS.items() if sign in text), None)
+
+
+def parse_time(value):
+    """Epoch seconds of an ISO timestamp like "2025-09-20T07:49:04.318Z", or None."""
+    if not value: return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def ticker_prices(rows, symbol_key="symbol", price_key="price", currency=None):
+    """
+    {ticker: (price, currency)} for snapshot rows, under the full symbol and the bare
+    one ("TCS.NS" and "TCS"). The currency is the row's "currency" field, else `currency`.
+    """
+    prices = {}
+    for row in rows or []:
+        symbol, price = row.get(symbol_key), row.get(price_key)
+        if symbol is None or not isinstance(price, (int, float)): continue
+        symbol = str(symbol).upper()
+        quote = (price, row.get("currency", currency))
+        # Rows come best-ranked first, so a ticker shared by several coins keeps the first one
+        prices.setdefault(symbol, quote)
+        prices.setdefault(symbol.split(".")[0], quote)
+    return prices
+
+
+class AlertEngine:
+    """
+    Evaluates the price alerts in backend/data/alerts.json against each new market
+    snapshot. Active alerts are kept per (ticker, target currency) in two sorted
+    lists of (target, id), one for "above" and one for "below", plus a heap of
+    expiry times. A snapshot only touches tickers whose price changed; for each,
+    the price is converted into every currency its alerts are set in (through
+    `fx`, a common.fx.FXTable) and bisecting between the previous and the new
+    price yields exactly the alerts crossed, so evaluation costs O(changed tickers
+    x log alerts) however many alerts exist. A price seen for the first time fires
+    every alert it already satisfies. Targets without a currency sign are compared
+    with the price as quoted; while no exchange rates are loaded, the others wait.
+
+    Alerts fire once. The alerts file belongs to the Node backend and is only read
+    (and re-indexed when it changes); which alerts fired is kept per service in
+    the cache directory so restarts do not fire them again. Several services quote
+    some of the same tickers, so with `claims` (common.shared_store) an alert fires
+    only in the first service to claim it.
+    """
+
+    def __init__(self, name, path=ALERTS_PATH, events_path=None, fx=None, claims=None):
+        self.name = name
+        self.path = path
+        self.events_path = events_path or os.path.join(CACHE_DIR, f"alert_events_{name}.jsonl")
+        self.fx = fx
+        self.claims = claims
+        self.alerts = {}                        # id -> alert
+        self.above = defaultdict(list)          # (ticker, currency) -> sorted [(target, id)]
+        self.below = defaultdict(list)
+        self.currencies = defaultdict(set)      # ticker -> target currencies of its alerts
+        self.expiry = []                        # heap of (expires_at, id)
+        self.prices = {}                        # (ticker, currency) -> last evaluated price in that currency
+        self.fired = {}                         # id -> event, oldest first
+        self._mtime = None
+        self._events_mtime = None
+        self._logged = 0                        # lines in the events file
+        self._lock = threading.Lock()
+        self._load_events()
+
+    def _load_events(self):
+        try:
+            with open(self.events_path, encoding="utf-8") as f:
+                events = [json.loads(line) for line in f if line.strip()]
+            self._events_mtime = os.path.getmtime(self.events_path)
+        except (OSError, ValueError):
+            return
+        self.fired = {event["id"]: event for event in events[-MAX_FIRED:]}
+        self._logged = len(events)
+
+    def _save_events(self, events):
+        """Appends new events as JSON lines; rewrites the file once it holds twice MAX_FIRED lines."""
+        os.makedirs(os.path.dirname(self.events_path), exist_ok=True)
+        if self._logged + len(events) > 2 * MAX_FIRED:
+            tmp = f"{self.events_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in self.fired.values())
+            os.replace(tmp, self.events_path)
+            self._logged = len(self.fired)
+        else:
+            with open(self.events_path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in events)
+            self._logged += len(events)
+        self._events_mtime = os.path.getmtime(self.events_path)
+
+    def reload(self, now=None):
+        """Re-indexes the alerts file if it changed since the last load."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime: return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                alerts = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ {self.name}: could not read alerts: {e}")
+            return
+        self._mtime = mtime
+        now = datetime.now(timezone.utc).timestamp() if now is None else now
+        self.alerts, self.above, self.below, self.expiry = {}, defaultdict(list), defaultdict(list), []
+        self.currencies = defaultdict(set)
+        for alert in alerts:
+            direction = alert_direction(alert)
+            if direction is None or not alert.get("isActive", True) or alert.get("id") in self.fired: continue
+            expires = parse_time(alert.get("expiresAt"))
+            if expires is not None and expires <= now: continue
+            ticker, currency = str(alert.get("ticker", "")).upper(), alert_currency(alert)
+            self.alerts[alert["id"]] = {**alert, "ticker": ticker, "currency": currency, "direction": direction}
+            index = self.above if direction == "above" else self.below
+            index[(ticker, currency)].append((float(alert["targetPrice"]), alert["id"]))
+            self.currencies[ticker].add(currency)
+            if expires is not None:
+                self.expiry.append((expires, alert["id"]))
+        for index in (self.above, self.below):
+            for targets in index.values():
+                targets.sort()
+        heapq.heapify(self.expiry)
+        self.prices = {}   # next snapshot is a first sight, so new alerts that already hold fire
+        print(f"🔔 {self.name}: indexed {len(self.alerts)} active price alerts")
+
+    def _remove(self, alert_id):
+        alert = self.alerts.pop(alert_id, None)
+        if alert is None: return None
+        targets = (self.above if alert["direction"] == "above" else self.below)[(alert["ticker"], alert["currency"])]
+        entry = (float(alert["targetPrice"]), alert_id)
+        i = bisect_left(targets, entry)
+        if i < len(targets) and targets[i] == entry: del targets[i]
+        return alert
+
+    def _quote(self, price, native, currency, rates):
+        """`price` (quoted in `native`) in `currency`, or None while the rates needed are unknown."""
+        if currency is None or native is None or currency == native: return price
+        if rates is None or native not in rates or currency not in rates: return None
+        return price * rates[currency] / rates[native]
+
+    def evaluate(self, prices, now=None):
+        """
+        Checks a snapshot's {ticker: (price, currency)} against the indexes and returns
+        the alerts crossed since each ticker's previous price, as event dicts.
+        """
+        now = datetime.now(timezone.utc).timestamp() if now is None else now
+        with self._lock:
+            self.reload(now)
+            while self.expiry and self.expiry[0][0] <= now:
+                self._remove(heapq.heappop(self.expiry)[1])
+            crossed, rates = [], None
+            for ticker, (price, native) in prices.items():
+                for currency in self.currencies.get(ticker, ()):
+                    if rates is None and self.fx is not None and currency not in (None, native):
+                        rates = self.fx.rates()
+                    value = self._quote(price, native, currency, rates)
+                    key = (ticker, currency)
+                    previous = self.prices.get(key)
+                    if value is None or previous == value: continue
+                    self.prices[key] = value
+                    above, below = self.above.get(key), self.below.get(key)
+                    if above:
+                        # Targets in (previous, value]; everything up to value on first sight
+                        lo = 0 if previous is None else bisect_right(above, (previous, _LAST))
+                        crossed.extend((alert_id, previous) for _, alert_id in above[lo:bisect_right(above, (value, _LAST))])
+                    if below:
+                        # Targets in [value, previous); everything from value up on first sight
+                        hi = len(below) if previous is None else bisect_left(below, (previous, _FIRST))
+                        crossed.extend((alert_id, previous) for _, alert_id in below[bisect_left(below, (value, _FIRST)):hi])
+            events = []
+            stamp = datetime.fromtimestamp(now, timezone.utc).isoformat()
+            for alert_id, previous in crossed:
+                alert = self._remove(alert_id)
+                if alert is None: continue
+                # Another service quoting the same ticker already fired it
+                if self.claims is not None and not self.claims.claim(f"alert/{alert_id}"): continue
+                event = {"id": alert_id, "ticker": alert["ticker"], "condition": alert.get("condition"),
+                         "targetPrice": alert["targetPrice"], "currency": alert["currency"],
+                         "price": self.prices[(alert["ticker"], alert["currency"])],
+                         "previousPrice": previous, "triggeredAt": stamp}
+                self.fired[alert_id] = event
+                events.append(event)
+            if events:
+                while len(self.fired) > MAX_FIRED:
+                    self.fired.pop(next(iter(self.fired)))
+                self._save_events(events)
+        if events:
+            shown = ", ".join(f"{e['ticker']} {e['condition']} (now {e['price']})" for e in events[:3])
+            print(f"🔔 {self.name}: {len(events)} alert(s) triggered: {shown}{' ...' if len(events) > 3 else ''}")
+        return events
+
+    def recent(self, limit=50):
+        """Most recent triggered alerts, newest first; picks up events written by the refresher worker."""
+        with self._lock:
+            try:
+                if os.path.getmtime(self.events_path) != self._events_mtime: self._load_events()
+            except OSError:
+                pass
+            return list(self.fired.values())[::-1][:limit]
+
+    def status(self):
+        with self._lock:
+            return {"active": len(self.alerts), "tickers": len({key[0] for index in (self.above, self.below) for key, targets in index.items() if targets}),
+                    "next_expiry": datetime.fromtimestamp(self.expiry[0][0], timezone.utc).isoformat()
+                    if self.expiry else None, "fired": len(self.fired)}
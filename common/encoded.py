@@ -0,0 +1,121 @@
+import json
+import gzip
+import math
+import time
+import zlib
+import threading
+from collections import OrderedDict
+
+from common.metrics import SERIALIZATION_SECONDS
+
+try:
+    import orjson
+except ImportError:  # plain json is several times slower but produces the same document
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS = 1024   # bodies smaller than this are always sent as identity
+
+
+def dumps(payload):
+    """Compact JSON bytes; NaN/Infinity become null and numpy values are handled."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_finite(payload), separators=(",", ":"), default=str, ensure_ascii=False).encode("utf-8")
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _finite(value):
+    if isinstance(value, float) and not math.isfinite(value): return None
+    if isinstance(value, dict): return {k: _finite(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)): return [_finite(v) for v in value]
+    return value
+
+
+class Encoded:
+    """
+    A JSON payload serialized once, with gzip (and brotli when installed) variants
+    built next to it, so repeated responses cost no encoding or compression CPU.
+    `raw` takes an already serialized body instead of a payload.
+    """
+
+    def __init__(self, payload, name="payload", raw=None):
+        started = time.perf_counter()
+        self.payload = payload
+        self.variants = {"identity": dumps(payload) if raw is None else raw}
+        if len(self.variants["identity"]) >= MIN_COMPRESS:
+            self.variants["gzip"] = gzip.compress(self.variants["identity"], 6)
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(self.variants["identity"], quality=5)
+        SERIALIZATION_SECONDS.observe(time.perf_counter() - started, name)
+
+    def body(self, encoding, tail=None):
+        return self.variants[encoding]
+
+
+class EncodedObject(Encoded):
+    """
+    A JSON object serialized once whose final key (`tail_key`) is filled in per
+    request, e.g. a snapshot status with a live age. The gzip stream of the fixed
+    part is kept open so each response only compresses the small tail.
+    """
+
+    def __init__(self, payload, tail_key, name="payload"):
+        started = time.perf_counter()
+        self.payload = payload
+        raw = dumps(payload)
+        self.prefix = raw[:-1] + (b"," if payload else b"") + dumps(tail_key) + b":"
+        self.variants = {"identity": self.prefix}
+        if len(self.prefix) >= MIN_COMPRESS:
+            self._gzip = zlib.compressobj(6, zlib.DEFLATED, 31)
+            self.variants["gzip"] = self._gzip.compress(self.prefix)
+        SERIALIZATION_SECONDS.observe(time.perf_counter() - started, name)
+
+    def body(self, encoding, tail=None):
+        tail = dumps(tail) + b"}"
+        if encoding == "gzip":
+            stream = self._gzip.copy()
+            return self.variants["gzip"] + stream.compress(tail) + stream.flush()
+        return self.prefix + tail
+
+
+class EncodedCache:
+    """Small LRU of Encoded bodies keyed by e.g. (data version, query string)."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            encoded = self.entries.get(key)
+            if encoded is not None:
+                self.entries.move_to_end(key)
+                return encoded
+        encoded = build()
+        with self._lock:
+            self.entries[key] = encoded
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return encoded
+
+
+def respond(encoded, status=200, tail=None):
+    """Flask response with the best variant the client accepts, Content-Encoding and Vary set."""
+    from flask import Response, request
+    offered = [e for e in ("br", "gzip") if e in encoded.variants]
+    encoding = request.accept_encodings.best_match(offered) if offered else None
+    encoding = encoding or "identity"
+    response = Response(encoded.body(encoding, tail), status=status, mimetype="application/json")
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
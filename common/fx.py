@@ -0,0 +1,96 @@
+import os
+import time
+
+from common.snapshot_cache import SnapshotCache
+from common.encoded import dumps, loads
+
+COINGECKO_API_URL = os.environ.get("COINGECKO_API_URL", "https://api.coingecko.com/api/v3")
+CURRENCIES = ("INR", "USD", "EUR")   # currencies every snapshot is precomputed in, served via ?currency=
+FX_TTL = 3600                        # seconds; exchange rates move far slower than prices
+RETRY_INTERVAL = 60                  # seconds between attempts while no rates have ever loaded
+
+
+def native_currency(symbol):
+    """Quote currency of a Yahoo symbol: INR for NSE/BSE listings, None for index levels, else USD."""
+    if symbol.startswith("^"): return None
+    if symbol.endswith((".NS", ".BO")): return "INR"
+    return "USD"
+
+
+def fetch_rates(client, base_url=COINGECKO_API_URL):
+    """Units of each configured currency per US dollar, from CoinGecko's BTC-based exchange rates."""
+    rates = client.get_json(f"{base_url}/exchange_rates", "exchange_rates")["rates"]
+    usd = rates["usd"]["value"]
+    return {currency: rates[currency.lower()]["value"] / usd for currency in CURRENCIES}
+
+
+def convert_rows(rows, fields, factor, digits=None, currency=None):
+    """
+    Copies of rows with the numeric `fields` multiplied by `factor` (a number, or a
+    function of the row returning one or None to keep the row as it is). Integers
+    stay integers; floats are rounded to `digits` when given. With `currency`,
+    converted rows get it as their "currency" field.
+    """
+    out = []
+    for row in rows:
+        f = factor(row) if callable(factor) else factor
+        if f is None or f == 1:
+            out.append(row)
+            continue
+        row = dict(row)
+        if currency is not None: row["currency"] = currency
+        for field in fields:
+            value = row.get(field)
+            if isinstance(value, bool) or not isinstance(value, (int, float)): continue
+            if isinstance(value, int):
+                row[field] = int(round(value * f))
+            else:
+                row[field] = round(value * f, digits) if digits is not None else value * f
+        out.append(row)
+    return out
+
+
+class FXTable:
+    """
+    USD-based exchange rates for CURRENCIES on their own slow TTL. With `shared`
+    (common.shared_store), only the refresher worker calls CoinGecko and the others
+    read the rates it published; a failed refresh keeps serving the previous rates.
+    """
+
+    def __init__(self, name, client, shared=None, ttl=FX_TTL, budget=None, base_url=COINGECKO_API_URL):
+        self.client = client
+        self.shared = shared
+        self.budget = budget
+        self.base_url = base_url
+        self.cache = SnapshotCache(f"{name} FX", self._load, ttl)
+        self._failed_at = None
+
+    def _load(self):
+        if self.shared is not None and not self.shared.is_leader():
+            # Followers never call CoinGecko: until the refresher publishes, rates stay unavailable
+            row = self.shared.read("fx")
+            return loads(row.data) if row is not None else self.cache.value
+        if self.budget is not None and not self.budget.try_acquire():
+            raise RuntimeError("request budget exhausted")
+        rates = fetch_rates(self.client, self.base_url)
+        if self.shared is not None:
+            self.shared.publish("fx", dumps(rates))
+        return rates
+
+    def rates(self):
+        """{currency: units per USD}, or None while no rates have loaded (or, on a follower, been published)."""
+        if self.cache.value is None and self._failed_at and time.monotonic() - self._failed_at < RETRY_INTERVAL:
+            return None
+        try:
+            rates = self.cache.get()
+        except Exception as e:
+            self._failed_at = time.monotonic()
+            print(f"❌ Could not load exchange rates: {e}")
+            return None
+        self._failed_at = None
+        return rates
+
+    def status(self):
+        age = self.cache.age()
+        return {"currencies": list(CURRENCIES), "base": "USD", "rates": self.cache.value,
+                "age_seconds": round(age, 1) if age is not None else None, "ttl_seconds": self.cache.ttl}
@@ -0,0 +1,117 @@
+import time
+from datetime import date, datetime, timedelta, time as dtime
+from zoneinfo import ZoneInfo
+
+# Seconds after the close before the day's final bar and close price are settled on Yahoo
+SETTLE_SECONDS = 15 * 60
+
+# Full-day closures only. A missing holiday just costs an extra fetch; a wrong one would
+# suppress fetches while the market trades, so only dates from the exchanges' published lists.
+NSE_HOLIDAYS = {
+    date(2025, 2, 26), date(2025, 3, 14), date(2025, 3, 31), date(2025, 4, 10), date(2025, 4, 14),
+    date(2025, 4, 18), date(2025, 5, 1), date(2025, 8, 15), date(2025, 8, 27), date(2025, 10, 2),
+    date(2025, 10, 21), date(2025, 10, 22), date(2025, 11, 5), date(2025, 12, 25),
+    date(2026, 1, 26), date(2026, 4, 3), date(2026, 4, 14), date(2026, 5, 1), date(2026, 10, 2),
+    date(2026, 12, 25),
+}
+NYSE_HOLIDAYS = {
+    date(2025, 1, 1), date(2025, 1, 9), date(2025, 1, 20), date(2025, 2, 17), date(2025, 4, 18),
+    date(2025, 5, 26), date(2025, 6, 19), date(2025, 7, 4), date(2025, 9, 1), date(2025, 11, 27),
+    date(2025, 12, 25),
+    date(2026, 1, 1), date(2026, 1, 19), date(2026, 2, 16), date(2026, 4, 3), date(2026, 5, 25),
+    date(2026, 6, 19), date(2026, 7, 3), date(2026, 9, 7), date(2026, 11, 26), date(2026, 12, 25),
+}
+
+
+class Exchange:
+    """
+    Regular trading sessions of one exchange, Monday to Friday minus holidays.
+    A session for trading day D runs from `open` on D minus `open_days_before`
+    to `close` on D (CME's Globex day opens the previous evening).
+    """
+
+    def __init__(self, name, tz, open, close, holidays=(), open_days_before=0):
+        self.name = name
+        self.tz = ZoneInfo(tz)
+        self.open = open
+        self.close = close
+        self.holidays = set(holidays)
+        self.open_days_before = open_days_before
+        self._memo = {}
+
+    def session(self, day):
+        """(open, close) epoch seconds for trading day `day`, or None if it is not a trading day."""
+        if day not in self._memo:
+            if day.weekday() >= 5 or day in self.holidays:
+                self._memo[day] = None
+            else:
+                opens = datetime.combine(day - timedelta(days=self.open_days_before), self.open, self.tz)
+                self._memo[day] = (opens.timestamp(), datetime.combine(day, self.close, self.tz).timestamp())
+        return self._memo[day]
+
+    def sessions(self, at, days=10):
+        """Sessions within `days` calendar days either side of `at`, oldest first."""
+        today = datetime.fromtimestamp(at, self.tz).date()
+        for offset in range(-days, days + 1):
+            session = self.session(today + timedelta(days=offset))
+            if session: yield session
+
+    def is_open(self, at=None):
+        at = time.time() if at is None else at
+        return any(opens <= at < closes for opens, closes in self.sessions(at, 2))
+
+    def next_open(self, at=None):
+        at = time.time() if at is None else at
+        return next((opens for opens, _ in self.sessions(at) if opens > at), at + 86400)
+
+    def last_close(self, at=None):
+        at = time.time() if at is None else at
+        return max((closes for _, closes in self.sessions(at) if closes <= at), default=at - 86400)
+
+
+EXCHANGES = {
+    "NSE": Exchange("NSE", "Asia/Kolkata", dtime(9, 15), dtime(15, 30), NSE_HOLIDAYS),
+    "NYSE": Exchange("NYSE", "America/New_York", dtime(9, 30), dtime(16, 0), NYSE_HOLIDAYS),
+    "CME": Exchange("CME", "America/Chicago", dtime(17, 0), dtime(16, 0), open_days_before=1),
+}
+
+
+def exchange_for(symbol):
+    """.NS/.BO and the NSE/BSE indices trade on NSE hours, =F futures on CME Globex, everything else on NYSE."""
+    s = symbol.upper()
+    if s.endswith((".NS", ".BO")) or s.startswith(("^NSE", "^BSE", "^CNX")): return EXCHANGES["NSE"]
+    if s.endswith("=F"): return EXCHANGES["CME"]
+    return EXCHANGES["NYSE"]
+
+
+def is_open(symbol, at=None):
+    return exchange_for(symbol).is_open(at)
+
+
+def next_open(symbol, at=None):
+    return exchange_for(symbol).next_open(at)
+
+
+def expires_at(symbol, fetched_at, ttl):
+    """
+    When data for symbol fetched at `fetched_at` goes stale: `ttl` later while the
+    market trades, or not until the next open if it was fetched after the close settled.
+    """
+    exchange = exchange_for(symbol)
+    if not exchange.is_open(fetched_at) and fetched_at >= exchange.last_close(fetched_at) + SETTLE_SECONDS:
+        return max(fetched_at + ttl, exchange.next_open(fetched_at))
+    return fetched_at + ttl
+
+
+def status(names=None, at=None):
+    """Open/closed state and next open per exchange, for API payloads."""
+    at = time.time() if at is None else at
+    result = {}
+    for name in names or EXCHANGES:
+        exchange = EXCHANGES[name]
+        result[name] = {
+            "open": exchange.is_open(at),
+            "next_open": datetime.fromtimestamp(exchange.next_open(at), exchange.tz).isoformat(),
+            "last_close": datetime.fromtimestamp(exchange.last_close(at), exchange.tz).isoformat(),
+        }
+    return result
@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from common.metrics import cache_event, timed_upstream
+from common import market_calendar
+
+CACHE_DIR = os.environ.get(
+    "TICKERTRACKER_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache")
+)
+
+DAY = 24 * 3600
+
+# Ticker.info fields we actually read, grouped by how quickly they change.
+# A TTL of None means "valid for the current session" (until the symbol's market next opens).
+FIELD_CLASSES = {
+    "profile": (("longName", "shortName", "sector"), 7 * DAY),
+    "valuation": (("marketCap", "trailingPE"), DAY),
+    "session": (("previousClose",), None),
+}
+
+
+def _fetch_info(symbol):
+    import yfinance as yf
+    return yf.Ticker(symbol).info
+
+
+class MetadataCache:
+    """
+    On-disk cache of slow-moving Ticker.info fields, keyed by symbol.
+    Reads never touch the network; refresh() re-fetches only symbols whose
+    field classes have expired and persists the result.
+    """
+
+    def __init__(self, path, fetch_info=_fetch_info, max_workers=8):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.fetch_info = fetch_info
+        self.max_workers = max_workers
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+            print(f"🗂️ Loaded metadata for {len(self.entries)} symbols from {self.path}")
+        except FileNotFoundError:
+            self.entries = {}
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable metadata cache {self.path}: {e}")
+            self.entries = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+
+    def get(self, symbol):
+        """Cached info fields for symbol (possibly empty or stale); never blocks on the network."""
+        entry = self.entries.get(symbol)
+        cache_event(self.name, "hit" if entry else "miss")
+        return entry["fields"] if entry else {}
+
+    def is_due(self, symbol, now=None):
+        now = now or time.time()
+        fetched = self.entries.get(symbol, {}).get("fetched", {})
+        for name, (_, ttl) in FIELD_CLASSES.items():
+            ts = fetched.get(name)
+            if ts is None: return True
+            if ttl is None:
+                if market_calendar.next_open(symbol, ts) <= now: return True
+            elif now - ts > ttl: return True
+        return False
+
+    def stale_symbols(self, symbols):
+        now = time.time()
+        return [s for s in symbols if self.is_due(s, now)]
+
+    def _refresh_one(self, symbol):
+        with timed_upstream("yahoo", "info", symbol):
+            info = self.fetch_info(symbol) or {}
+        now = time.time()
+        entry = self.entries.get(symbol)
+        fields = dict(entry["fields"]) if entry else {}
+        for keys, _ in FIELD_CLASSES.values():
+            fields.update({k: info[k] for k in keys if info.get(k) is not None})
+        with self._lock:
+            self.entries[symbol] = {"fields": fields, "fetched": {name: now for name in FIELD_CLASSES}}
+
+    def refresh(self, symbols):
+        """Re-fetches .info for every symbol with an expired field class, in parallel, then saves."""
+        due = self.stale_symbols(symbols)
+        if not due: return 0
+        print(f"🗂️ Refreshing metadata for {len(due)} symbols...")
+        refreshed = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for symbol, error in zip(due, pool.map(self._try_refresh, due)):
+                if error: print(f"Could not refresh metadata for {symbol}: {error}")
+                else: refreshed += 1
+        self.save()
+        return refreshed
+
+    def _try_refresh(self, symbol):
+        try:
+            self._refresh_one(symbol)
+        except Exception as e:
+            return e
+        return None
+
+    def start_background(self, symbols, interval=15 * 60):
+        """Keeps `symbols` fresh from a daemon thread; safe to call more than once."""
+        with self._lock:
+            if self._thread is not None: return
+            self._thread = threading.Thread(target=self._run, args=(list(symbols), interval),
+                                            name="metadata-refresh", daemon=True)
+        self._thread.start()
+
+    def _run(self, symbols, interval):
+        while True:
+            try:
+                self.refresh(symbols)
+            except Exception as e:
+                print(f"❌ Metadata refresh failed: {e}")
+            time.sleep(interval)
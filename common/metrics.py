@@ -0,0 +1,249 @@
+import os
+import sys
+import time
+import bisect
+import threading
+from collections import Counter as _Tally
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PROFILE_INTERVALS = (0.005, 1.0)   # seconds; sampling intervals outside this range are clamped
+# /metrics/profile answers only local clients unless this is set (it can start a sampler thread)
+PROFILE_REMOTE = os.environ.get("TICKERTRACKER_PROFILE_REMOTE") == "1"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs: return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}   # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *labels):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets): series[index] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self.series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', '+Inf')])} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+# --- Process-wide metrics ---
+
+UPSTREAM_SECONDS = Histogram("upstream_request_seconds", "Upstream call latency by provider and operation",
+                             ["provider", "operation", "outcome"])
+UPSTREAM_SYMBOL_SECONDS = Counter("upstream_symbol_seconds_total", "Total upstream seconds spent per symbol",
+                                  ["provider", "symbol"])
+UPSTREAM_SYMBOL_CALLS = Counter("upstream_symbol_calls_total", "Upstream calls per symbol", ["provider", "symbol"])
+UPSTREAM_RETRIES = Counter("upstream_retries_total", "Upstream retries by provider and reason (status or error)",
+                           ["provider", "reason"])
+CACHE_EVENTS = Counter("cache_events_total", "Cache lookups by cache and result (hit, miss, stale)",
+                       ["cache", "result"])
+HTTP_SECONDS = Histogram("http_request_seconds", "Request latency per route", ["route", "method", "status"])
+SERIALIZATION_SECONDS = Histogram("response_serialization_seconds", "JSON encoding time per route", ["route"],
+                                  buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+
+REGISTRY = [UPSTREAM_SECONDS, UPSTREAM_SYMBOL_SECONDS, UPSTREAM_SYMBOL_CALLS, UPSTREAM_RETRIES, CACHE_EVENTS,
+            HTTP_SECONDS, SERIALIZATION_SECONDS]
+
+
+@contextmanager
+def timed_upstream(provider, operation, symbol=None):
+    """Times one upstream call; per-symbol totals show which symbols dominate refresh time."""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        UPSTREAM_SECONDS.observe(elapsed, provider, operation, outcome)
+        if symbol is not None:
+            UPSTREAM_SYMBOL_SECONDS.inc(provider, symbol, amount=elapsed)
+            UPSTREAM_SYMBOL_CALLS.inc(provider, symbol)
+
+
+def cache_event(cache, result):
+    CACHE_EVENTS.inc(cache, result)
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(PROFILER.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Sampling profiler ---
+
+class SamplingProfiler:
+    """
+    Samples every thread's stack on an interval while enabled and tallies the
+    innermost frames, so hot paths show up without instrumenting them.
+    """
+
+    def __init__(self, interval=0.01, depth=3):
+        self.interval = interval
+        self.depth = depth
+        self.samples = _Tally()
+        self.total = 0
+        self.enabled = False
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, interval=None):
+        with self._lock:
+            if interval and interval == interval:   # not 0 or NaN
+                self.interval = min(max(interval, PROFILE_INTERVALS[0]), PROFILE_INTERVALS[1])
+            if self.enabled: return
+            self.enabled = True
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+            self.total = 0
+
+    def _run(self):
+        me = threading.get_ident()
+        while self.enabled:
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, frame in frames.items():
+                    if ident == me: continue
+                    stack = []
+                    while frame is not None and len(stack) < self.depth:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                        frame = frame.f_back
+                    self.samples[" <- ".join(stack)] += 1
+                    self.total += 1
+            time.sleep(self.interval)
+
+    def top(self, n=25):
+        with self._lock:
+            return {"enabled": self.enabled, "interval": self.interval, "samples": self.total,
+                    "top": [{"stack": s, "count": c} for s, c in self.samples.most_common(n)]}
+
+    def render(self, n=25):
+        if not self.total: return []
+        lines = ["# HELP profiler_samples_total Sampled stacks (innermost frames first)",
+                 "# TYPE profiler_samples_total counter"]
+        for entry in self.top(n)["top"]:
+            lines.append(f"profiler_samples_total{_labels(['stack'], [entry['stack']])} {entry['count']}")
+        return lines
+
+
+PROFILER = SamplingProfiler()
+
+
+# --- Flask integration ---
+
+def install(app):
+    """
+    Adds per-route latency and JSON encoding timing to a Flask app, plus
+    GET /metrics (Prometheus text) and GET/POST /metrics/profile.
+    """
+    from flask import Response, g, jsonify, request
+    from flask.json.provider import DefaultJSONProvider
+
+    class TimedJSONProvider(DefaultJSONProvider):
+        def dumps(self, obj, **kwargs):
+            started = time.perf_counter()
+            try:
+                return super().dumps(obj, **kwargs)
+            finally:
+                route = request.url_rule.rule if request and request.url_rule else "none"
+                SERIALIZATION_SECONDS.observe(time.perf_counter() - started, route)
+
+    provider = TimedJSONProvider(app)
+    provider.sort_keys = app.json.sort_keys
+    provider.compact = getattr(app.json, "compact", None)
+    app.json = provider
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe(response):
+        started = g.pop("_metrics_started", None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            HTTP_SECONDS.observe(time.perf_counter() - started, route, request.method, str(response.status_code))
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
+
+    @app.route('/metrics/profile', methods=['GET', 'POST'])
+    def metrics_profile():
+        """
+        GET for the current top stacks; POST ?action=start|stop|reset[&interval=0.01] to control sampling.
+        Only for local tools like curl: remote clients and browser requests (which carry an Origin) get a 403.
+        """
+        if not PROFILE_REMOTE and (request.remote_addr not in ("127.0.0.1", "::1") or request.headers.get("Origin")):
+            return jsonify({"error": "The profiler is only available to local clients "
+                                     "(set TICKERTRACKER_PROFILE_REMOTE=1 to allow others)"}), 403
+        if request.method == 'POST':
+            action = request.args.get('action', 'start')
+            if action == 'start': PROFILER.start(request.args.get('interval', type=float))
+            elif action == 'stop': PROFILER.stop()
+            elif action == 'reset': PROFILER.reset()
+            else: return jsonify({"error": f"Unknown action: {action}"}), 400
+        return jsonify(PROFILER.top(request.args.get('n', 25, type=int)))
+
+    if os.environ.get("TICKERTRACKER_PROFILE") == "1":
+        PROFILER.start()
+    return app
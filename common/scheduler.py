@@ -0,0 +1,259 @@
+import os
+import json
+import math
+import time
+import threading
+from collections import Counter as _Tally
+
+from common.metrics import Counter, REGISTRY
+
+WATCHLIST_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              "backend", "data", "watchlist.json")
+
+# Default refresh cadence per tier, in seconds
+TIERS = {"hot": 5, "universe": 60, "fundamentals": 24 * 3600}
+
+REFRESHED = Counter("scheduler_refreshed_keys_total", "Keys refreshed by the scheduler", ["scheduler", "job"])
+DEFERRED = Counter("scheduler_deferred_keys_total", "Due keys postponed because the provider budget ran out",
+                   ["scheduler", "job"])
+REGISTRY.extend([REFRESHED, DEFERRED])
+
+
+def watchlist_symbols(universe, path=WATCHLIST_PATH):
+    """Universe symbols on the user watchlist; bare tickers like "TCS" match "TCS.NS"."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            watched = {str(s).upper() for s in json.load(f)}
+    except (OSError, ValueError):
+        return []
+    return [s for s in universe if s.upper() in watched or s.split(".")[0].upper() in watched]
+
+
+class TokenBucket:
+    """Allows `rate` upstream calls per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, cost=1):
+        with self._lock:
+            self._refill()
+            if self.tokens < cost: return False
+            self.tokens -= cost
+            return True
+
+    def take(self, wanted):
+        """Takes up to `wanted` whole tokens and returns how many were granted."""
+        with self._lock:
+            self._refill()
+            granted = min(int(wanted), int(self.tokens))
+            self.tokens -= granted
+            return granted
+
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self.tokens
+
+
+class Demand:
+    """Request counts per key that decay with a half-life, so priority follows recent traffic."""
+
+    def __init__(self, half_life=600):
+        self.decay = math.log(2) / half_life
+        self.scores = {}   # key -> (score, monotonic time of that score)
+        self._lock = threading.Lock()
+
+    def _current(self, key, now):
+        score, at = self.scores.get(key, (0.0, now))
+        return score * math.exp(-self.decay * (now - at))
+
+    def hit(self, key, count=1):
+        now = time.monotonic()
+        with self._lock:
+            self.scores[key] = (self._current(key, now) + count, now)
+
+    def score(self, key):
+        with self._lock:
+            return self._current(key, time.monotonic())
+
+    def top(self, n, minimum=1.0):
+        now = time.monotonic()
+        with self._lock:
+            scored = [(self._current(k, now), k) for k in self.scores]
+            self.scores = {k: self.scores[k] for s, k in scored if s >= 0.01}
+        return [k for s, k in sorted(scored, reverse=True)[:n] if s >= minimum]
+
+
+class Job:
+    def __init__(self, name, provider, tier, keys, refresh, promote, on_refresh, expires):
+        self.name = name
+        self.provider = provider
+        self.tier = tier
+        self.keys = list(keys)
+        self.refresh = refresh
+        self.promote = promote          # hot keys are refreshed at the "hot" cadence in this job
+        self.on_refresh = on_refresh
+        self.expires = expires          # optional (key, refreshed_at, interval) -> time the refresh goes stale
+        self.last = {}                  # key -> time.time() of its last refresh
+        self.deferred = 0
+        self.last_error = None
+        self.ready = threading.Event()  # set after this job's first pass
+
+
+class RefreshScheduler:
+    """
+    Refreshes symbols off the request path on a daemon thread. Each job refreshes
+    its keys at its tier's cadence; pinned keys and the most requested ones are
+    "hot" and refreshed at the hot cadence instead. Every refresh spends one token
+    per key from its provider's TokenBucket, hot and most-demanded keys first,
+    and whatever the budget cannot cover waits for the next tick.
+    With `shared` (common.shared_store), only the worker holding the refresher
+    lease runs passes, so extra worker processes add no upstream calls; the other
+    workers hand their request counts to it through the store once per tick.
+    """
+
+    def __init__(self, name, buckets, tiers=None, hot_size=10, tick=1.0, shared=None):
+        self.name = name
+        self.shared = shared
+        self.buckets = buckets
+        self.tiers = {**TIERS, **(tiers or {})}
+        self.hot_size = hot_size
+        self.tick = tick
+        self.jobs = []
+        self.pinned = []
+        self.demand = Demand()
+        self.unshared = _Tally()         # hits not yet handed to the refresher worker
+        self.ready = threading.Event()   # set after the first pass over every job
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def add_job(self, name, provider, tier, keys, refresh, promote=False, on_refresh=None, expires=None):
+        self.jobs.append(Job(name, provider, tier, keys, refresh, promote, on_refresh, expires))
+        self.jobs.sort(key=lambda job: self.tiers[job.tier])
+        return self
+
+    def wait_for(self, name, timeout=None):
+        """Starts the scheduler and waits for the named job's first pass."""
+        self.start()
+        return next(job for job in self.jobs if job.name == name).ready.wait(timeout)
+
+    def pin(self, keys):
+        self.pinned.extend(k for k in keys if k not in self.pinned)
+
+    def hit(self, key):
+        """Records one client request for key; frequently requested keys become hot."""
+        self.demand.hit(key)
+        if self.shared is not None:
+            with self._lock:
+                self.unshared[key] += 1
+
+    def share_demand(self, leader):
+        """The refresher merges the hits other workers handed over; the others hand theirs over."""
+        if leader:
+            for key, count in self.shared.take_hits().items():
+                self.demand.hit(key, count)
+        with self._lock:
+            counts, self.unshared = dict(self.unshared), _Tally()
+        # The refresher's own hits are already in its demand
+        if not leader: self.shared.add_hits(counts)
+
+    def _share_demand(self, leader):
+        try:
+            self.share_demand(leader)
+        except Exception as e:
+            print(f"⚠️ {self.name}: could not share request counts: {e}")
+
+    def hot_keys(self):
+        hot = list(self.pinned)
+        hot.extend(k for k in self.demand.top(self.hot_size) if k not in hot)
+        return hot
+
+    def due(self, job, hot, now):
+        """Due keys for job, most urgent first: hot, then most requested, then most overdue."""
+        keys = job.keys + [k for k in hot if job.promote and k not in job.keys]
+        hot = set(hot)
+        due = []
+        for key in keys:
+            interval = self.tiers["hot"] if job.promote and key in hot else self.tiers[job.tier]
+            last = job.last.get(key)
+            if last is not None:
+                stale_at = job.expires(key, last, interval) if job.expires else last + interval
+                if now < stale_at: continue
+            overdue = math.inf if last is None else (now - last) / interval
+            due.append((key not in hot, -self.demand.score(key), -overdue, key))
+        return [key for *_, key in sorted(due)]
+
+    def run_once(self):
+        try:
+            hot = self.hot_keys()
+            for job in self.jobs:
+                self._run_job(job, hot)
+        finally:
+            # Even a failed pass releases ready.wait() callers instead of leaving them to time out
+            self.ready.set()
+
+    def _run_job(self, job, hot):
+        due = self.due(job, hot, time.time())
+        if not due: return
+        batch = due[:self.buckets[job.provider].take(len(due))]
+        job.deferred = len(due) - len(batch)
+        if job.deferred: DEFERRED.inc(self.name, job.name, amount=job.deferred)
+        if not batch: return
+        now = time.time()
+        try:
+            job.refresh(batch)
+            job.last_error = None
+        except Exception as e:
+            job.last_error = str(e)
+            print(f"❌ {self.name}/{job.name} refresh failed: {e}")
+        # Failed keys also wait out their interval rather than hammering the provider
+        job.last.update((key, now) for key in batch)
+        REFRESHED.inc(self.name, job.name, amount=len(batch))
+        job.ready.set()
+        if job.on_refresh:
+            try:
+                job.on_refresh(batch)
+            except Exception as e:
+                print(f"❌ {self.name}/{job.name} on_refresh callback failed: {e}")
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"scheduler-{self.name}", daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                leader = self.shared is None or self.shared.is_leader()
+                if self.shared is not None: self._share_demand(leader)
+                if leader: self.run_once()
+            except Exception as e:
+                print(f"❌ {self.name} scheduler pass failed: {e}")
+            time.sleep(self.tick)
+
+    def status(self):
+        now = time.time()
+        hot = self.hot_keys()
+        return {
+            "tiers": self.tiers,
+            "hot": hot,
+            "budgets": {name: {"tokens": round(b.available(), 1), "rate_per_second": b.rate, "capacity": b.capacity}
+                        for name, b in self.buckets.items()},
+            "jobs": [{
+                "name": job.name, "provider": job.provider, "tier": job.tier, "keys": len(job.keys),
+                "due": len(self.due(job, hot, now)), "deferred": job.deferred, "last_error": job.last_error,
+                "oldest_refresh_seconds": round(max(now - t for t in job.last.values()), 1) if job.last else None,
+            } for job in self.jobs],
+        }
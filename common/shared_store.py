@@ -0,0 +1,244 @@
+import os
+import time
+import uuid
+import atexit
+import socket
+import sqlite3
+import threading
+from collections import namedtuple
+
+from common.metadata_cache import CACHE_DIR
+
+# "sqlite" shares snapshots between worker processes on this host; "none" keeps every process on its own
+BACKEND = os.environ.get("TICKERTRACKER_SHARED_STORE", "sqlite")
+SHARED_PATH = os.path.join(CACHE_DIR, "shared.sqlite3")
+LEASE_TTL = 15   # seconds a refresher may go silent before another worker takes over
+
+SharedRow = namedtuple("SharedRow", "version data meta published_at")
+
+
+class SQLiteSnapshotStore:
+    """
+    Named, versioned snapshot blobs and refresher leases in one SQLite WAL file,
+    readable by every worker process on the host while one of them writes.
+    """
+
+    def __init__(self, path=SHARED_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS snapshots (name TEXT PRIMARY KEY, version INTEGER NOT NULL, "
+                     "data BLOB NOT NULL, meta TEXT, published_at REAL NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, "
+                     "expires_at REAL NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS claims (name TEXT PRIMARY KEY, owner TEXT NOT NULL, "
+                     "claimed_at REAL NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS hits (name TEXT, key TEXT, count INTEGER NOT NULL, "
+                     "PRIMARY KEY (name, key))")
+        conn.commit()
+        conn.close()   # never hand a connection across a fork
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.pid = os.getpid()
+        return conn
+
+    def put(self, name, data, version=None, meta=None):
+        """Stores a snapshot; without an explicit version it gets the next one. Returns the version."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if version is None:
+                row = conn.execute("SELECT version FROM snapshots WHERE name = ?", (name,)).fetchone()
+                version = (row[0] if row else 0) + 1
+            conn.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)",
+                         (name, version, data, meta, time.time()))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return version
+
+    def version(self, name):
+        row = self._conn().execute("SELECT version FROM snapshots WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def get(self, name, newer_than=0):
+        """The stored snapshot if its version is above newer_than, else None (without reading the blob)."""
+        if self.version(name) <= newer_than: return None
+        row = self._conn().execute("SELECT version, data, meta, published_at FROM snapshots WHERE name = ?",
+                                   (name,)).fetchone()
+        return SharedRow(*row) if row else None
+
+    def try_lease(self, name, owner, ttl):
+        """Takes or renews the named lease for owner unless someone else holds an unexpired one."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("INSERT INTO leases VALUES (?, ?, ?) ON CONFLICT(name) DO UPDATE SET "
+                     "owner = excluded.owner, expires_at = excluded.expires_at "
+                     "WHERE leases.owner = excluded.owner OR leases.expires_at < ?", (name, owner, now + ttl, now))
+        row = conn.execute("SELECT owner FROM leases WHERE name = ?", (name,)).fetchone()
+        return row is not None and row[0] == owner
+
+    def release(self, name, owner):
+        self._conn().execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def add_hits(self, name, counts):
+        """Adds {key: count} to the named hit counters."""
+        if not counts: return
+        self._conn().executemany("INSERT INTO hits VALUES (?, ?, ?) ON CONFLICT(name, key) DO UPDATE SET "
+                                 "count = count + excluded.count", [(name, k, n) for k, n in counts.items()])
+
+    def take_hits(self, name):
+        """The named hit counters as {key: count}, reset to zero."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("SELECT key, count FROM hits WHERE name = ?", (name,)).fetchall()
+            conn.execute("DELETE FROM hits WHERE name = ?", (name,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return dict(rows)
+
+    def claim(self, name, owner):
+        """Claims `name` for owner for good: True for the first owner to ask (and on its repeats), else False."""
+        conn = self._conn()
+        conn.execute("INSERT OR IGNORE INTO claims VALUES (?, ?, ?)", (name, owner, time.time()))
+        row = conn.execute("SELECT owner FROM claims WHERE name = ?", (name,)).fetchone()
+        return row is not None and row[0] == owner
+
+
+class SharedSnapshots:
+    """
+    Snapshots shared by every worker of one service, plus the lease that elects
+    the single worker allowed to refresh them from upstream. The lease is renewed
+    from a daemon thread started on first use, never at import time, so a
+    pre-forking server or the debug reloader's parent process never holds it.
+    """
+
+    def __init__(self, name, store, lease_ttl=LEASE_TTL):
+        self.name = name
+        self.store = store
+        self.lease_ttl = lease_ttl
+        self.owner = None
+        self.leader = False
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def is_leader(self):
+        self.start()
+        return self.leader
+
+    def start(self):
+        with self._lock:
+            if self._pid != os.getpid():   # first use, or first use after a fork
+                self._pid = os.getpid()
+                self.owner = f"{socket.gethostname()}:{self._pid}:{uuid.uuid4().hex[:8]}"
+                self.leader = False
+                self._renew()
+                self._thread = threading.Thread(target=self._run, name=f"lease-{self.name}", daemon=True)
+                self._thread.start()
+                atexit.register(self.release)
+        return self
+
+    def _renew(self):
+        try:
+            held = self.store.try_lease(self.name, self.owner, self.lease_ttl)
+        except sqlite3.Error as e:
+            print(f"⚠️ {self.name}: could not renew refresher lease: {e}")
+            held = False
+        if held != self.leader:
+            print(f"👑 {self.name}: this worker (pid {os.getpid()}) is now the refresher" if held
+                  else f"⚠️ {self.name}: refresher lease lost, following the shared snapshot")
+        self.leader = held
+
+    def _run(self):
+        while True:
+            time.sleep(self.lease_ttl / 3)
+            self._renew()
+
+    def release(self):
+        if self.leader:
+            try:
+                self.store.release(self.name, self.owner)
+            except sqlite3.Error:
+                pass
+            self.leader = False
+
+    def publish(self, key, data, version=None, meta=None):
+        return self.store.put(f"{self.name}/{key}", data, version, meta)
+
+    def read(self, key, newer_than=0):
+        return self.store.get(f"{self.name}/{key}", newer_than)
+
+    def add_hits(self, counts):
+        """Hands this worker's request counts to the refresher worker."""
+        self.store.add_hits(self.name, counts)
+
+    def take_hits(self):
+        """Request counts the other workers handed over since the last call."""
+        return self.store.take_hits(self.name)
+
+    def claim(self, key):
+        """One-time claim on `key` shared by every service on the host (not scoped to this one)."""
+        try:
+            return self.store.claim(key, self.name)
+        except sqlite3.Error as e:
+            print(f"⚠️ {self.name}: could not claim {key}: {e}")
+            return True
+
+    def wait(self, key, newer_than=0, timeout=30):
+        """Polls until the refresher publishes something newer than newer_than, or timeout."""
+        deadline = time.monotonic() + timeout
+        while True:
+            row = self.read(key, newer_than)
+            if row is not None or time.monotonic() >= deadline: return row
+            time.sleep(0.25)
+
+
+class LocalOnly:
+    """Stand-in when sharing is off: this process always refreshes and nothing is published."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def is_leader(self):
+        return True
+
+    def publish(self, key, data, version=None, meta=None):
+        return version
+
+    def read(self, key, newer_than=0):
+        return None
+
+    def add_hits(self, counts):
+        pass
+
+    def take_hits(self):
+        return {}
+
+    def claim(self, key):
+        return True
+
+    def wait(self, key, newer_than=0, timeout=30):
+        return None
+
+
+_store = {}
+
+
+def shared_snapshots(name):
+    """SharedSnapshots for a service, backed by TICKERTRACKER_SHARED_STORE (default: SQLite in the cache dir)."""
+    if BACKEND == "none": return LocalOnly(name)
+    if BACKEND != "sqlite":
+        raise ValueError(f"Unknown TICKERTRACKER_SHARED_STORE backend: {BACKEND}")
+    if "sqlite" not in _store:
+        _store["sqlite"] = SQLiteSnapshotStore()
+    return SharedSnapshots(name, _store["sqlite"])
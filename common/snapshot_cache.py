@@ -0,0 +1,78 @@
+import time
+import threading
+
+from common.metrics import cache_event
+
+
+class _Flight:
+    """One in-progress load that concurrent callers wait on instead of starting their own."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class SnapshotCache:
+    """
+    TTL cache around a loader function with single-flight refreshes: when the
+    value expires, the first caller loads it and every concurrent caller waits
+    for that same load. If a load fails, the previous value is served stale.
+    """
+
+    def __init__(self, name, loader, ttl, min_refresh_interval=0):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval  # forced refreshes closer than this reuse the value
+        self.value = None
+        self.loaded_at = None      # time.time() of the last successful load
+        self.loads = 0
+        self._lock = threading.Lock()
+        self._flight = None
+
+    def age(self):
+        return time.time() - self.loaded_at if self.loaded_at else None
+
+    def is_fresh(self):
+        return self.value is not None and self.loaded_at is not None and self.age() < self.ttl
+
+    def get(self, force=False):
+        with self._lock:
+            if self.is_fresh() and (not force or self.age() < self.min_refresh_interval):
+                cache_event(self.name, "hit")
+                return self.value
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = _Flight()
+
+        cache_event(self.name, "miss" if leader else "coalesced")
+        if leader:
+            try:
+                self._load()
+            except Exception as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    self._flight = None
+                flight.done.set()
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            if self.value is None: raise flight.error
+            cache_event(self.name, "stale")
+            print(f"⚠️ {self.name}: refresh failed ({flight.error}), serving stale data")
+        return self.value
+
+    def _load(self):
+        print(f"🌐 {self.name}: loading fresh data...")
+        value = self.loader()
+        self.value = value
+        self.loaded_at = time.time()
+        self.loads += 1
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self.loaded_at = None
@@ -0,0 +1,109 @@
+import os
+import gzip
+import json
+import time
+import threading
+from functools import lru_cache
+from datetime import datetime, timezone
+
+from common.metadata_cache import CACHE_DIR
+from common.encoded import dumps, loads
+
+STARTUP_LOG = os.path.join(CACHE_DIR, "startup_times.jsonl")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASES = ("imported", "first_response", "first_refresh")
+
+_IMPORTED = time.monotonic()
+
+
+def save_snapshot(path, data):
+    """Writes a JSON-serializable snapshot to `path` as gzip-compressed JSON, atomically."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(gzip.compress(dumps(data), 6))
+    os.replace(tmp, path)
+
+
+def load_snapshot(path):
+    """The snapshot saved at `path`, or None if there is none or it cannot be read."""
+    try:
+        with open(path, "rb") as f:
+            return loads(gzip.decompress(f.read()))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not read saved snapshot {path}: {e}")
+        return None
+
+
+def process_uptime():
+    """Seconds since this process started (from /proc on Linux), else since this module was imported."""
+    try:
+        with open("/proc/self/stat") as f:
+            started = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - started / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.monotonic() - _IMPORTED
+
+
+@lru_cache(maxsize=1)
+def release():
+    """TICKERTRACKER_RELEASE, else the checked-out git commit, else "dev"."""
+    if os.environ.get("TICKERTRACKER_RELEASE"): return os.environ["TICKERTRACKER_RELEASE"]
+    try:
+        with open(os.path.join(ROOT, ".git", "HEAD")) as f:
+            head = f.read().strip()
+        if not head.startswith("ref: "): return head[:12]
+        ref = head[5:]
+        try:
+            with open(os.path.join(ROOT, ".git", ref)) as f:
+                return f.read().strip()[:12]
+        except FileNotFoundError:
+            with open(os.path.join(ROOT, ".git", "packed-refs")) as f:
+                return next(line.split()[0][:12] for line in f if line.rstrip().endswith(" " + ref))
+    except (OSError, StopIteration):
+        return "dev"
+
+
+class StartupReport:
+    """
+    Boot latency of one service process: seconds from process start until the app
+    module finished importing, the first market data response and the first fresh
+    (not restored) snapshot. Each phase is logged as it happens; once all are in,
+    one JSON line per boot is appended to startup_times.jsonl in the cache directory,
+    tagged with the release, so boot times can be compared across releases.
+    """
+
+    def __init__(self, service, path=STARTUP_LOG):
+        self.service = service
+        self.path = path
+        self.phases = {}
+        self.details = {}
+        self._lock = threading.Lock()
+
+    def mark(self, phase, **details):
+        """Records `phase` the first time it happens; later calls are no-ops."""
+        if phase in self.phases: return
+        with self._lock:
+            if phase in self.phases: return
+            self.phases[phase] = round(process_uptime(), 3)
+            self.details.update(details)
+            complete = all(p in self.phases for p in PHASES)
+        print(f"⏱️ {self.service}: {phase} after {self.phases[phase]:.2f}s")
+        if complete: self._write()
+
+    def status(self):
+        return {"service": self.service, "release": release(), "pid": os.getpid(),
+                "seconds_since_process_start": dict(self.phases), **self.details}
+
+    def _write(self):
+        record = {**self.status(), "at": datetime.now(timezone.utc).isoformat()}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"⚠️ Could not write startup report: {e}")
@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+from common.alerts import AlertEngine, alert_currency, alert_direction, ticker_prices
+
+NOW = 1_800_000_000
+
+
+def alert(alert_id, ticker, condition, target, **extra):
+    return {"id": alert_id, "ticker": ticker, "condition": condition, "targetPrice": target, "isActive": True, **extra}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    alerts = [
+        alert("a100", "TCS", "Price above", 100),
+        alert("a110", "TCS", "Price above", 110),
+        alert("a120", "TCS", "Price above", 120),
+        alert("b90", "TCS", "Price below", 90),
+        alert("b80", "TCS", "Price decreases below", 80),
+        alert("x", "INFY", "Price above", 10, expiresAt="2020-01-01T00:00:00Z"),
+        alert("off", "TCS", "Price above", 1, isActive=False),
+    ]
+    path = tmp_path / "alerts.json"
+    path.write_text(json.dumps(alerts))
+    return AlertEngine("test", path=str(path), events_path=str(tmp_path / "events.jsonl"))
+
+
+def fired(events):
+    return sorted(e["id"] for e in events)
+
+
+def test_first_sight_fires_every_satisfied_alert(engine):
+    assert fired(engine.evaluate({"TCS": (85, None)}, NOW)) == ["b90"]
+    assert fired(engine.evaluate({"TCS": (115, None)}, NOW)) == ["a100", "a110"]
+    assert engine.status()["active"] == 2
+
+
+def test_only_targets_crossed_between_prices_fire_once(engine):
+    engine.evaluate({"TCS": (95, None)}, NOW)                                # first sight: nothing crossed
+    assert fired(engine.evaluate({"TCS": (110, None)}, NOW)) == ["a100", "a110"]
+    assert engine.evaluate({"TCS": (95, None)}, NOW) == []                   # fired alerts do not fire again
+    assert fired(engine.evaluate({"TCS": (85, None)}, NOW)) == ["b90"]
+    assert fired(engine.evaluate({"TCS": (200, None)}, NOW)) == ["a120"]
+    assert engine.evaluate({"INFY": (50, None)}, NOW) == []                  # expired
+
+
+def test_fired_alerts_survive_a_restart(engine):
+    engine.evaluate({"TCS": (95, None)}, NOW)
+    engine.evaluate({"TCS": (101, None)}, NOW)
+    again = AlertEngine("test", path=engine.path, events_path=engine.events_path)
+    assert fired(again.evaluate({"TCS": (101, None)}, NOW)) == []
+    assert [e["id"] for e in again.recent()] == ["a100"]
+
+
+def test_direction_and_ticker_prices():
+    assert alert_direction(alert("1", "X", "Price increases above", 1)) == "above"
+    assert alert_direction({"condition": "Sentiment turns negative"}) is None
+    rows = [{"symbol": "TCS.NS", "price": 1.0, "currency": "INR"}, {"symbol": "tcs.bo", "price": 2.0},
+            {"symbol": "X", "price": None}]
+    assert ticker_prices(rows, currency="USD") == {"TCS.NS": (1.0, "INR"), "TCS": (1.0, "INR"), "TCS.BO": (2.0, "USD")}
+    assert alert_currency(alert("1", "X", "Price above ₹14604.55", 14604.55)) == "INR"
+    assert alert_currency(alert("1", "X", "Price above $3022.8", 3022.8)) == "USD"
+    assert alert_currency(alert("1", "X", "Price above 10", 10)) is None
+
+
+class FakeFX:
+    def __init__(self, rates):
+        self.value = rates
+
+    def rates(self):
+        return self.value
+
+
+class Claims:
+    def __init__(self):
+        self.taken = set()
+
+    def claim(self, key):
+        if key in self.taken: return False
+        self.taken.add(key)
+        return True
+
+
+def engine_for(tmp_path, name, alerts, **kwargs):
+    path = tmp_path / "alerts.json"
+    path.write_text(json.dumps(alerts))
+    return AlertEngine(name, path=str(path), events_path=str(tmp_path / f"{name}.jsonl"), **kwargs)
+
+
+def test_targets_are_compared_in_their_own_currency(tmp_path):
+    fx = FakeFX(None)
+    engine = engine_for(tmp_path, "test", [alert("inr", "AAPL", "Price above ₹14604.55", 14604.55),
+                                           alert("usd", "AAPL", "Price below $150", 150),
+                                           alert("eur", "TCS", "Price above €40", 40)], fx=fx)
+    assert engine.evaluate({"AAPL": (170.0, "USD"), "TCS.NS": (3500.0, "INR")}, NOW) == []   # no rates yet
+    fx.value = {"USD": 1.0, "INR": 83.5, "EUR": 0.92}
+    assert engine.evaluate({"AAPL": (170.0, "USD"), "TCS": (3500.0, "INR")}, NOW) == []      # ₹14195, €38.6
+    events = engine.evaluate({"AAPL": (176.0, "USD"), "TCS": (3700.0, "INR")}, NOW)
+    assert fired(events) == ["eur", "inr"]
+    assert {e["id"]: e["currency"] for e in events} == {"eur": "EUR", "inr": "INR"}
+    assert next(e for e in events if e["id"] == "inr")["price"] == pytest.approx(176.0 * 83.5)
+    assert fired(engine.evaluate({"AAPL": (149.0, "USD")}, NOW)) == ["usd"]
+
+
+def test_an_alert_fires_in_only_one_service(tmp_path):
+    claims = Claims()
+    alerts = [alert("aapl", "AAPL", "Price above $100", 100)]
+    api = engine_for(tmp_path, "api", alerts, claims=claims)
+    us = engine_for(tmp_path, "us", alerts, claims=claims)
+    assert fired(api.evaluate({"AAPL": (150.0, "USD")}, NOW)) == ["aapl"]
+    assert us.evaluate({"AAPL": (150.0, "USD")}, NOW) == []
+    assert us.status()["active"] == 0
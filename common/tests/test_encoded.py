@@ -0,0 +1,63 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask
+
+from common import encoded as encoded_module
+from common.encoded import Encoded, EncodedObject, MIN_COMPRESS, dumps, respond
+
+app = Flask(__name__)
+BIG = {"stocks": [{"symbol": f"S{i}", "price": i * 1.5} for i in range(200)]}
+
+
+def serve(encoded, accept=None, tail=None):
+    headers = {"Accept-Encoding": accept} if accept is not None else {}
+    with app.test_request_context(headers=headers):
+        return respond(encoded, tail=tail)
+
+
+def decoded(response):
+    body = response.get_data()
+    if response.headers.get("Content-Encoding") == "gzip": body = gzip.decompress(body)
+    return json.loads(body)
+
+
+def test_negotiates_gzip_and_falls_back_to_identity():
+    encoded = Encoded(BIG)
+    gz = serve(encoded, "gzip, deflate")
+    assert gz.headers["Content-Encoding"] == "gzip"
+    assert decoded(gz) == BIG
+    assert "Accept-Encoding" in gz.headers["Vary"]
+    for accept in (None, "deflate", "gzip;q=0"):
+        plain = serve(encoded, accept)
+        assert "Content-Encoding" not in plain.headers
+        assert decoded(plain) == BIG
+
+
+@pytest.mark.skipif(encoded_module.brotli is None, reason="brotli not installed")
+def test_prefers_brotli_when_installed():
+    assert serve(Encoded(BIG), "gzip, br").headers["Content-Encoding"] == "br"
+
+
+def test_small_bodies_are_never_compressed():
+    small = Encoded({"ok": True})
+    assert len(small.variants["identity"]) < MIN_COMPRESS
+    assert "Content-Encoding" not in serve(small, "gzip").headers
+
+
+def test_non_finite_floats_become_null():
+    assert json.loads(dumps({"a": float("nan"), "b": [float("inf"), 1.0]})) == {"a": None, "b": [None, 1.0]}
+
+
+def test_encoded_object_streams_a_fresh_tail_per_response():
+    snapshot = EncodedObject(BIG, "status")
+    for age in (1.5, 7, None):
+        gz = serve(snapshot, "gzip", tail={"age_seconds": age})
+        assert gz.headers["Content-Encoding"] == "gzip"
+        assert decoded(gz) == {**BIG, "status": {"age_seconds": age}}
+        assert decoded(serve(snapshot, "identity", tail={"age_seconds": age})) == {**BIG, "status": {"age_seconds": age}}
+
+
+def test_encoded_object_with_an_empty_payload():
+    assert decoded(serve(EncodedObject({}, "status"), "gzip", tail=1)) == {"status": 1}
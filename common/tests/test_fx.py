@@ -0,0 +1,80 @@
+import pytest
+
+from common.fx import FXTable, convert_rows, native_currency
+from common.encoded import dumps
+from common.shared_store import SQLiteSnapshotStore, SharedSnapshots
+
+RATES = {"rates": {"usd": {"value": 60000.0}, "inr": {"value": 5010000.0}, "eur": {"value": 55200.0}}}
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = 0
+
+    def get_json(self, url, operation="request", **kwargs):
+        self.calls += 1
+        return RATES
+
+
+class Follower(SharedSnapshots):
+    def is_leader(self):
+        return False
+
+
+class Leader(SharedSnapshots):
+    def is_leader(self):
+        return True
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteSnapshotStore(str(tmp_path / "shared.sqlite3"))
+
+
+def test_follower_waits_for_the_leader_instead_of_calling_upstream(store):
+    client = FakeClient()
+    fx = FXTable("test", client, Follower("svc", store))
+    assert fx.rates() is None
+    assert fx.rates() is None
+    assert client.calls == 0
+    Follower("svc", store).publish("fx", dumps({"INR": 83.5, "USD": 1.0, "EUR": 0.92}))
+    assert fx.rates() == {"INR": 83.5, "USD": 1.0, "EUR": 0.92}
+    assert client.calls == 0
+
+
+def test_leader_fetches_once_per_ttl_and_publishes(store):
+    client = FakeClient()
+    fx = FXTable("test", client, Leader("svc", store))
+    rates = fx.rates()
+    assert rates == pytest.approx({"INR": 83.5, "USD": 1.0, "EUR": 0.92})
+    fx.rates()
+    assert client.calls == 1
+    follower = FXTable("test", FakeClient(), Follower("svc", store))
+    assert follower.rates() == rates
+
+
+def test_exhausted_budget_leaves_rates_unavailable():
+    class Empty:
+        def try_acquire(self, cost=1):
+            return False
+    client = FakeClient()
+    assert FXTable("test", client, budget=Empty()).rates() is None
+    assert client.calls == 0
+
+
+def test_convert_rows_by_row_currency():
+    rows = [{"symbol": "TCS.NS", "price": 835.0, "market_cap": 835000, "currency": "INR"},
+            {"symbol": "^NSEI", "price": 25000.0, "currency": None},
+            {"symbol": "AAPL", "price": 10.0, "change": True, "currency": "USD"}]
+    rates = {"INR": 83.5, "USD": 1.0}
+    factor = lambda row: rates["USD"] / rates[row["currency"]] if row.get("currency") in rates else None
+    out = convert_rows(rows, ["price", "market_cap", "change"], factor, 2, "USD")
+    assert out[0] == {"symbol": "TCS.NS", "price": 10.0, "market_cap": 10000, "currency": "USD"}
+    assert out[1] is rows[1]          # index levels are not converted
+    assert out[2] is rows[2]          # already in USD
+    assert rows[0]["price"] == 835.0  # inputs are not mutated
+
+
+def test_native_currency():
+    assert [native_currency(s) for s in ("TCS.NS", "ITC.BO", "^NSEI", "AAPL", "GC=F")] == \
+           ["INR", "INR", None, "USD", "USD"]
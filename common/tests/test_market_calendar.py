@@ -0,0 +1,73 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from common import market_calendar
+from common.market_calendar import expires_at, is_open, next_open
+
+TTL = 60
+
+
+def at(tz, *fields):
+    return datetime(*fields, tzinfo=ZoneInfo(tz)).timestamp()
+
+
+def ny(*fields):
+    return at("America/New_York", *fields)
+
+
+def chicago(*fields):
+    return at("America/Chicago", *fields)
+
+
+def kolkata(*fields):
+    return at("Asia/Kolkata", *fields)
+
+
+def test_symbols_map_to_their_exchange():
+    assert market_calendar.exchange_for("TCS.NS").name == "NSE"
+    assert market_calendar.exchange_for("^NSEI").name == "NSE"
+    assert market_calendar.exchange_for("GC=F").name == "CME"
+    assert market_calendar.exchange_for("AAPL").name == "NYSE"
+
+
+def test_open_market_uses_the_plain_ttl():
+    fetched = ny(2026, 10, 14, 10, 0)   # Wednesday morning
+    assert is_open("AAPL", fetched)
+    assert expires_at("AAPL", fetched, TTL) == fetched + TTL
+
+
+def test_weekend_holds_until_monday_open():
+    fetched = ny(2026, 10, 17, 12, 0)   # Saturday
+    assert not is_open("AAPL", fetched)
+    assert expires_at("AAPL", fetched, TTL) == ny(2026, 10, 19, 9, 30)
+
+
+def test_holidays_are_skipped():
+    # NYSE closes Friday 2026-07-03; the session after Thursday's close is Monday's
+    assert next_open("AAPL", ny(2026, 7, 2, 17, 0)) == ny(2026, 7, 6, 9, 30)
+    # NSE closes Friday 2026-10-02
+    fetched = kolkata(2026, 10, 1, 16, 0)
+    assert expires_at("TCS.NS", fetched, TTL) == kolkata(2026, 10, 5, 9, 15)
+
+
+def test_fetches_before_the_close_settles_keep_the_plain_ttl():
+    just_closed = ny(2026, 10, 14, 16, 5)
+    assert not is_open("AAPL", just_closed)
+    assert expires_at("AAPL", just_closed, TTL) == just_closed + TTL
+    settled = ny(2026, 10, 14, 16, 20)
+    assert expires_at("AAPL", settled, TTL) == ny(2026, 10, 15, 9, 30)
+
+
+def test_cme_daily_maintenance_break_and_weekend():
+    assert is_open("GC=F", chicago(2026, 10, 13, 15, 59))
+    in_break = chicago(2026, 10, 13, 16, 30)   # Tuesday, between 16:00 and 17:00
+    assert not is_open("GC=F", in_break)
+    assert expires_at("GC=F", in_break, TTL) == chicago(2026, 10, 13, 17, 0)
+    assert expires_at("GC=F", chicago(2026, 10, 13, 16, 5), TTL) == chicago(2026, 10, 13, 16, 5) + TTL
+    assert is_open("GC=F", chicago(2026, 10, 13, 18, 0))   # Globex evening session for Wednesday
+    assert expires_at("GC=F", chicago(2026, 10, 16, 16, 30), TTL) == chicago(2026, 10, 18, 17, 0)
+
+
+def test_long_ttl_outlasts_the_next_open():
+    fetched = ny(2026, 10, 14, 16, 20)
+    assert expires_at("AAPL", fetched, 3 * 86400) == fetched + 3 * 86400
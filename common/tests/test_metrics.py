@@ -0,0 +1,30 @@
+from flask import Flask
+
+from common import metrics
+
+
+def test_profiler_endpoint_is_local_only_and_clamps_interval(monkeypatch):
+    started = []
+    monkeypatch.setattr(metrics.PROFILER, "start", lambda interval=None: started.append(interval))
+    client = metrics.install(Flask(__name__)).test_client()
+    remote = {"REMOTE_ADDR": "203.0.113.9"}
+    assert client.post("/metrics/profile?action=start&interval=0.0001", environ_base=remote).status_code == 403
+    assert client.get("/metrics/profile", environ_base=remote).status_code == 403
+    browser = client.post("/metrics/profile?action=start", headers={"Origin": "https://example.com"})
+    assert browser.status_code == 403
+    assert started == []
+    assert client.post("/metrics/profile?action=start&interval=0.5").status_code == 200
+    assert started == [0.5]
+
+
+def test_sampling_interval_is_clamped():
+    profiler = metrics.SamplingProfiler()
+    profiler.start(0.0000001)
+    profiler.stop()
+    assert profiler.interval == metrics.PROFILE_INTERVALS[0]
+    profiler.start(float("nan"))
+    profiler.stop()
+    assert profiler.interval == metrics.PROFILE_INTERVALS[0]
+    profiler.start(60)
+    profiler.stop()
+    assert profiler.interval == metrics.PROFILE_INTERVALS[1]
@@ -0,0 +1,82 @@
+from common.scheduler import RefreshScheduler, TokenBucket
+
+
+def scheduler(rate=100, capacity=100):
+    return RefreshScheduler("test", {"p": TokenBucket(rate=rate, capacity=capacity)})
+
+
+def test_failing_on_refresh_does_not_skip_later_jobs_or_ready():
+    s = scheduler()
+    refreshed = []
+
+    def broken_callback(batch):
+        raise ValueError("boom")
+
+    s.add_job("first", "p", "hot", ["A"], lambda batch: refreshed.append(("first", batch)), on_refresh=broken_callback)
+    s.add_job("second", "p", "universe", ["B"], lambda batch: refreshed.append(("second", batch)))
+    s.run_once()
+    assert refreshed == [("first", ["A"]), ("second", ["B"])]
+    assert s.ready.is_set()
+    assert all(job.ready.is_set() for job in s.jobs)
+
+
+def test_failing_refresh_records_error_and_backs_off():
+    s = scheduler()
+    calls = []
+
+    def failing(batch):
+        calls.append(batch)
+        raise RuntimeError("upstream down")
+
+    s.add_job("prices", "p", "universe", ["A", "B"], failing)
+    s.run_once()
+    s.run_once()   # failed keys wait out their interval
+    job = s.jobs[0]
+    assert calls == [["A", "B"]]
+    assert job.last_error == "upstream down"
+    assert job.ready.is_set() and s.ready.is_set()
+
+
+def test_error_outside_a_job_still_sets_ready():
+    s = scheduler()
+    s.add_job("prices", "p", "universe", ["A"], lambda batch: None)
+    s.hot_keys = lambda: 1 / 0
+    try:
+        s.run_once()
+    except ZeroDivisionError:
+        pass
+    assert s.ready.is_set()
+
+
+def test_budget_defers_keys_to_a_later_pass():
+    s = scheduler(rate=0.0001, capacity=2)
+    batches = []
+    s.add_job("prices", "p", "universe", ["A", "B", "C"], batches.append)
+    s.run_once()
+    assert len(batches[0]) == 2
+    assert s.jobs[0].deferred == 1
+
+
+def test_token_bucket_take_grants_whole_tokens_up_to_capacity():
+    bucket = TokenBucket(rate=0.0001, capacity=3)
+    assert bucket.take(5) == 3
+    assert bucket.take(1) == 0
+    assert not bucket.try_acquire()
+
+
+def test_hits_on_followers_promote_keys_on_the_leader(tmp_path):
+    from common.shared_store import SQLiteSnapshotStore, SharedSnapshots
+
+    store = SQLiteSnapshotStore(str(tmp_path / "shared.sqlite3"))
+    follower = RefreshScheduler("api", {"p": TokenBucket(rate=1, capacity=1)}, hot_size=1,
+                                shared=SharedSnapshots("api", store))
+    leader = RefreshScheduler("api", {"p": TokenBucket(rate=1, capacity=1)}, hot_size=1,
+                              shared=SharedSnapshots("api", store))
+    for _ in range(3): follower.hit("TCS.NS")
+    leader.hit("INFY.NS")
+    follower.share_demand(leader=False)
+    leader.share_demand(leader=True)
+    assert leader.hot_keys() == ["TCS.NS"]
+    assert store.take_hits("api") == {}
+    follower.share_demand(leader=False)   # nothing new to hand over
+    assert store.take_hits("api") == {}
@@ -0,0 +1,48 @@
+import pytest
+
+from common.shared_store import SharedSnapshots, SQLiteSnapshotStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteSnapshotStore(str(tmp_path / "shared.sqlite3"))
+
+
+def test_versions_increase_and_reads_skip_known_versions(store):
+    assert store.put("api/stocks", b"one") == 1
+    assert store.put("api/stocks", b"two") == 2
+    assert store.put("api/stocks", b"adopted", version=7) == 7
+    assert store.get("api/stocks").data == b"adopted"
+    assert store.get("api/stocks", newer_than=7) is None
+    assert store.get("missing") is None
+
+
+def test_only_one_owner_holds_a_lease_until_it_expires(store):
+    assert store.try_lease("api", "a", ttl=60)
+    assert not store.try_lease("api", "b", ttl=60)
+    assert store.try_lease("api", "a", ttl=60)   # renewal
+    store.release("api", "a")
+    assert store.try_lease("api", "b", ttl=60)
+    assert store.try_lease("other", "a", ttl=-1)   # already expired
+    assert store.try_lease("other", "b", ttl=60)
+
+
+def test_one_worker_is_elected_and_another_takes_over_after_release(store):
+    first, second = SharedSnapshots("api", store), SharedSnapshots("api", store)
+    assert first.is_leader()
+    assert not second.is_leader()
+    first.release()
+    assert not first.leader
+    second._renew()
+    assert second.leader
+    second.publish("stocks", b"data")
+    assert first.read("stocks").data == b"data"
+    second.release()
+
+
+def test_claims_are_granted_once_across_services(store):
+    api, us = SharedSnapshots("api", store), SharedSnapshots("us", store)
+    assert api.claim("alert/1")
+    assert api.claim("alert/1")   # repeat by the same service
+    assert not us.claim("alert/1")
+    assert us.claim("alert/2")
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+from common.snapshot_cache import SnapshotCache
+
+
+def test_concurrent_misses_share_one_load():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.1)
+        return len(calls)
+
+    cache = SnapshotCache("test", loader, ttl=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get())) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert len(calls) == 1
+    assert results == [1] * 8
+    assert cache.get() == 1   # fresh: no second load
+
+
+def test_failed_refresh_serves_stale_value():
+    def loader():
+        if cache.loads: raise RuntimeError("upstream down")
+        return 1
+
+    cache = SnapshotCache("test", loader, ttl=60)
+    assert cache.get() == 1
+    cache.invalidate()
+    assert cache.get() == 1
+    assert cache.loads == 1
+
+
+def test_failed_first_load_raises_to_every_waiter():
+    def loader():
+        time.sleep(0.05)
+        raise RuntimeError("upstream down")
+
+    cache = SnapshotCache("test", loader, ttl=60)
+    errors = []
+
+    def get():
+        try:
+            cache.get()
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=get) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert len(errors) == 4
+    with pytest.raises(RuntimeError):
+        cache.get()
+
+
+def test_forced_refresh_respects_min_refresh_interval():
+    counter = iter(range(1, 100))
+    cache = SnapshotCache("test", lambda: next(counter), ttl=60, min_refresh_interval=30)
+    assert cache.get() == 1
+    assert cache.get(force=True) == 1
+    cache.min_refresh_interval = 0
+    assert cache.get(force=True) == 2
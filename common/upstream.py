@@ -0,0 +1,151 @@
+import time
+import random
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from common.metrics import UPSTREAM_RETRIES, timed_upstream
+
+try:
+    import aiohttp
+except ImportError:  # the async variant falls back to the pooled session on a worker thread
+    aiohttp = None
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def retry_after_seconds(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None."""
+    if not value: return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - (now or time.time()))
+    except (TypeError, ValueError):
+        return None
+
+
+class UpstreamClient:
+    """
+    Keep-alive HTTP client for one upstream provider. Connections are pooled and
+    reused, responses are gzip-encoded, and 429/5xx responses or connection
+    failures are retried with exponential backoff and full jitter (honouring
+    Retry-After). At most `max_per_host` requests run against one host at once.
+    """
+
+    def __init__(self, provider, timeout=15, retries=3, backoff=0.5, max_backoff=30,
+                 max_per_host=4, pool_size=16):
+        self.provider = provider
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_per_host = max_per_host
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate", "Accept": "application/json"})
+        self._hosts = {}
+        self._async_sessions = {}
+        self._lock = threading.Lock()
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._hosts[host]
+
+    def _delay(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff; a Retry-After from the server wins if it is longer."""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+        return delay
+
+    def request(self, method, url, operation="request", **kwargs):
+        """Sends one request with retries; returns the final response (check its status yourself)."""
+        kwargs.setdefault("timeout", self.timeout)
+        slot = self._host_slot(url)
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                with slot, timed_upstream(self.provider, operation):
+                    response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last: raise
+                UPSTREAM_RETRIES.inc(self.provider, type(e).__name__)
+                time.sleep(self._delay(attempt))
+                continue
+            if response.status_code not in RETRY_STATUSES or last:
+                return response
+            UPSTREAM_RETRIES.inc(self.provider, str(response.status_code))
+            wait = self._delay(attempt, retry_after_seconds(response.headers.get("Retry-After")))
+            print(f"⚠️ {self.provider}: HTTP {response.status_code}, retrying in {wait:.1f}s")
+            response.close()
+            time.sleep(wait)
+
+    def get(self, url, operation="request", **kwargs):
+        return self.request("GET", url, operation, **kwargs)
+
+    def get_json(self, url, operation="request", **kwargs):
+        response = self.get(url, operation, **kwargs)
+        # Raise an HTTPError for bad responses (4xx or 5xx) once retries are used up
+        response.raise_for_status()
+        return response.json()
+
+    # --- asyncio variant ---
+
+    async def aget_json(self, url, operation="request", params=None):
+        """Async get_json: aiohttp with the same retry policy when installed, else the pooled session on a thread."""
+        if aiohttp is None:
+            return await asyncio.to_thread(self.get_json, url, operation, params=params)
+        session, slot = self._async_session(url)
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                async with slot:
+                    with timed_upstream(self.provider, operation):
+                        async with session.get(url, params=params) as response:
+                            if response.status not in RETRY_STATUSES or last:
+                                response.raise_for_status()
+                                return await response.json()
+                            retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if last: raise
+                UPSTREAM_RETRIES.inc(self.provider, type(e).__name__)
+                await asyncio.sleep(self._delay(attempt))
+                continue
+            UPSTREAM_RETRIES.inc(self.provider, str(response.status))
+            await asyncio.sleep(self._delay(attempt, retry_after))
+
+    def _async_session(self, url):
+        """One aiohttp session (and per-host limit) per event loop, since neither can cross loops."""
+        loop = asyncio.get_running_loop()
+        host = urlsplit(url).netloc
+        with self._lock:
+            entry = self._async_sessions.get(loop)
+            if entry is None or entry[0].closed:
+                connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.max_per_host)
+                session = aiohttp.ClientSession(connector=connector, headers=dict(self.session.headers),
+                                                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                                                auto_decompress=True)
+                entry = self._async_sessions[loop] = (session, {})
+            slots = entry[1]
+            if host not in slots:
+                slots[host] = asyncio.Semaphore(self.max_per_host)
+            return entry[0], slots[host]
+
+    async def aclose(self):
+        session = self._async_sessions.pop(asyncio.get_running_loop(), (None,))[0]
+        if session is not None: await session.close()
+
+    def close(self):
+        self.session.close()